@@ -0,0 +1,285 @@
+"""Benchmark the API hot paths against synthetic data and write the results as JSON."""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Generator, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from services.metrics import QueryRecorder
+
+ADMIN_TOKEN = "benchmark-token"
+FIRST_WEEK_END = date(2020, 1, 1)  # a Wednesday
+INSERT_BATCH_SIZE = 10_000
+CLOSE_BATCH_SIZE = 520
+PLATFORMS = ("ifood", "99food", None)
+CATEGORIES = ("combustivel", "manutencao", "alimentacao", "outros", None)
+
+Request = tuple[str, str, dict]
+Requests = Generator[Request, object, None]
+
+
+@dataclass
+class EndpointResult:
+    requests: int
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_rps: float
+    statements_per_request: float
+    peak_traced_bytes: int
+
+
+def week_ends(count: int, first: date = FIRST_WEEK_END) -> list[date]:
+    return [first + timedelta(weeks=index) for index in range(count)]
+
+
+def seed_expenses(db: Session, expenses: int, weeks: list[date], seed: int = 1) -> None:
+    """Spread ``expenses`` random expenses over ``weeks`` and rebuild the weekly rollup."""
+
+    import models
+    from services.rollup import rebuild_rollups
+
+    rng = random.Random(seed)
+    partner_ids = list(db.execute(select(models.Partner.id)).scalars())
+    created_at = datetime.utcnow()
+    table = models.Expense.__table__
+    for offset in range(0, expenses, INSERT_BATCH_SIZE):
+        rows = []
+        for _ in range(min(INSERT_BATCH_SIZE, expenses - offset)):
+            rows.append(
+                {
+                    "date": rng.choice(weeks) - timedelta(days=rng.randrange(7)),
+                    "amount": Decimal(rng.randrange(100, 50_000)) / 100,
+                    "partner_id": rng.choice(partner_ids),
+                    "platform": rng.choice(PLATFORMS),
+                    "category": rng.choice(CATEGORIES),
+                    "created_at": created_at,
+                }
+            )
+        db.execute(table.insert(), rows)
+    rebuild_rollups(db)
+
+
+def _close_payload(week_end: date, rng: random.Random) -> dict:
+    return {
+        "week_end": week_end.isoformat(),
+        "ifood_amount": f"{rng.randrange(50_000, 500_000) / 100:.2f}",
+        "ninety9_amount": f"{rng.randrange(0, 200_000) / 100:.2f}",
+    }
+
+
+def close_weeks(client, headers: dict[str, str], weeks: list[date], seed: int = 1) -> None:
+    """Close ``weeks`` through the batch close endpoint."""
+
+    rng = random.Random(seed)
+    for offset in range(0, len(weeks), CLOSE_BATCH_SIZE):
+        payloads = [_close_payload(week_end, rng) for week_end in weeks[offset : offset + CLOSE_BATCH_SIZE]]
+        response = client.post("/api/payouts/close_weeks", json=payloads, headers=headers)
+        response.raise_for_status()
+
+
+def _list_expenses_requests() -> Requests:
+    # Walk the keyset pages so deep pages are measured too, starting over after the last one.
+    cursor = None
+    while True:
+        params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        body = yield "GET", "/api/expenses", {"params": params}
+        cursor = body.get("next_cursor") if isinstance(body, dict) else None
+
+
+def _close_week_requests(open_weeks: list[date], seed: int) -> Requests:
+    rng = random.Random(seed)
+    for week_end in open_weeks:
+        yield "POST", "/api/payouts/close_week", {"json": _close_payload(week_end, rng)}
+
+
+def _list_settlements_requests() -> Requests:
+    while True:
+        yield "GET", "/api/reports/settlements", {"params": {"limit": 52}}
+
+
+def _weekly_pdf_requests(closed_weeks: list[date]) -> Requests:
+    # Distinct weeks so each request renders instead of hitting the report cache.
+    for week_end in reversed(closed_weeks):
+        yield "GET", "/api/reports/weekly.pdf", {"params": {"week_end": week_end.isoformat()}}
+
+
+def _replay(client, headers: dict[str, str], requests: Requests, count: int) -> Iterator[float]:
+    """Send up to ``count`` requests, feeding each JSON body back to the generator; yield latencies."""
+
+    body = None
+    for _ in range(count):
+        try:
+            method, url, kwargs = requests.send(body)
+        except StopIteration:
+            return
+        started = time.perf_counter()
+        response = client.request(method, url, headers=headers, **kwargs)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        is_json = response.headers.get("content-type", "").startswith("application/json")
+        body = response.json() if is_json else None
+        yield elapsed
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def measure(
+    client,
+    engine: Engine,
+    headers: dict[str, str],
+    requests: Requests,
+    iterations: int,
+    memory_samples: int,
+) -> EndpointResult:
+    """Time ``iterations`` requests, then replay ``memory_samples`` more under tracemalloc."""
+
+    with QueryRecorder(engine) as recorder:
+        started = time.perf_counter()
+        latencies = sorted(_replay(client, headers, requests, iterations))
+        elapsed = time.perf_counter() - started
+    if not latencies:
+        raise RuntimeError("Not enough synthetic data for the requested iterations")
+
+    # Measured separately because tracing allocations slows every request down.
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in _replay(client, headers, requests, memory_samples):
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+
+    return EndpointResult(
+        requests=len(latencies),
+        p50_ms=round(_percentile(latencies, 0.50) * 1000, 3),
+        p99_ms=round(_percentile(latencies, 0.99) * 1000, 3),
+        mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+        throughput_rps=round(len(latencies) / elapsed, 2),
+        statements_per_request=round(recorder.count / len(latencies), 2),
+        peak_traced_bytes=peak,
+    )
+
+
+def run_benchmarks(
+    client,
+    engine: Engine,
+    closed_weeks: list[date],
+    open_weeks: list[date],
+    iterations: int,
+    memory_samples: int = 3,
+    seed: int = 1,
+    headers: dict[str, str] | None = None,
+) -> dict[str, EndpointResult]:
+    """Benchmark list_expenses, close_week, list_settlements and weekly_pdf in turn."""
+
+    headers = headers or {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+    scenarios: dict[str, Callable[[], Requests]] = {
+        "list_expenses": _list_expenses_requests,
+        "close_week": lambda: _close_week_requests(open_weeks, seed),
+        "list_settlements": _list_settlements_requests,
+        "weekly_pdf": lambda: _weekly_pdf_requests(closed_weeks),
+    }
+    return {
+        name: measure(client, engine, headers, requests(), iterations, memory_samples)
+        for name, requests in scenarios.items()
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", help="empty database to seed; defaults to a temporary SQLite file")
+    parser.add_argument("--expenses", type=int, default=10_000)
+    parser.add_argument("--weeks", type=int, default=200, help="closed weeks to seed")
+    parser.add_argument("--iterations", type=int, default=50, help="timed requests per endpoint")
+    parser.add_argument("--memory-samples", type=int, default=3, help="extra requests traced for peak memory")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args(argv)
+    if args.weeks < args.iterations + args.memory_samples:
+        parser.error("--weeks must cover --iterations plus --memory-samples so every PDF request renders")
+
+    workdir = tempfile.mkdtemp(prefix="gastos-delivery-benchmark-")
+    # Settings are read and cached on the first create_app()/get_settings() call, and the engine is
+    # built from them on first use, so configure the environment before either happens.
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/benchmark.db"
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["LOCAL_STORAGE_DIR"] = os.path.join(workdir, "storage")
+    os.environ["RECEIPT_SPOOL_DIR"] = os.path.join(workdir, "spool")
+    os.environ.pop("REPORT_CACHE_DIR", None)
+
+    from fastapi.testclient import TestClient
+
+    import models
+    from db import engine, session_scope
+    from init_db import initialize
+    from main import create_app
+
+    initialize()
+    with session_scope() as session:
+        if session.scalar(select(func.count()).select_from(models.Expense)):
+            parser.error("the benchmark database must be empty")
+
+    headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+    all_weeks = week_ends(args.weeks + args.iterations + args.memory_samples)
+    closed, open_weeks = all_weeks[: args.weeks], all_weeks[args.weeks :]
+
+    seed_started = time.perf_counter()
+    with session_scope() as session:
+        seed_expenses(session, args.expenses, all_weeks, seed=args.seed)
+    with TestClient(create_app()) as client:
+        close_weeks(client, headers, closed, seed=args.seed)
+        seed_seconds = time.perf_counter() - seed_started
+        results = run_benchmarks(
+            client, engine, closed, open_weeks, args.iterations, args.memory_samples, args.seed, headers
+        )
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+        },
+        "volumes": {"expenses": args.expenses, "closed_weeks": args.weeks, "iterations": args.iterations},
+        "seed_seconds": round(seed_seconds, 2),
+        # Linux reports kilobytes, macOS bytes.
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+        "endpoints": {name: asdict(result) for name, result in results.items()},
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+
+    for name, result in results.items():
+        print(
+            f"{name:18} p50 {result.p50_ms:8.2f} ms  p99 {result.p99_ms:8.2f} ms  "
+            f"{result.throughput_rps:8.1f} req/s  {result.statements_per_request:5.1f} queries/req"
+        )
+    print(f"Results written to {args.output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,14 @@
 """Database configuration and session management."""
+import os
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import Table, create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-from settings import get_settings
+from settings import Settings, get_settings
 
 
 def _format_database_url(raw_url: str) -> str:
@@ -18,17 +21,133 @@ def _format_database_url(raw_url: str) -> str:
     return raw_url
 
 
-settings = get_settings()
-database_url = _format_database_url(settings.database_url)
+def engine_options(url: str, settings: Settings) -> dict[str, Any]:
+    """Return the ``create_engine`` keyword arguments of the profile matching the database.
+
+    Postgres gets a bounded pool whose connections are pinged before use and recycled before the
+    Supabase pooler drops them while idle. The statement timeout and the SQLite pragmas are
+    applied per connection by ``apply_postgres_session_settings`` and ``apply_sqlite_pragmas``.
+    """
+
+    backend = make_url(url).get_backend_name()
+    if backend == "postgresql":
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+        }
+    if backend == "sqlite":
+        # busy_timeout is also set as a pragma; this covers the driver's own lock wait.
+        return {"connect_args": {"timeout": settings.sqlite_busy_timeout_ms / 1000}}
+    return {"pool_pre_ping": settings.db_pool_pre_ping}
+
+
+def apply_sqlite_pragmas(engine: Engine, settings: Settings) -> None:
+    """Tune every new SQLite connection: WAL lets readers proceed while a write is in progress."""
+
+    in_memory = make_url(str(engine.url)).database in (None, "", ":memory:")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        finally:
+            cursor.close()
+
+
+def apply_postgres_session_settings(engine: Engine, settings: Settings) -> None:
+    """Set ``statement_timeout`` on every new Postgres connection; ``0`` leaves the server default.
+
+    A ``SET`` after connecting works through PgBouncer-style poolers, which reject the ``options``
+    startup parameter. Behind a transaction-mode pooler (Supabase port 6543) session settings do not
+    follow the client between transactions, so set the timeout on the database role there instead.
+    """
+
+    timeout_ms = int(settings.db_statement_timeout_ms)
+    if timeout_ms <= 0:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        # Outside a transaction, so the rollback when the connection returns to the pool keeps it.
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(f"SET statement_timeout = {timeout_ms}")
+            finally:
+                cursor.close()
+        finally:
+            dbapi_connection.autocommit = autocommit
+
+
+def create_database_engine(url: str, settings: Settings) -> Engine:
+    """Create the engine for ``url`` with the profile of its dialect."""
+
+    engine = create_engine(url, future=True, **engine_options(url, settings))
+    if engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine, settings)
+    elif engine.dialect.name == "postgresql":
+        apply_postgres_session_settings(engine, settings)
+    return engine
+
 
-engine = create_engine(database_url, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True)
 Base = declarative_base()
+# Bound by ``init_engine``; building the engine is deferred so importing the app stays cheap.
+SessionLocal = sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, future=True)
+_engine: Engine | None = None
+
+
+def database_url(settings: Settings | None = None) -> str:
+    return _format_database_url((settings or get_settings()).database_url)
+
+
+def init_engine(settings: Settings | None = None) -> Engine:
+    """Return the process engine, creating it and binding ``SessionLocal`` on first use."""
+
+    global _engine
+    if _engine is None:
+        settings = settings or get_settings()
+        _engine = create_database_engine(database_url(settings), settings)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def dispose_engine() -> None:
+    """Close the pooled connections; the engine opens new ones when it is used again."""
+
+    if _engine is not None:
+        _engine.dispose()
+
+
+def _forget_engine_after_fork() -> None:
+    # A forked process must not share the parent's pooled sockets; close=False leaves them to the parent.
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engine_after_fork)
+
+
+def __getattr__(name: str) -> Any:
+    # ``from db import engine`` keeps working for scripts and tests, building the engine on demand.
+    if name == "engine":
+        return init_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db() -> Generator[Session, None, None]:
     """Provide a SQLAlchemy session dependency."""
 
+    init_engine()
     session = SessionLocal()
     try:
         yield session
@@ -40,6 +159,7 @@ def get_db() -> Generator[Session, None, None]:
 def session_scope() -> Generator[Session, None, None]:
     """Provide a transactional scope for scripts and utilities."""
 
+    init_engine()
     session = SessionLocal()
     try:
         yield session
@@ -50,3 +170,14 @@ def session_scope() -> Generator[Session, None, None]:
     finally:
         session.close()
 
+
+
+def upsert_insert(session: Session, table: Table):
+    """Return a dialect-specific INSERT for ``table`` that supports ``ON CONFLICT`` clauses."""
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise RuntimeError(f"Unsupported database dialect for upserts: {dialect}")
@@ -0,0 +1,61 @@
+"""Async engine and sessions, used by the async routes when ``DB_ASYNC`` is enabled."""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import AsyncGenerator
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from db import apply_postgres_session_settings, apply_sqlite_pragmas, database_url, engine_options
+from services.metrics import instrument_engine
+from settings import get_settings
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+psycopg_async", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """Return ``url`` with the async driver of its dialect (psycopg async or aiosqlite)."""
+
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """Return the process-wide async engine, built with the same profile as the sync one."""
+
+    settings = get_settings()
+    url = database_url(settings)
+    async_engine = create_async_engine(async_database_url(url), **engine_options(url, settings))
+    if async_engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(async_engine.sync_engine, settings)
+    elif async_engine.dialect.name == "postgresql":
+        apply_postgres_session_settings(async_engine.sync_engine, settings)
+    if settings.metrics_enabled:
+        instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Provide an async SQLAlchemy session dependency."""
+
+    async with get_async_sessionmaker()() as session:
+        yield session
+
+
+async def dispose_async_engine() -> None:
+    """Close the pooled connections of the async engine, if it was created."""
+
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    get_async_sessionmaker.cache_clear()
+    get_async_engine.cache_clear()
@@ -0,0 +1,40 @@
+"""Import expenses from a CSV or NDJSON file."""
+from __future__ import annotations
+
+import argparse
+import sys
+
+from db import session_scope
+from services.expense_import import DEFAULT_BATCH_SIZE, detect_format, import_expenses
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Import the file in one transaction and print the rejected lines."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="CSV or NDJSON file; use - to read from stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("could not detect the format, pass --format")
+
+    with session_scope() as session:
+        if args.path == "-":
+            result = import_expenses(session, sys.stdin.buffer, fmt, batch_size=args.batch_size)
+        else:
+            with open(args.path, "rb") as stream:
+                result = import_expenses(session, stream, fmt, batch_size=args.batch_size)
+
+    for line, detail in result.errors:
+        print(f"line {line}: {detail}", file=sys.stderr)
+    if result.errors_truncated:
+        print("more errors omitted", file=sys.stderr)
+    print(f"{result.imported} expenses imported, {len(result.errors)} lines rejected.")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
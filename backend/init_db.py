@@ -1,27 +1,114 @@
 ﻿"""Initialize database schema and seed baseline data."""
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateColumn
 
-from db import Base, engine, session_scope
-from models import Partner
+from db import Base, init_engine, session_scope
+from models import Partner, Settlement, SettlementShare, WeeklyExpenseRollup
+from services.rollup import rebuild_rollups
 
 DEFAULT_PARTNERS = (
     ("Rafael", 0.5),
     ("Guilherme", 0.5),
 )
 
+# Weekly totals come from weekly_expense_rollups, so the covering index on expenses is dead weight.
+OBSOLETE_INDEXES = ("ix_expenses_partner_date_amount",)
+
+
+def ensure_columns() -> None:
+    """Add nullable columns declared on the models that are missing from existing tables."""
+
+    engine = init_engine()
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def ensure_indexes() -> None:
+    """Create indexes declared on the models that are missing from existing tables.
+
+    ``create_all`` skips tables that already exist, so indexes added after a
+    deployment was first initialised have to be created one by one.
+    """
+
+    engine = init_engine()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def drop_obsolete_indexes() -> None:
+    """Drop indexes that no query uses any more, so inserts stop maintaining them."""
+
+    engine = init_engine()
+    with engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def backfill_settlement_shares(session) -> int:
+    """Create the per-partner shares of settlements closed before the shares table existed.
+
+    Old settlements only stored Rafael and Guilherme columns, and their split ratio at the time is unknown.
+    """
+
+    partner_ids = dict(session.execute(select(Partner.name, Partner.id)).all())
+    rows = []
+    for settlement in session.execute(select(Settlement)).scalars():
+        for name, suffix in (("Rafael", "rafael"), ("Guilherme", "guilherme")):
+            if name not in partner_ids:
+                continue
+            rows.append(
+                {
+                    "settlement_id": settlement.id,
+                    "partner_id": partner_ids[name],
+                    "partner_name": name,
+                    "split_ratio": None,
+                    "reimb": getattr(settlement, f"reimb_{suffix}"),
+                    "share": getattr(settlement, f"share_{suffix}"),
+                    "total": getattr(settlement, f"total_{suffix}"),
+                }
+            )
+    if rows:
+        session.execute(SettlementShare.__table__.insert(), rows)
+    return len(rows)
+
 
 def initialize() -> None:
-    """Create tables and ensure default partners exist."""
+    """Create tables, missing columns and indexes and ensure default partners exist."""
 
+    engine = init_engine()
+    inspector = inspect(engine)
+    rollup_existed = inspector.has_table(WeeklyExpenseRollup.__tablename__)
+    shares_existed = inspector.has_table(SettlementShare.__tablename__)
     Base.metadata.create_all(engine)
+    ensure_columns()
+    ensure_indexes()
+    drop_obsolete_indexes()
     with session_scope() as session:
         existing = set(session.execute(select(Partner.name)).scalars())
         for name, ratio in DEFAULT_PARTNERS:
             if name in existing:
                 continue
             session.add(Partner(name=name, split_ratio=ratio))
+        if not rollup_existed:
+            # Backfill the rollup the first time it is created on a database that already has expenses.
+            rebuild_rollups(session)
+        if not shares_existed:
+            session.flush()
+            backfill_settlement_shares(session)
 
     print("Database initialized with default partners.")
 
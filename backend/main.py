@@ -1,17 +1,96 @@
 """FastAPI application entry point."""
 from __future__ import annotations
 
+import importlib
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
 
-from routes import api_router
+from routes import build_api_router
+from db import SessionLocal, dispose_engine, init_engine
+from services.images import get_image_processor, shutdown_image_processors
+from services.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, instrument_engine, render_metrics
+from services.receipt_queue import ReceiptUploadWorker
+from services.report_render import shutdown_render_pools
+from services.storage import close_storage_services, get_storage_service, resolve_storage_backend
 from settings import Settings, get_settings
 
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the code that uses them; warmup loads them before the first request does.
+WARMUP_IMPORTS = ("reportlab.pdfgen.canvas", "reportlab.lib.pagesizes")
+
+
+def warmup(settings: Settings) -> None:
+    """Pre-touch what the first request needs: ORM mappers, a pooled connection, storage and reportlab."""
+
+    try:
+        configure_mappers()
+        with init_engine(settings).connect() as connection:
+            connection.execute(text("SELECT 1"))
+        get_storage_service(settings)
+        for module in WARMUP_IMPORTS:
+            importlib.import_module(module)
+    except Exception:  # pragma: no cover - warmup is best effort, the request path reports real errors
+        logger.exception("Startup warmup failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start background workers and release pooled resources when the server shuts down."""
+
+    settings = get_settings()
+    # Refuse to start without usable receipt storage instead of failing on the first upload.
+    resolve_storage_backend(settings)
+    engine = init_engine(settings)
+    if settings.metrics_enabled:
+        instrument_engine(engine)
+
+    warmup_thread = None
+    if settings.startup_warmup == "sync":
+        warmup(settings)
+    elif settings.startup_warmup == "background":
+        warmup_thread = threading.Thread(target=warmup, args=(settings,), name="startup-warmup", daemon=True)
+        warmup_thread.start()
+
+    worker = None
+    if settings.receipt_upload_mode == "background":
+        worker = ReceiptUploadWorker(
+            SessionLocal,
+            lambda: get_storage_service(settings),
+            max_attempts=settings.receipt_upload_max_attempts,
+            processor_provider=lambda: get_image_processor(settings),
+        )
+        worker.start()
+    app.state.receipt_worker = worker
+
+    yield
+
+    if warmup_thread is not None:
+        warmup_thread.join()
+    if worker is not None:
+        worker.stop()
+    close_storage_services()
+    shutdown_image_processors()
+    shutdown_render_pools()
+    if settings.db_async:
+        from db_async import dispose_async_engine
+
+        await dispose_async_engine()
+    dispose_engine()
+
 
 def create_app() -> FastAPI:
     """Application factory for the API."""
 
-    app = FastAPI(title="Gastos Delivery API", version="0.1.0")
+    app = FastAPI(title="Gastos Delivery API", version="0.1.0", lifespan=lifespan)
 
     settings = get_settings()
     origins = settings.resolved_cors_origins()
@@ -22,13 +101,21 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
 
-    app.include_router(api_router, prefix="/api")
+    app.include_router(build_api_router(settings.db_async), prefix="/api")
 
     @app.get("/health", tags=["meta"])
     def health(settings: Settings = Depends(get_settings)) -> dict[str, str]:
         return {"status": "ok", "tz": settings.tz}
 
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", tags=["meta"], include_in_schema=False)
+        def metrics() -> PlainTextResponse:
+            return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
     return app
 
 
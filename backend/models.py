@@ -28,7 +28,9 @@ class Expense(Base):
     note = Column(String(255), nullable=True)
     platform = Column(String(50), nullable=True)
     category = Column(String(50), nullable=True)
-    receipt_url = Column(String(255), nullable=True)
+    receipt_url = Column(String(255), nullable=True, index=True)
+    receipt_status = Column(String(16), nullable=True)
+    thumbnail_url = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     partner = relationship("Partner", back_populates="expenses")
@@ -66,3 +68,74 @@ class Settlement(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     payout = relationship("Payout", back_populates="settlement")
+    shares = relationship(
+        "SettlementShare",
+        back_populates="settlement",
+        cascade="all, delete-orphan",
+        order_by="SettlementShare.partner_id",
+    )
+
+
+class SettlementShare(Base):
+    """One partner's part of a settlement; works for any number of partners."""
+
+    __tablename__ = "settlement_shares"
+    __table_args__ = (UniqueConstraint("settlement_id", "partner_id", name="uq_settlement_share_partner"),)
+
+    id = Column(Integer, primary_key=True)
+    settlement_id = Column(Integer, ForeignKey("settlements.id"), nullable=False, index=True)
+    partner_id = Column(Integer, ForeignKey("partners.id"), nullable=False)
+    # Name and ratio at closing time, so renaming or re-splitting partners does not rewrite history.
+    partner_name = Column(String(100), nullable=False)
+    split_ratio = Column(Numeric(5, 4), nullable=True)
+    reimb = Column(Numeric(12, 2), nullable=False)
+    share = Column(Numeric(12, 2), nullable=False)
+    total = Column(Numeric(12, 2), nullable=False)
+
+    settlement = relationship("Settlement", back_populates="shares")
+
+
+class PendingReceiptUpload(Base):
+    """Receipt spooled on local disk waiting for the background uploader."""
+
+    __tablename__ = "pending_receipt_uploads"
+
+    id = Column(Integer, primary_key=True)
+    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False, unique=True)
+    spool_path = Column(String(255), nullable=False)
+    destination = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    sha256 = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ReceiptBlob(Base):
+    """Receipt already stored under its content-addressed key, indexed by SHA-256."""
+
+    __tablename__ = "receipt_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    receipt_url = Column(String(255), nullable=False)
+    thumbnail_url = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class WeeklyExpenseRollup(Base):
+    """Expense totals per business week, maintained alongside every expense insert."""
+
+    __tablename__ = "weekly_expense_rollups"
+    __table_args__ = (
+        UniqueConstraint("week_end", "partner_id", "category", "platform", name="uq_weekly_expense_rollup_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    week_end = Column(Date, nullable=False)
+    partner_id = Column(Integer, ForeignKey("partners.id"), nullable=False)
+    # Empty string instead of NULL so rows without category/platform still collide on the unique key.
+    category = Column(String(50), nullable=False, default="")
+    platform = Column(String(50), nullable=False, default="")
+    total = Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"))
+    expense_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,18 @@
+"""Rebuild the weekly expense rollup table from the raw expenses."""
+from __future__ import annotations
+
+from db import session_scope
+from services.rollup import rebuild_rollups
+
+
+def main() -> None:
+    """Recompute every weekly rollup row in a single transaction."""
+
+    with session_scope() as session:
+        written = rebuild_rollups(session)
+
+    print(f"Weekly expense rollups rebuilt ({written} rows).")
+
+
+if __name__ == "__main__":
+    main()
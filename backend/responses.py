@@ -0,0 +1,25 @@
+"""Response classes shared by the routes."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for payloads already made of plain JSON types, encoded with orjson when installed.
+
+    Routes returning it skip FastAPI's response-model validation, so they must only use it for data
+    the server produced itself.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -1,11 +1,58 @@
 ﻿"""API router aggregation."""
 from fastapi import APIRouter
+from fastapi.routing import APIRoute
 
-from . import auth, expenses, payouts, reports
+from . import auth, expenses, payouts, receipts, reports
 
-api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(expenses.router, prefix="/expenses", tags=["expenses"])
-api_router.include_router(payouts.router, prefix="/payouts", tags=["payouts"])
-api_router.include_router(payouts.settlement_router, prefix="/settlements", tags=["settlements"])
-api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+
+def _route_keys(router: APIRouter) -> set[tuple[str, frozenset[str]]]:
+    return {(route.path, frozenset(route.methods)) for route in router.routes if isinstance(route, APIRoute)}
+
+
+def _without(router: APIRouter, replacement: APIRouter | None) -> APIRouter:
+    """Return ``router`` minus the routes that ``replacement`` serves at the same path and methods."""
+
+    if replacement is None:
+        return router
+    replaced = _route_keys(replacement)
+    return APIRouter(
+        routes=[
+            route
+            for route in router.routes
+            if not (isinstance(route, APIRoute) and (route.path, frozenset(route.methods)) in replaced)
+        ]
+    )
+
+
+def build_api_router(async_db: bool = False) -> APIRouter:
+    """Assemble the API; with ``async_db`` the async expense, payout and report routes replace the sync ones."""
+
+    async_routers: dict[str, APIRouter] = {}
+    if async_db:
+        # Imported lazily: the async stack needs greenlet and the async drivers, which are optional.
+        from .aio import expenses as async_expenses, payouts as async_payouts, reports as async_reports
+
+        async_routers = {
+            "expenses": async_expenses.router,
+            "payouts": async_payouts.router,
+            "settlements": async_payouts.settlement_router,
+            "reports": async_reports.router,
+        }
+
+    router = APIRouter()
+    for prefix, sync_router in (
+        ("auth", auth.router),
+        ("expenses", expenses.router),
+        ("payouts", payouts.router),
+        ("settlements", payouts.settlement_router),
+        ("reports", reports.router),
+        ("receipts", receipts.router),
+    ):
+        async_router = async_routers.get(prefix)
+        if async_router is not None:
+            router.include_router(async_router, prefix=f"/{prefix}", tags=[prefix])
+        router.include_router(_without(sync_router, async_router), prefix=f"/{prefix}", tags=[prefix])
+    return router
+
+
+api_router = build_api_router()
@@ -0,0 +1,6 @@
+"""Async versions of the database-bound routes, mounted when ``DB_ASYNC`` is enabled.
+
+The handlers reuse the sync route code through ``AsyncSession.run_sync``: SQLAlchemy runs it in a
+greenlet on the event loop, so queries are awaited on the async driver instead of holding a
+threadpool worker.
+"""
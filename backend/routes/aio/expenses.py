@@ -0,0 +1,42 @@
+"""Async expense routes."""
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import schemas
+from db_async import get_async_db
+from routes import expenses
+from security import require_admin
+
+router = APIRouter()
+
+
+@router.get("/summary", response_model=schemas.ExpensesSummary)
+async def expenses_summary(
+    week_end: date = Query(..., description="Quarta-feira de fechamento"),
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> schemas.ExpensesSummary:
+    """Return each partner's expense total for a business week from the weekly rollup."""
+
+    return await db.run_sync(lambda session: expenses.expenses_summary(week_end, session, admin))
+
+
+@router.get("", response_model=schemas.ExpensePage)
+async def list_expenses(
+    start: date | None = Query(None),
+    end: date | None = Query(None),
+    partner_name: str | None = Query(None),
+    cursor: str | None = Query(None),
+    limit: int = Query(expenses.DEFAULT_PAGE_SIZE, ge=1, le=expenses.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> schemas.ExpensePage:
+    """List expenses with optional filters, newest first, one keyset page at a time."""
+
+    return await db.run_sync(
+        lambda session: expenses.list_expenses(start, end, partner_name, cursor, limit, session, admin)
+    )
@@ -0,0 +1,52 @@
+"""Async payout and settlement routes."""
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Depends, Path
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import schemas
+from db_async import get_async_db
+from responses import FastJSONResponse
+from routes import payouts
+from security import require_admin
+from settings import Settings, get_settings
+
+router = APIRouter()
+settlement_router = APIRouter()
+
+
+@router.post("/close_week", response_model=schemas.SettlementResponse)
+async def close_week(
+    payload: schemas.PayoutCloseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+    settings: Settings = Depends(get_settings),
+) -> FastJSONResponse:
+    """Close the business week and generate settlement records."""
+
+    return await db.run_sync(lambda session: payouts.close_week(payload, session, admin, settings))
+
+
+@router.post("/close_weeks", response_model=schemas.PayoutBatchCloseResponse)
+async def close_weeks(
+    payloads: Annotated[list[schemas.PayoutCloseRequest], Body(min_length=1, max_length=payouts.MAX_BATCH_WEEKS)],
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+    settings: Settings = Depends(get_settings),
+) -> FastJSONResponse:
+    """Close many business weeks at once, e.g. to backfill history."""
+
+    return await db.run_sync(lambda session: payouts.close_weeks(payloads, session, admin, settings))
+
+
+@settlement_router.get("/{settlement_id}", response_model=schemas.SettlementResponse)
+async def get_settlement(
+    settlement_id: int = Path(..., gt=0),
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> FastJSONResponse:
+    """Retrieve a previously generated settlement."""
+
+    return await db.run_sync(lambda session: payouts.get_settlement(settlement_id, session, admin))
@@ -0,0 +1,82 @@
+"""Async reporting routes."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import schemas
+from db_async import get_async_db
+from responses import FastJSONResponse
+from routes import reports
+from security import require_admin
+from services.report_cache import ReportCache, get_report_cache
+from services.report_render import ReportRenderPool, get_render_pool
+
+router = APIRouter()
+
+
+@router.get("/settlements", response_model=schemas.SettlementPage)
+async def list_settlements(
+    cursor: str | None = Query(None),
+    limit: int = Query(reports.DEFAULT_PAGE_SIZE, ge=1, le=reports.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> FastJSONResponse:
+    """Return settlements newest week first, one keyset page at a time."""
+
+    return await db.run_sync(lambda session: reports.list_settlements(cursor, limit, session, admin))
+
+
+@router.get("/settlements/aggregates", response_model=list[schemas.SettlementAggregate])
+async def settlement_aggregates(
+    period: Literal["month", "year"] = Query("month"),
+    start: date | None = Query(None, description="Primeira quarta-feira de fechamento"),
+    end: date | None = Query(None, description="Ultima quarta-feira de fechamento"),
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> list[schemas.SettlementAggregate]:
+    """Return settlement totals per month or year, oldest first."""
+
+    return await db.run_sync(lambda session: reports.settlement_aggregates(period, start, end, session, admin))
+
+
+@router.post("/simulation", response_model=schemas.SimulationResponse)
+async def simulate_settlements(
+    payload: schemas.SimulationRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin: str = Depends(require_admin),
+) -> schemas.SimulationResponse:
+    """Replay the closed weeks under other rules and split ratios and compare them with what was paid."""
+
+    return await db.run_sync(lambda session: reports.simulate_settlements(payload, session, admin))
+
+
+@router.get("/weekly.csv")
+async def weekly_csv(
+    week_end: date = Query(..., description="Quarta-feira de fechamento", alias="week_end"),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    _: str = Depends(require_admin),
+    cache: ReportCache = Depends(get_report_cache),
+    pool: ReportRenderPool = Depends(get_render_pool),
+) -> Response:
+    """Export settlement summary and the week's expenses as CSV."""
+
+    return await reports._report_response("csv", week_end, if_none_match, db.run_sync, cache, pool)
+
+
+@router.get("/weekly.pdf")
+async def weekly_pdf(
+    week_end: date = Query(..., description="Quarta-feira de fechamento", alias="week_end"),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    _: str = Depends(require_admin),
+    cache: ReportCache = Depends(get_report_cache),
+    pool: ReportRenderPool = Depends(get_render_pool),
+) -> Response:
+    """Export settlement summary and an itemized list of the week's expenses as a PDF."""
+
+    return await reports._report_response("pdf", week_end, if_none_match, db.run_sync, cache, pool)
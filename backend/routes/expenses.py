@@ -1,22 +1,42 @@
 ﻿"""Expense routes."""
 from __future__ import annotations
 
+import base64
+import binascii
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import List
+from typing import Literal
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, contains_eager
 
 import models, schemas
 from db import get_db
 from security import require_admin
+from services.expense_import import detect_format, import_expenses
+from services.images import ReceiptImageProcessor, get_image_processor, store_receipt
+from services.receipt_index import (
+    HashingReader,
+    content_address,
+    digest_from_path,
+    hash_stream,
+    lookup_receipt,
+    receipt_suffix,
+    remember_receipt,
+)
+from services.receipt_queue import enqueue_receipt, spool_receipt
+from services.rollup import apply_expenses, weekly_totals_by_partner
 from services.storage import get_storage_service, StorageService
+from settings import get_settings, Settings
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 
 def _parse_decimal(raw_value: str, field: str) -> Decimal:
     try:
@@ -35,6 +55,21 @@ def _parse_date(raw_value: str, field: str) -> date:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid {field}") from exc
 
 
+def _encode_cursor(expense: models.Expense) -> str:
+    raw = f"{expense.date.isoformat()}:{expense.id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        raw_date, raw_id = raw.split(":", 1)
+        return date.fromisoformat(raw_date), int(raw_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor") from None
+
+
 def _get_partner_by_name(db: Session, partner_name: str) -> models.Partner:
     partner = db.query(models.Partner).filter(models.Partner.name == partner_name).first()
     if not partner:
@@ -42,6 +77,13 @@ def _get_partner_by_name(db: Session, partner_name: str) -> models.Partner:
     return partner
 
 
+def _receipt_destination(expense_date: date, filename: str | None) -> Path:
+    """Return the storage key for a new receipt: ``{iso_year}/{iso_week}/{uuid}{suffix}``."""
+
+    iso_year, iso_week, _ = expense_date.isocalendar()
+    return Path(f"{iso_year}/{iso_week:02d}/{uuid4().hex}{receipt_suffix(filename)}")
+
+
 def _expense_to_schema(expense: models.Expense) -> schemas.ExpenseResponse:
     return schemas.ExpenseResponse(
         id=expense.id,
@@ -52,12 +94,15 @@ def _expense_to_schema(expense: models.Expense) -> schemas.ExpenseResponse:
         category=expense.category,
         note=expense.note,
         receipt_url=expense.receipt_url,
+        receipt_status=expense.receipt_status,
+        thumbnail_url=expense.thumbnail_url,
         created_at=expense.created_at,
     )
 
 
 @router.post("", response_model=schemas.ExpenseResponse, status_code=status.HTTP_201_CREATED)
 def create_expense(
+    request: Request,
     file: UploadFile = File(...),
     amount: str = Form(...),
     date_value: str = Form(...),
@@ -68,21 +113,46 @@ def create_expense(
     db: Session = Depends(get_db),
     _: str = Depends(require_admin),
     storage: StorageService = Depends(get_storage_service),
+    settings: Settings = Depends(get_settings),
+    image_processor: ReceiptImageProcessor | None = Depends(get_image_processor),
 ) -> schemas.ExpenseResponse:
-    """Create a new expense entry with receipt upload."""
+    """Create a new expense entry with receipt upload.
+
+    With ``RECEIPT_UPLOAD_MODE=background`` the receipt is spooled to disk, the expense is committed
+    with a pending receipt and the upload happens in the background worker. With
+    ``RECEIPT_IMAGE_PROCESSING`` enabled image receipts are downscaled and get a thumbnail.
+    """
 
     expense_amount = _parse_decimal(amount, "amount")
     expense_date = _parse_date(date_value, "date")
     partner = _get_partner_by_name(db, partner_name)
 
-    iso_year, iso_week, _ = expense_date.isocalendar()
-    suffix = Path(file.filename or "").suffix or ".jpg"
-    destination = Path(f"{iso_year}/{iso_week:02d}/{uuid4().hex}{suffix.lower()}")
+    suffix = receipt_suffix(file.filename)
+    background = settings.receipt_upload_mode == "background"
+    spool_path = None
+    if background:
+        reader = HashingReader(file.file)
+        spool_path = spool_receipt(reader, Path(settings.receipt_spool_dir), suffix)
+        digest = reader.hexdigest()
+    else:
+        digest = hash_stream(file.file)
 
-    try:
-        receipt_url = storage.upload_receipt(file.file, destination, content_type=file.content_type)
-    except RuntimeError as exc:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+    # Receipts are stored under their SHA-256 so resubmitting the same file skips the upload.
+    destination = content_address(digest, suffix)
+    known = lookup_receipt(db, digest)
+    receipt_url = known.receipt_url if known else None
+    thumbnail_url = known.thumbnail_url if known else None
+    if known is not None and spool_path is not None:
+        spool_path.unlink(missing_ok=True)
+        spool_path = None
+    elif known is None and not background:
+        try:
+            receipt_url, thumbnail_url = store_receipt(
+                storage, file.file, destination, file.content_type, processor=image_processor, upsert=True
+            )
+        except RuntimeError as exc:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        remember_receipt(db, digest, receipt_url, thumbnail_url)
 
     expense = models.Expense(
         date=expense_date,
@@ -92,25 +162,175 @@ def create_expense(
         category=category,
         note=note,
         receipt_url=receipt_url,
+        receipt_status="uploaded" if receipt_url else None,
+        thumbnail_url=thumbnail_url,
+    )
+    try:
+        db.add(expense)
+        db.flush()
+        if spool_path is not None:
+            enqueue_receipt(db, expense, spool_path, destination, file.content_type, sha256=digest)
+        apply_expenses(db, [expense])
+        db.commit()
+    except BaseException:
+        # No job points at the spooled file once the transaction is gone.
+        if spool_path is not None:
+            spool_path.unlink(missing_ok=True)
+        raise
+    db.refresh(expense)
+
+    worker = getattr(request.app.state, "receipt_worker", None)
+    if spool_path is not None and worker is not None:
+        worker.wake()
+
+    return _expense_to_schema(expense)
+
+
+@router.post("/receipt_upload", response_model=schemas.ReceiptUploadTarget)
+def create_receipt_upload(
+    payload: schemas.ReceiptUploadRequest,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+    storage: StorageService = Depends(get_storage_service),
+) -> schemas.ReceiptUploadTarget:
+    """Issue a signed URL so the client uploads the receipt straight to storage.
+
+    When the client sends the file's SHA-256 the upload goes to its content-addressed key. If the
+    index already has that receipt, the key and ``receipt_url`` are returned without an upload target.
+    ``confirm_expense`` hashes the stored object before indexing it, so the client's hash is never trusted.
+    """
+
+    if payload.sha256:
+        destination = content_address(payload.sha256, receipt_suffix(payload.filename))
+        known = lookup_receipt(db, payload.sha256)
+        if known is not None:
+            return schemas.ReceiptUploadTarget(path=destination.as_posix(), receipt_url=known.receipt_url)
+    else:
+        destination = _receipt_destination(payload.date, payload.filename)
+    try:
+        signed = storage.create_signed_upload(destination)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+    return schemas.ReceiptUploadTarget(path=signed.path, upload_url=signed.upload_url, token=signed.token)
+
+
+@router.post("/confirm", response_model=schemas.ExpenseResponse, status_code=status.HTTP_201_CREATED)
+def confirm_expense(
+    payload: schemas.ExpenseConfirm,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+    storage: StorageService = Depends(get_storage_service),
+) -> schemas.ExpenseResponse:
+    """Create an expense whose receipt the client already uploaded through a signed URL."""
+
+    partner = _get_partner_by_name(db, payload.partner_name)
+    destination = Path(payload.receipt_path)
+    digest = digest_from_path(payload.receipt_path)
+    if digest is None:
+        iso_year, iso_week, _ = payload.date.isocalendar()
+        if not payload.receipt_path.startswith(f"{iso_year}/{iso_week:02d}/"):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="receipt_path does not match date")
+
+    known = lookup_receipt(db, digest) if digest else None
+    receipt_url = known.receipt_url if known else None
+    thumbnail_url = known.thumbnail_url if known else None
+    if receipt_url is None:
+        try:
+            if digest:
+                stored_digest = storage.receipt_sha256(destination)
+                uploaded = stored_digest is not None
+            else:
+                uploaded = storage.receipt_exists(destination)
+        except RuntimeError as exc:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+        if not uploaded:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Receipt upload not found")
+        if digest and stored_digest != digest:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Receipt does not match its SHA-256")
+        receipt_url = storage.public_url(destination)
+        # An uploaded object belongs to one expense; replaying the confirm must not create another.
+        attached = db.query(models.Expense.id).filter(models.Expense.receipt_url == receipt_url).first()
+        if attached is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Receipt already attached to an expense")
+        if digest:
+            remember_receipt(db, digest, receipt_url)
+
+    expense = models.Expense(
+        date=payload.date,
+        amount=payload.amount,
+        partner_id=partner.id,
+        platform=payload.platform,
+        category=payload.category,
+        note=payload.note,
+        receipt_url=receipt_url,
+        receipt_status="uploaded",
+        thumbnail_url=thumbnail_url,
     )
     db.add(expense)
+    db.flush()
+    apply_expenses(db, [expense])
     db.commit()
     db.refresh(expense)
 
     return _expense_to_schema(expense)
 
 
-@router.get("", response_model=List[schemas.ExpenseResponse])
+@router.post("/import", response_model=schemas.ExpenseImportResult)
+def import_expenses_file(
+    file: UploadFile = File(...),
+    file_format: Literal["csv", "ndjson"] | None = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+) -> schemas.ExpenseImportResult:
+    """Import expenses from a CSV or NDJSON file, committing the valid rows and reporting the others."""
+
+    fmt = file_format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Unknown import format")
+
+    result = import_expenses(db, file.file, fmt)
+    db.commit()
+    return schemas.ExpenseImportResult(
+        imported=result.imported,
+        errors=[schemas.ExpenseImportError(line=line, detail=detail) for line, detail in result.errors],
+        errors_truncated=result.errors_truncated,
+    )
+
+
+@router.get("/summary", response_model=schemas.ExpensesSummary)
+def expenses_summary(
+    week_end: date = Query(..., description="Quarta-feira de fechamento"),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+) -> schemas.ExpensesSummary:
+    """Return each partner's expense total for a business week from the weekly rollup."""
+
+    partners = db.query(models.Partner).all()
+    totals = weekly_totals_by_partner(db, week_end, [partner.id for partner in partners])
+    by_name = {partner.name: totals.get(partner.id, Decimal("0")) for partner in partners}
+    return schemas.ExpensesSummary(
+        rafael=by_name.get("Rafael", Decimal("0")),
+        guilherme=by_name.get("Guilherme", Decimal("0")),
+    )
+
+
+@router.get("", response_model=schemas.ExpensePage)
 def list_expenses(
     start: date | None = Query(None),
     end: date | None = Query(None),
     partner_name: str | None = Query(None),
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     _: str = Depends(require_admin),
-) -> List[schemas.ExpenseResponse]:
-    """List expenses with optional filters."""
+) -> schemas.ExpensePage:
+    """List expenses with optional filters, newest first, one keyset page at a time."""
 
-    query = db.query(models.Expense).join(models.Partner)
+    query = (
+        db.query(models.Expense)
+        .join(models.Expense.partner)
+        .options(contains_eager(models.Expense.partner))
+    )
 
     if start:
         query = query.filter(models.Expense.date >= start)
@@ -118,6 +338,19 @@ def list_expenses(
         query = query.filter(models.Expense.date <= end)
     if partner_name:
         query = query.filter(models.Partner.name == partner_name)
+    if cursor:
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                models.Expense.date < cursor_date,
+                and_(models.Expense.date == cursor_date, models.Expense.id < cursor_id),
+            )
+        )
 
-    expenses = query.order_by(models.Expense.date.desc(), models.Expense.id.desc()).all()
-    return [_expense_to_schema(expense) for expense in expenses]
+    # One extra row tells us whether another page exists without a COUNT query.
+    expenses = query.order_by(models.Expense.date.desc(), models.Expense.id.desc()).limit(limit + 1).all()
+    next_cursor = _encode_cursor(expenses[limit - 1]) if len(expenses) > limit else None
+    return schemas.ExpensePage(
+        items=[_expense_to_schema(expense) for expense in expenses[:limit]],
+        next_cursor=next_cursor,
+    )
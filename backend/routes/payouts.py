@@ -5,16 +5,22 @@ import json
 import logging
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
-from sqlalchemy import func
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 import models, schemas
 from db import get_db
+from responses import FastJSONResponse
 from security import require_admin
+from services.money import from_cents, to_cents
+from services.rollup import weekly_totals_by_partner, weekly_totals_for_weeks
 from services.scheduler import current_wednesday, is_within_reminder_window, next_wednesday_at, week_bounds
-from services.settlement import compute_settlement
+from services.settlement import compute_partner_settlement
+from services.settlement_serializer import serialize_settlements, settlement_rows
 from settings import get_settings, Settings
 
 router = APIRouter()
@@ -22,85 +28,55 @@ settlement_router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_WEEKS = 520
+
 
 def _get_partners(db: Session) -> list[models.Partner]:
     partners = db.query(models.Partner).order_by(models.Partner.id).all()
-    if len(partners) < 2:
+    if not partners:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Partners not seeded")
     return partners
 
 
-def _sum_expenses(db: Session, partner_id: int, start: date, end: date) -> Decimal:
-    total = (
-        db.query(func.coalesce(func.sum(models.Expense.amount), 0))
-        .filter(models.Expense.partner_id == partner_id)
-        .filter(models.Expense.date >= start)
-        .filter(models.Expense.date <= end)
-        .scalar()
-    )
-    return Decimal(str(total))
-
-
 def _decimal_map(data: dict[str, Decimal]) -> dict[str, str]:
     return {key: format(value, "0.2f") for key, value in data.items()}
 
 
-def _settlement_to_schema(settlement: models.Settlement, payout: models.Payout) -> schemas.SettlementResponse:
-    breakdown = json.loads(settlement.breakdown_json)
-    return schemas.SettlementResponse(
-        id=settlement.id,
-        payout_id=payout.id,
-        created_at=settlement.created_at,
-        reimb_rafael=Decimal(breakdown["reimb_rafael"]),
-        reimb_guilherme=Decimal(breakdown["reimb_guilherme"]),
-        net_for_split=Decimal(breakdown["net_for_split"]),
-        share_rafael=Decimal(breakdown["share_rafael"]),
-        share_guilherme=Decimal(breakdown["share_guilherme"]),
-        total_rafael=Decimal(breakdown["total_rafael"]),
-        total_guilherme=Decimal(breakdown["total_guilherme"]),
-        rent_fee=Decimal(breakdown["rent_fee"]),
-        income_total=Decimal(breakdown["income_total"]),
-        week_start=date.fromisoformat(breakdown["week_start"]),
-        week_end=date.fromisoformat(breakdown["week_end"]),
-    )
-
+def _settlement_response(db: Session, settlement_id: int) -> FastJSONResponse | None:
+    rows = settlement_rows(db).filter(models.Settlement.id == settlement_id).all()
+    if not rows:
+        return None
+    return FastJSONResponse(serialize_settlements(db, rows)[0])
 
-@router.post("/close_week", response_model=schemas.SettlementResponse)
-def close_week(payload: schemas.PayoutCloseRequest, db: Session = Depends(get_db), _: str = Depends(require_admin)) -> schemas.SettlementResponse:
-    """Close the business week and generate settlement records."""
 
-    if payload.week_end.weekday() != 2:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="week_end must be a Wednesday")
+def _partner_splits(partners: list[models.Partner], rent_payee: str) -> dict[str, Decimal]:
+    splits = {partner.name: Decimal(partner.split_ratio) for partner in partners}
+    if rent_payee not in splits:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rent payee is not a partner")
+    return splits
 
-    week_start, week_end = week_bounds(payload.week_end)
 
-    existing = db.query(models.Payout).filter(models.Payout.week_end == payload.week_end).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Week already closed")
+def _settle_week(
+    payload: schemas.PayoutCloseRequest,
+    partners: list[models.Partner],
+    totals: dict[int, Decimal],
+    splits: dict[str, Decimal],
+    rent_payee: str,
+) -> tuple[dict, dict, list[dict]]:
+    """Return the payout, settlement and per-partner share column values for closing one week."""
 
-    partners = _get_partners(db)
-    partners_by_name = {partner.name: partner for partner in partners}
-
-    try:
-        split = (
-            Decimal(partners_by_name["Rafael"].split_ratio),
-            Decimal(partners_by_name["Guilherme"].split_ratio),
-        )
-    except KeyError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Required partners missing") from exc
-
-    expenses_map: dict[str, Decimal] = {
-        partner.name: _sum_expenses(db, partner.id, week_start, week_end) for partner in partners
-    }
+    week_start, week_end = week_bounds(payload.week_end)
+    expenses_map: dict[str, Decimal] = {partner.name: totals.get(partner.id, Decimal("0")) for partner in partners}
 
-    breakdown = compute_settlement(
-        expenses_map,
-        payload.ifood_amount,
-        payload.ninety9_amount,
-        rent_fee=payload.rent_fee,
-        split=split,
+    result = compute_partner_settlement(
+        {name: to_cents(amount) for name, amount in expenses_map.items()},
+        to_cents(payload.ifood_amount) + to_cents(payload.ninety9_amount),
+        to_cents(payload.rent_fee),
+        splits,
         rule=payload.rule,
+        rent_payee=rent_payee,
     )
+    breakdown = result.legacy_breakdown()
 
     payload_totals = {
         key: format(value, "0.2f") for key, value in breakdown.items()
@@ -115,49 +91,150 @@ def close_week(payload: schemas.PayoutCloseRequest, db: Session = Depends(get_db
         }
     )
 
-    payout = models.Payout(
-        week_start=week_start,
-        week_end=week_end,
-        ifood_amount=payload.ifood_amount,
-        ninety9_amount=payload.ninety9_amount,
-        rent_fee=payload.rent_fee,
-        rule=payload.rule,
+    payout_values = {
+        "week_start": week_start,
+        "week_end": week_end,
+        "ifood_amount": payload.ifood_amount,
+        "ninety9_amount": payload.ninety9_amount,
+        "rent_fee": payload.rent_fee,
+        "rule": payload.rule,
+    }
+    settlement_values = {
+        "reimb_rafael": breakdown["reimb_rafael"],
+        "reimb_guilherme": breakdown["reimb_guilherme"],
+        "net_for_split": breakdown["net_for_split"],
+        "share_rafael": breakdown["share_rafael"],
+        "share_guilherme": breakdown["share_guilherme"],
+        "total_rafael": breakdown["total_rafael"],
+        "total_guilherme": breakdown["total_guilherme"],
+        "breakdown_json": json.dumps(payload_totals),
+    }
+    share_values = [
+        {
+            "partner_id": partner.id,
+            "partner_name": partner.name,
+            "split_ratio": splits[partner.name],
+            "reimb": from_cents(result.partners[partner.name].reimb),
+            "share": from_cents(result.partners[partner.name].share),
+            "total": from_cents(result.partners[partner.name].total),
+        }
+        for partner in partners
+    ]
+    return payout_values, settlement_values, share_values
+
+
+@router.post("/close_week", response_model=schemas.SettlementResponse)
+def close_week(
+    payload: schemas.PayoutCloseRequest,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+    settings: Settings = Depends(get_settings),
+) -> FastJSONResponse:
+    """Close the business week and generate settlement records."""
+
+    if payload.week_end.weekday() != 2:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="week_end must be a Wednesday")
+
+    existing = db.query(models.Payout).filter(models.Payout.week_end == payload.week_end).first()
+    if existing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Week already closed")
+
+    partners = _get_partners(db)
+    splits = _partner_splits(partners, settings.rent_payee)
+    totals = weekly_totals_by_partner(db, payload.week_end, [partner.id for partner in partners])
+    payout_values, settlement_values, share_values = _settle_week(
+        payload, partners, totals, splits, settings.rent_payee
     )
+
+    payout = models.Payout(**payout_values)
     db.add(payout)
     db.flush()
 
-    settlement = models.Settlement(
-        payout_id=payout.id,
-        reimb_rafael=breakdown["reimb_rafael"],
-        reimb_guilherme=breakdown["reimb_guilherme"],
-        net_for_split=breakdown["net_for_split"],
-        share_rafael=breakdown["share_rafael"],
-        share_guilherme=breakdown["share_guilherme"],
-        total_rafael=breakdown["total_rafael"],
-        total_guilherme=breakdown["total_guilherme"],
-        breakdown_json=json.dumps(payload_totals),
-    )
+    settlement = models.Settlement(payout_id=payout.id, **settlement_values)
     db.add(settlement)
+    db.flush()
+    # One executemany instead of an INSERT ... RETURNING per partner through the relationship.
+    db.execute(insert(models.SettlementShare), [{**values, "settlement_id": settlement.id} for values in share_values])
     db.commit()
-    db.refresh(payout)
-    db.refresh(settlement)
-
-    return schemas.SettlementResponse(
-        id=settlement.id,
-        payout_id=payout.id,
-        created_at=settlement.created_at,
-        reimb_rafael=breakdown["reimb_rafael"],
-        reimb_guilherme=breakdown["reimb_guilherme"],
-        net_for_split=breakdown["net_for_split"],
-        share_rafael=breakdown["share_rafael"],
-        share_guilherme=breakdown["share_guilherme"],
-        total_rafael=breakdown["total_rafael"],
-        total_guilherme=breakdown["total_guilherme"],
-        rent_fee=breakdown["rent_fee"],
-        income_total=breakdown["income_total"],
-        week_start=week_start,
-        week_end=week_end,
-    )
+
+    return _settlement_response(db, settlement.id)
+
+
+@router.post("/close_weeks", response_model=schemas.PayoutBatchCloseResponse)
+def close_weeks(
+    payloads: Annotated[list[schemas.PayoutCloseRequest], Body(min_length=1, max_length=MAX_BATCH_WEEKS)],
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+    settings: Settings = Depends(get_settings),
+) -> FastJSONResponse:
+    """Close many business weeks at once, e.g. to backfill history.
+
+    Weeks that cannot be closed are reported in ``errors``; the others are inserted in one transaction.
+    """
+
+    errors: list[dict] = []
+    requested: dict[date, schemas.PayoutCloseRequest] = {}
+    for payload in payloads:
+        if payload.week_end.weekday() != 2:
+            errors.append({"week_end": payload.week_end.isoformat(), "detail": "week_end must be a Wednesday"})
+        elif payload.week_end in requested:
+            errors.append({"week_end": payload.week_end.isoformat(), "detail": "Week repeated in batch"})
+        else:
+            requested[payload.week_end] = payload
+
+    already_closed = {
+        week_end
+        for (week_end,) in db.query(models.Payout.week_end).filter(models.Payout.week_end.in_(list(requested)))
+    }
+    for week_end in sorted(already_closed):
+        errors.append({"week_end": week_end.isoformat(), "detail": "Week already closed"})
+        del requested[week_end]
+
+    closed: list[dict] = []
+    if requested:
+        partners = _get_partners(db)
+        splits = _partner_splits(partners, settings.rent_payee)
+        totals = weekly_totals_for_weeks(db, requested, [partner.id for partner in partners])
+
+        week_ends = sorted(requested)
+        payout_batch, settlement_batch, share_batches = [], [], []
+        for week_end in week_ends:
+            payout_values, settlement_values, share_values = _settle_week(
+                requested[week_end], partners, totals.get(week_end, {}), splits, settings.rent_payee
+            )
+            payout_batch.append(payout_values)
+            settlement_batch.append(settlement_values)
+            share_batches.append(share_values)
+
+        try:
+            payout_ids = db.scalars(
+                insert(models.Payout).returning(models.Payout.id, sort_by_parameter_order=True),
+                payout_batch,
+            ).all()
+            for payout_id, settlement_values in zip(payout_ids, settlement_batch):
+                settlement_values["payout_id"] = payout_id
+            settlement_ids = db.scalars(
+                insert(models.Settlement).returning(models.Settlement.id, sort_by_parameter_order=True),
+                settlement_batch,
+            ).all()
+            db.execute(
+                insert(models.SettlementShare),
+                [
+                    {**values, "settlement_id": settlement_id}
+                    for settlement_id, share_values in zip(settlement_ids, share_batches)
+                    for values in share_values
+                ],
+            )
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Week closed concurrently") from exc
+
+        rows = settlement_rows(db).filter(models.Payout.week_end.in_(week_ends)).order_by(models.Payout.week_end).all()
+        closed = serialize_settlements(db, rows)
+
+    errors.sort(key=lambda error: error["week_end"])
+    return FastJSONResponse({"closed": closed, "errors": errors})
 
 
 @router.post("/remind_week_close")
@@ -188,15 +265,10 @@ def get_settlement(
     settlement_id: int = Path(..., gt=0),
     db: Session = Depends(get_db),
     _: str = Depends(require_admin),
-) -> schemas.SettlementResponse:
+) -> FastJSONResponse:
     """Retrieve a previously generated settlement."""
 
-    settlement = db.query(models.Settlement).filter(models.Settlement.id == settlement_id).first()
-    if not settlement:
+    response = _settlement_response(db, settlement_id)
+    if response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Settlement not found")
-
-    payout = db.query(models.Payout).filter(models.Payout.id == settlement.payout_id).first()
-    if not payout:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Payout not found")
-
-    return _settlement_to_schema(settlement, payout)
+    return response
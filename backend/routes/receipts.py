@@ -0,0 +1,82 @@
+"""Receipt file routes for the local storage backend."""
+from __future__ import annotations
+
+import mimetypes
+import os
+import tempfile
+from pathlib import Path
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+
+from services.storage import LocalStorageService, StorageService, get_storage_service
+from settings import Settings, get_settings
+
+router = APIRouter()
+
+
+def _local_storage(storage: StorageService = Depends(get_storage_service)) -> LocalStorageService:
+    if not isinstance(storage, LocalStorageService):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Local storage is not enabled")
+    return storage
+
+
+def _resolve(storage: LocalStorageService, path: str) -> Path:
+    try:
+        return storage.resolve(path)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Receipt not found") from exc
+
+
+@router.put("/upload/{path:path}")
+async def upload_signed_receipt(
+    path: str,
+    request: Request,
+    token: str = Query(...),
+    storage: LocalStorageService = Depends(_local_storage),
+    settings: Settings = Depends(get_settings),
+) -> dict[str, str]:
+    """Accept a receipt PUT to a URL issued by ``POST /api/expenses/receipt_upload``.
+
+    Bodies larger than ``MAX_RECEIPT_BYTES`` are refused with 413, whatever Content-Length claims.
+    """
+
+    if not storage.verify_upload_token(path, token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired upload token")
+
+    too_large = HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail="Receipt is too large")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.max_receipt_bytes:
+        raise too_large
+
+    target = _resolve(storage, path)
+    await anyio.Path(target.parent).mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent)
+    os.close(fd)
+    try:
+        received = 0
+        async with await anyio.open_file(tmp_name, "wb") as tmp_file:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > settings.max_receipt_bytes:
+                    raise too_large
+                await tmp_file.write(chunk)
+        await anyio.to_thread.run_sync(os.replace, tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return {"Key": path}
+
+
+@router.get("/{path:path}")
+def get_receipt(path: str, storage: LocalStorageService = Depends(_local_storage)) -> FileResponse:
+    """Serve a stored receipt; Range requests are answered with partial content."""
+
+    target = _resolve(storage, path)
+    if not target.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Receipt not found")
+    media_type = mimetypes.guess_type(target.name)[0] or "application/octet-stream"
+    # Keys are random or content hashes and never change once written.
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    return FileResponse(target, media_type=media_type, headers=headers)
@@ -1,149 +1,593 @@
 """Reporting routes."""
 from __future__ import annotations
 
-import csv
-import io
-import json
-from datetime import date
+import asyncio
+import base64
+import binascii
+import logging
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import date, datetime
 from decimal import Decimal
+from typing import Any, Awaitable, Callable, Iterator, Literal, NamedTuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
+from sqlalchemy import extract, func
 from sqlalchemy.orm import Session
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from starlette.concurrency import run_in_threadpool
 
 import models, schemas
 from db import get_db
+from responses import FastJSONResponse
 from security import require_admin
+from services.money import from_cents, to_cents
+from services.report_render import REPORT_MEDIA_TYPES, ExpenseLine, PartnerLine, ReportRenderPool, get_render_pool
+from services.report_cache import (
+    CacheKey,
+    ReportCache,
+    etag_matches,
+    get_report_cache,
+    report_cache_key,
+    report_etag,
+)
+from services.scheduler import week_end_for
+from services.settlement_batch import compute_settlements
+from services.settlement_serializer import serialize_settlements, settlement_rows
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
+BUNDLE_FORMATS = ("pdf", "csv")
+DEFAULT_PAGE_SIZE = 52
+MAX_PAGE_SIZE = 200
+SIMULATED_PARTNERS = ("Rafael", "Guilherme")
 
-def _deserialize_settlement(settlement: models.Settlement, payout: models.Payout) -> schemas.SettlementResponse:
-    breakdown = json.loads(settlement.breakdown_json)
-    return schemas.SettlementResponse(
-        id=settlement.id,
-        payout_id=payout.id,
-        created_at=settlement.created_at,
-        reimb_rafael=Decimal(breakdown["reimb_rafael"]),
-        reimb_guilherme=Decimal(breakdown["reimb_guilherme"]),
-        net_for_split=Decimal(breakdown["net_for_split"]),
-        share_rafael=Decimal(breakdown["share_rafael"]),
-        share_guilherme=Decimal(breakdown["share_guilherme"]),
-        total_rafael=Decimal(breakdown["total_rafael"]),
-        total_guilherme=Decimal(breakdown["total_guilherme"]),
-        rent_fee=Decimal(breakdown["rent_fee"]),
-        income_total=Decimal(breakdown["income_total"]),
-        week_start=date.fromisoformat(breakdown["week_start"]),
-        week_end=date.fromisoformat(breakdown["week_end"]),
-    )
+# Runs a function on the request's session without blocking the event loop.
+RunDb = Callable[[Callable[[Session], Any]], Awaitable[Any]]
+
+# Renders of weekly reports that are not cached yet, so concurrent requests for one report share a
+# single render. Plain futures rather than asyncio ones: requests may run on different event loops.
+_renders_in_flight: dict[CacheKey, Future[bytes]] = {}
+_renders_lock = threading.Lock()
+
+
+class _BundleWeek(NamedTuple):
+    settlement_id: int
+    created_at: datetime
+    week_end: date
+    rule: str
+    breakdown_json: str
+    expenses: list[ExpenseLine]
+    partners: list[PartnerLine]
+
+
+class _ZipChunks:
+    """Write-only file object that hands the archive bytes to the response as they are produced."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
 
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
 
-def _get_settlement_by_week_end(db: Session, week_end: date) -> tuple[models.Settlement, models.Payout, dict[str, str]]:
-    payout = db.query(models.Payout).filter(models.Payout.week_end == week_end).first()
-    if not payout or not payout.settlement:
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _get_settlement_by_week_end(db: Session, week_end: date) -> tuple[models.Settlement, models.Payout]:
+    row = (
+        db.query(models.Settlement, models.Payout)
+        .join(models.Payout, models.Settlement.payout_id == models.Payout.id)
+        .filter(models.Payout.week_end == week_end)
+        .first()
+    )
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Settlements not found for week")
-    settlement = payout.settlement
-    breakdown = json.loads(settlement.breakdown_json)
-    return settlement, payout, breakdown
+    return row[0], row[1]
+
 
+def _expense_lines(db: Session, start: date, end: date, closed_at: dict[date, datetime]) -> dict[date, list[ExpenseLine]]:
+    """Return the itemized expenses of each closed week (keyed by week end) between ``start`` and ``end``.
 
-@router.get("/settlements", response_model=list[schemas.SettlementResponse])
-def list_settlements(db: Session = Depends(get_db), _: str = Depends(require_admin)) -> list[schemas.SettlementResponse]:
-    """Return all settlements ordered by week."""
+    Only expenses recorded before the week was closed are listed, so the items match what the week
+    was settled on and a cached report never goes stale.
+    """
 
     rows = (
-        db.query(models.Settlement, models.Payout)
+        db.query(
+            models.Expense.date,
+            models.Partner.name,
+            models.Expense.category,
+            models.Expense.platform,
+            models.Expense.amount,
+            models.Expense.created_at,
+        )
+        .join(models.Expense.partner)
+        .filter(models.Expense.date >= start, models.Expense.date <= end)
+        .order_by(models.Expense.date, models.Expense.id)
+    )
+    lines: dict[date, list[ExpenseLine]] = {week_end: [] for week_end in closed_at}
+    for day, partner, category, platform, amount, created_at in rows:
+        week_end = week_end_for(day)
+        if week_end in lines and created_at <= closed_at[week_end]:
+            lines[week_end].append((day.isoformat(), partner, category or "", platform or "", f"{Decimal(amount):.2f}"))
+    return lines
+
+
+def _settlement_partners(db: Session, settlement_ids: list[int]) -> dict[int, list[PartnerLine]]:
+    """Return the partner lines of each settlement from its shares, in partner order."""
+
+    share = models.SettlementShare
+    lines: dict[int, list[PartnerLine]] = {settlement_id: [] for settlement_id in settlement_ids}
+    rows = (
+        db.query(share.settlement_id, share.partner_name, share.reimb, share.total)
+        .filter(share.settlement_id.in_(settlement_ids))
+        .order_by(share.settlement_id, share.partner_id)
+    )
+    for settlement_id, name, reimb, total in rows:
+        lines[settlement_id].append((name, f"{Decimal(reimb):.2f}", f"{Decimal(total):.2f}"))
+    return lines
+
+
+def _encode_cursor(week_end: date) -> str:
+    return base64.urlsafe_b64encode(week_end.isoformat().encode("ascii")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> date:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return date.fromisoformat(base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii"))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor") from None
+
+
+@router.get("/settlements", response_model=schemas.SettlementPage)
+def list_settlements(
+    cursor: str | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+) -> FastJSONResponse:
+    """Return settlements newest week first, one keyset page at a time."""
+
+    query = settlement_rows(db)
+    if cursor:
+        # week_end is unique, so it is enough to resume after the last row of the previous page.
+        query = query.filter(models.Payout.week_end < _decode_cursor(cursor))
+
+    rows = query.order_by(models.Payout.week_end.desc()).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1].week_end) if len(rows) > limit else None
+    return FastJSONResponse({"items": serialize_settlements(db, rows[:limit]), "next_cursor": next_cursor})
+
+
+@router.get("/settlements/aggregates", response_model=list[schemas.SettlementAggregate])
+def settlement_aggregates(
+    period: Literal["month", "year"] = Query("month"),
+    start: date | None = Query(None, description="Primeira quarta-feira de fechamento"),
+    end: date | None = Query(None, description="Ultima quarta-feira de fechamento"),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+) -> list[schemas.SettlementAggregate]:
+    """Return settlement totals per month or year, oldest first; a week counts in the period of its closing day."""
+
+    year = extract("year", models.Payout.week_end)
+    month = extract("month", models.Payout.week_end)
+    group_by = [year, month] if period == "month" else [year]
+    settlement = models.Settlement
+
+    share = models.SettlementShare
+
+    def in_range(query):
+        if start:
+            query = query.filter(models.Payout.week_end >= start)
+        if end:
+            query = query.filter(models.Payout.week_end <= end)
+        return query
+
+    rows = in_range(
+        db.query(
+            *group_by,
+            func.count(settlement.id),
+            func.sum(models.Payout.ifood_amount + models.Payout.ninety9_amount),
+            func.sum(models.Payout.rent_fee),
+            func.sum(settlement.net_for_split),
+        ).join(models.Payout, settlement.payout_id == models.Payout.id)
+    ).group_by(*group_by).order_by(*group_by).all()
+
+    # Every partner that took part in a week has a share, so periods cover any number of partners.
+    partner_rows = in_range(
+        db.query(
+            *group_by,
+            share.partner_name,
+            func.sum(share.reimb),
+            func.sum(share.share),
+            func.sum(share.total),
+        )
+        .join(settlement, share.settlement_id == settlement.id)
+        .join(models.Payout, settlement.payout_id == models.Payout.id)
+    ).group_by(*group_by, share.partner_name).order_by(*group_by, share.partner_name)
+    partners: dict[tuple, dict[str, schemas.PartnerPeriodTotals]] = {}
+    for row in partner_rows:
+        name, reimb, partner_share, total = row[len(group_by):]
+        partners.setdefault(tuple(int(value) for value in row[: len(group_by)]), {})[name] = (
+            schemas.PartnerPeriodTotals(reimb=reimb, share=partner_share, total=total)
+        )
+
+    aggregates = []
+    for row in rows:
+        row_year = int(row[0])
+        row_month = int(row[1]) if period == "month" else None
+        weeks, income, rent, net = row[len(group_by):]
+        aggregates.append(
+            schemas.SettlementAggregate(
+                period=f"{row_year}-{row_month:02d}" if row_month else str(row_year),
+                year=row_year,
+                month=row_month,
+                weeks=weeks,
+                income_total=income,
+                rent_fee=rent,
+                net_for_split=net,
+                partners=partners.get(tuple(int(value) for value in row[: len(group_by)]), {}),
+            )
+        )
+    return aggregates
+
+
+def _simulation_totals(weeks: int, columns: dict[str, list[int]]) -> schemas.SimulationTotals:
+    return schemas.SimulationTotals(
+        weeks=weeks,
+        **{
+            name: from_cents(sum(columns[name]))
+            for name in ("net_for_split", "share_rafael", "share_guilherme", "total_rafael", "total_guilherme")
+        },
+    )
+
+
+@router.post("/simulation", response_model=schemas.SimulationResponse)
+def simulate_settlements(
+    payload: schemas.SimulationRequest,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+) -> schemas.SimulationResponse:
+    """Replay the closed weeks under other rules and split ratios and compare them with what was paid.
+
+    Scenarios split between Rafael and Guilherme, so weeks settled with other partners are rejected.
+    """
+
+    query = (
+        db.query(
+            models.Payout.ifood_amount,
+            models.Payout.ninety9_amount,
+            models.Payout.rent_fee,
+            models.Settlement.reimb_rafael,
+            models.Settlement.reimb_guilherme,
+            models.Settlement.net_for_split,
+            models.Settlement.share_rafael,
+            models.Settlement.share_guilherme,
+            models.Settlement.total_rafael,
+            models.Settlement.total_guilherme,
+        )
+        .join(models.Settlement, models.Settlement.payout_id == models.Payout.id)
+    )
+    if payload.start:
+        query = query.filter(models.Payout.week_end >= payload.start)
+    if payload.end:
+        query = query.filter(models.Payout.week_end <= payload.end)
+    rows = query.all()
+
+    others = (
+        db.query(models.SettlementShare.partner_name)
+        .join(models.Settlement, models.SettlementShare.settlement_id == models.Settlement.id)
         .join(models.Payout, models.Settlement.payout_id == models.Payout.id)
-        .order_by(models.Payout.week_end.desc())
-        .all()
+        .filter(models.SettlementShare.partner_name.notin_(SIMULATED_PARTNERS))
     )
-    return [_deserialize_settlement(settlement, payout) for settlement, payout in rows]
+    if payload.start:
+        others = others.filter(models.Payout.week_end >= payload.start)
+    if payload.end:
+        others = others.filter(models.Payout.week_end <= payload.end)
+    other = others.first()
+    if other is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Simulation only covers weeks settled between Rafael and Guilherme, not {other.partner_name}",
+        )
+
+    income = [to_cents(row.ifood_amount) + to_cents(row.ninety9_amount) for row in rows]
+    rent = [to_cents(row.rent_fee) for row in rows]
+    reimb_rafael = [to_cents(row.reimb_rafael) for row in rows]
+    reimb_guilherme = [to_cents(row.reimb_guilherme) for row in rows]
+    actual = _simulation_totals(
+        len(rows),
+        {
+            name: [to_cents(getattr(row, name)) for row in rows]
+            for name in ("net_for_split", "share_rafael", "share_guilherme", "total_rafael", "total_guilherme")
+        },
+    )
+
+    scenarios = payload.scenarios
+    if not scenarios:
+        ratios = dict(db.query(models.Partner.name, models.Partner.split_ratio))
+        scenarios = [
+            schemas.SettlementScenario(
+                rule=rule,
+                split_rafael=ratios.get("Rafael", Decimal("0.5")),
+                split_guilherme=ratios.get("Guilherme", Decimal("0.5")),
+            )
+            for rule in ("rent_before_split", "rent_after_split")
+        ]
+
+    results = []
+    for scenario in scenarios:
+        columns = compute_settlements(
+            income,
+            reimb_rafael,
+            reimb_guilherme,
+            rent,
+            split=(scenario.split_rafael, scenario.split_guilherme),
+            rule=scenario.rule,
+        )
+        totals = _simulation_totals(len(rows), columns)
+        results.append(
+            schemas.ScenarioResult(
+                **scenario.model_dump(),
+                totals=totals,
+                delta_rafael=totals.total_rafael - actual.total_rafael,
+                delta_guilherme=totals.total_guilherme - actual.total_guilherme,
+            )
+        )
+    return schemas.SimulationResponse(actual=actual, scenarios=results)
+
+
+def _report_headers(fmt: str, week_end: date, etag: str) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename=relatorio-{week_end.isoformat()}.{fmt}",
+    }
+
+
+def _run_in_threadpool(db: Session) -> RunDb:
+    """Run functions on a sync session in the threadpool, the way ``AsyncSession.run_sync`` does."""
+
+    async def run(fn: Callable[[Session], Any]) -> Any:
+        return await run_in_threadpool(fn, db)
+
+    return run
+
+
+def _forget_render(key: CacheKey) -> None:
+    with _renders_lock:
+        _renders_in_flight.pop(key, None)
+
+
+def _finish_render(key: CacheKey, render: Future[bytes], cache: ReportCache, submitted: Future[bytes]) -> None:
+    try:
+        if submitted.cancelled():
+            render.cancel()
+        elif submitted.exception() is not None:
+            render.set_exception(submitted.exception())
+        else:
+            render.set_result(submitted.result())
+            # Cached before the render leaves the in-flight map, so a later request always finds it.
+            cache.put(key, submitted.result())
+    finally:
+        _forget_render(key)
+
+
+async def _render_once(
+    key: CacheKey,
+    cache: ReportCache,
+    pool: ReportRenderPool,
+    load: Callable[[], Awaitable[tuple]],
+) -> bytes:
+    """Render a report in the pool, or wait for the render another request already started.
+
+    Only the first request loads the report data through ``load`` and submits it. The render still
+    finishes and is cached if that request goes away, since others may be waiting for it.
+    """
+
+    with _renders_lock:
+        render = _renders_in_flight.get(key)
+        started = render is None
+        if started:
+            render = _renders_in_flight[key] = Future()
+    if started:
+        try:
+            # The previous render may have finished between the caller's cache miss and now.
+            content = cache.get(key)
+            if content is not None:
+                render.set_result(content)
+                _forget_render(key)
+            else:
+                args = await load()
+                # submit blocks while the pool is saturated, so keep it off the event loop.
+                submitted = await run_in_threadpool(pool.submit, *args)
+                submitted.add_done_callback(lambda done: _finish_render(key, render, cache, done))
+        except BaseException:
+            if not render.done():
+                render.set_exception(RuntimeError("Report render was not submitted"))
+            _forget_render(key)
+            raise
+    return await asyncio.shield(asyncio.wrap_future(render))
+
+
+async def _report_response(
+    fmt: str,
+    week_end: date,
+    if_none_match: str | None,
+    run_db: RunDb,
+    cache: ReportCache,
+    pool: ReportRenderPool,
+) -> Response:
+    """Serve a weekly report from the render cache, answering 304 when the client copy is current.
+
+    Shared by the sync and async routers, which differ only in how ``run_db`` reaches the session.
+    Reports that are not cached yet are rendered in the process pool, once however many requests
+    ask for them at the same time, and sent once complete.
+    """
+
+    settlement, payout = await run_db(lambda session: _get_settlement_by_week_end(session, week_end))
+    key = report_cache_key(settlement.id, settlement.created_at, fmt)
+    etag = report_etag(key)
+    headers = _report_headers(fmt, week_end, etag)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content = cache.get(key)
+    if content is not None:
+        return Response(content=content, media_type=REPORT_MEDIA_TYPES[fmt], headers=headers)
+
+    async def load() -> tuple:
+        expenses, partners = await run_db(
+            lambda session: (
+                _expense_lines(session, payout.week_start, payout.week_end, {payout.week_end: settlement.created_at}),
+                _settlement_partners(session, [settlement.id]),
+            )
+        )
+        return (
+            fmt,
+            payout.week_end,
+            payout.rule,
+            settlement.breakdown_json,
+            expenses[payout.week_end],
+            partners[settlement.id],
+        )
+
+    # The status line is only sent once the report exists, so a failed render is a plain 500 and
+    # never a truncated 200 carrying the report's ETag.
+    try:
+        content = await _render_once(key, cache, pool, load)
+    except Exception as exc:
+        logger.exception("Rendering the %s report of %s failed", fmt, week_end)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Report rendering failed") from exc
+    return Response(content=content, media_type=REPORT_MEDIA_TYPES[fmt], headers=headers)
 
 
 @router.get("/weekly.csv")
-def weekly_csv(
+async def weekly_csv(
     week_end: date = Query(..., description="Quarta-feira de fechamento", alias="week_end"),
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     _: str = Depends(require_admin),
+    cache: ReportCache = Depends(get_report_cache),
+    pool: ReportRenderPool = Depends(get_render_pool),
 ) -> Response:
-    """Export settlement summary as CSV."""
-
-    _, payout, breakdown = _get_settlement_by_week_end(db, week_end)
-
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=";")
-    writer.writerow(["Periodo", breakdown["week_start"], breakdown["week_end"]])
-    writer.writerow(["Recebido iFood", breakdown.get("ifood_amount", "0.00")])
-    writer.writerow(["Recebido 99 Food", breakdown.get("ninety9_amount", "0.00")])
-    writer.writerow(["Receita total", breakdown["income_total"]])
-    writer.writerow(["Aluguel", breakdown["rent_fee"]])
-    writer.writerow([])
-    expenses = breakdown.get("expenses", {})
-    for name, value in expenses.items():
-        writer.writerow([f"Despesas {name}", value])
-    writer.writerow(["Saldo para divisao", breakdown.get("net_for_split")])
-    writer.writerow([])
-    writer.writerow(["Total Rafael", breakdown.get("total_rafael")])
-    writer.writerow(["Total Guilherme", breakdown.get("total_guilherme")])
-    writer.writerow(["Regra", payout.rule])
-
-    csv_bytes = output.getvalue().encode("utf-8-sig")
-    headers = {
-        "Content-Disposition": f"attachment; filename=relatorio-{week_end.isoformat()}.csv"
-    }
-    return Response(content=csv_bytes, media_type="text/csv; charset=utf-8", headers=headers)
+    """Export settlement summary and the week's expenses as CSV."""
+
+    return await _report_response("csv", week_end, if_none_match, _run_in_threadpool(db), cache, pool)
 
 
 @router.get("/weekly.pdf")
-def weekly_pdf(
+async def weekly_pdf(
     week_end: date = Query(..., description="Quarta-feira de fechamento", alias="week_end"),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_admin),
+    cache: ReportCache = Depends(get_report_cache),
+    pool: ReportRenderPool = Depends(get_render_pool),
+) -> Response:
+    """Export settlement summary and an itemized list of the week's expenses as a PDF."""
+
+    return await _report_response("pdf", week_end, if_none_match, _run_in_threadpool(db), cache, pool)
+
+
+def _stream_bundle(weeks: list[_BundleWeek], cache: ReportCache, pool: ReportRenderPool) -> Iterator[bytes]:
+    """Yield a ZIP with every report of ``weeks``, adding each entry as soon as it is rendered."""
+
+    buffer = _ZipChunks()
+    jobs = iter([(week, fmt) for week in weeks for fmt in BUNDLE_FORMATS])
+    pending: dict[Future[bytes], tuple[_BundleWeek, str]] = {}
+    # Only a few renders are in flight per request so a long range does not hold every report in memory.
+    window = pool.workers * 2
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+
+        def add_entry(week: _BundleWeek, fmt: str, content: bytes) -> None:
+            archive.writestr(f"relatorio-{week.week_end.isoformat()}.{fmt}", content)
+
+        try:
+            while True:
+                while len(pending) < window:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    week, fmt = job
+                    content = cache.get(report_cache_key(week.settlement_id, week.created_at, fmt))
+                    if content is not None:
+                        add_entry(week, fmt, content)
+                        yield buffer.drain()
+                        continue
+                    future = pool.submit(
+                        fmt, week.week_end, week.rule, week.breakdown_json, week.expenses, week.partners
+                    )
+                    pending[future] = job
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    week, fmt = pending.pop(future)
+                    content = future.result()
+                    cache.put(report_cache_key(week.settlement_id, week.created_at, fmt), content)
+                    add_entry(week, fmt, content)
+                yield buffer.drain()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    yield buffer.drain()
+
+
+@router.get("/bundle.zip")
+def report_bundle(
+    start: date = Query(..., description="Primeira quarta-feira de fechamento"),
+    end: date = Query(..., description="Ultima quarta-feira de fechamento"),
     db: Session = Depends(get_db),
     _: str = Depends(require_admin),
+    cache: ReportCache = Depends(get_report_cache),
+    pool: ReportRenderPool = Depends(get_render_pool),
 ) -> StreamingResponse:
-    """Export settlement summary as a simple PDF."""
-
-    _, payout, breakdown = _get_settlement_by_week_end(db, week_end)
-
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    pdf.setTitle(f"Relatorio Semana {week_end.isoformat()}")
-    text = pdf.beginText(40, height - 80)
-    text.setFont("Helvetica", 12)
-
-    expenses = breakdown.get("expenses", {})
-
-    lines = [
-        "Hamburgueria do Cheffinho - Unidade 2",
-        f"Relatorio semanal - fechamento {week_end.strftime('%d/%m/%Y')}",
-        "",
-        f"Periodo: {breakdown['week_start']} a {breakdown['week_end']}",
-        f"Recebido iFood: R$ {breakdown.get('ifood_amount', '0.00')}",
-        f"Recebido 99 Food: R$ {breakdown.get('ninety9_amount', '0.00')}",
-        f"Receita total: R$ {breakdown['income_total']}",
-        f"Aluguel: R$ {breakdown['rent_fee']}",
-        "",
-        f"Despesas Rafael: R$ {expenses.get('Rafael', breakdown['reimb_rafael'])}",
-        f"Despesas Guilherme: R$ {expenses.get('Guilherme', breakdown['reimb_guilherme'])}",
-        f"Saldo para divisao: R$ {breakdown['net_for_split']}",
-        "",
-        f"Total Rafael: R$ {breakdown['total_rafael']}",
-        f"Total Guilherme: R$ {breakdown['total_guilherme']}",
-        f"Regra aplicada: {payout.rule}",
-    ]
+    """Stream a ZIP with the PDF and CSV reports of every closed week in the range."""
 
-    for line in lines:
-        text.textLine(line)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="start must not be after end")
 
-    pdf.drawText(text)
-    pdf.showPage()
-    pdf.save()
+    rows = (
+        db.query(
+            models.Settlement.id,
+            models.Payout.week_end,
+            models.Payout.rule,
+            models.Settlement.breakdown_json,
+            models.Payout.week_start,
+            models.Settlement.created_at,
+        )
+        .join(models.Payout, models.Settlement.payout_id == models.Payout.id)
+        .filter(models.Payout.week_end >= start, models.Payout.week_end <= end)
+        .order_by(models.Payout.week_end)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No closed weeks in range")
 
-    buffer.seek(0)
-    headers = {
-        "Content-Disposition": f"attachment; filename=relatorio-{week_end.isoformat()}.pdf"
-    }
-    return StreamingResponse(buffer, media_type="application/pdf", headers=headers)
+    expenses = _expense_lines(
+        db, min(row.week_start for row in rows), rows[-1].week_end, {row.week_end: row.created_at for row in rows}
+    )
+    partners = _settlement_partners(db, [row.id for row in rows])
+    weeks = [
+        _BundleWeek(settlement_id, created_at, week_end, rule, breakdown_json, expenses[week_end], partners[settlement_id])
+        for settlement_id, week_end, rule, breakdown_json, _, created_at in rows
+    ]
+    filename = f"relatorios-{start.isoformat()}-{end.isoformat()}.zip"
+    return StreamingResponse(
+        _stream_bundle(weeks, cache, pool),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
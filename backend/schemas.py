@@ -12,6 +12,9 @@ Money = Annotated[Decimal, Field(ge=0, max_digits=12, decimal_places=2)]
 PositiveMoney = Annotated[Decimal, Field(gt=0, max_digits=12, decimal_places=2)]
 Ratio = Annotated[Decimal, Field(ge=0, le=1, max_digits=5, decimal_places=4)]
 
+# Extensão dos comprovantes; services.receipt_index.receipt_suffix normaliza para este formato.
+RECEIPT_SUFFIX_PATTERN = r"\.[a-z0-9]{1,10}"
+
 
 class PartnerSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -23,12 +26,51 @@ class PartnerSchema(BaseModel):
 class ExpenseCreate(BaseModel):
     date: date
     amount: PositiveMoney
-    partner_name: Literal["Rafael", "Guilherme"]
+    # Validado contra a tabela partners pelas rotas e pela importação.
+    partner_name: str = Field(min_length=1, max_length=100)
     platform: Optional[str] = None
     category: Optional[str] = None
     note: Optional[str] = None
 
 
+class ExpenseImportRow(ExpenseCreate):
+    # Lengths of the expense columns, checked here so one long cell cannot fail a whole insert batch.
+    platform: Optional[str] = Field(default=None, max_length=50)
+    category: Optional[str] = Field(default=None, max_length=50)
+    note: Optional[str] = Field(default=None, max_length=255)
+    receipt_url: Optional[HttpUrl] = Field(default=None, max_length=255)
+
+
+class ExpenseImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class ExpenseImportResult(BaseModel):
+    imported: int
+    errors: list[ExpenseImportError]
+    errors_truncated: bool = False
+
+
+class ReceiptUploadRequest(BaseModel):
+    date: date
+    filename: Optional[str] = None
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-f]{64}$")
+
+
+class ReceiptUploadTarget(BaseModel):
+    path: str
+    upload_url: Optional[str] = None
+    token: Optional[str] = None
+    receipt_url: Optional[str] = None
+
+
+class ExpenseConfirm(ExpenseCreate):
+    receipt_path: str = Field(
+        pattern=rf"^(\d{{4}}/\d{{2}}/[0-9a-f]{{32}}|sha256/[0-9a-f]{{2}}/[0-9a-f]{{64}}){RECEIPT_SUFFIX_PATTERN}$"
+    )
+
+
 class ExpenseResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: int
@@ -39,9 +81,16 @@ class ExpenseResponse(BaseModel):
     category: Optional[str] = None
     note: Optional[str] = None
     receipt_url: Optional[HttpUrl] = None
+    receipt_status: Optional[Literal["pending", "uploaded", "failed"]] = None
+    thumbnail_url: Optional[HttpUrl] = None
     created_at: datetime
 
 
+class ExpensePage(BaseModel):
+    items: list[ExpenseResponse]
+    next_cursor: Optional[str] = None
+
+
 class ExpensesSummary(BaseModel):
     rafael: Money
     guilherme: Money
@@ -69,11 +118,86 @@ class SettlementBreakdown(BaseModel):
     week_end: date
 
 
+class PartnerShare(BaseModel):
+    partner_id: int
+    partner_name: str
+    split_ratio: Optional[Decimal] = None
+    reimb: Decimal
+    share: Decimal
+    total: Decimal
+
+
 class SettlementResponse(SettlementBreakdown):
     model_config = ConfigDict(from_attributes=True)
     id: int
     payout_id: int
     created_at: datetime
+    partners: list[PartnerShare] = []
+
+
+class PayoutCloseError(BaseModel):
+    week_end: date
+    detail: str
+
+
+class PayoutBatchCloseResponse(BaseModel):
+    closed: list[SettlementResponse]
+    errors: list[PayoutCloseError]
+
+
+class SettlementPage(BaseModel):
+    items: list[SettlementResponse]
+    next_cursor: Optional[str] = None
+
+
+class PartnerPeriodTotals(BaseModel):
+    reimb: Decimal
+    share: Decimal
+    total: Decimal
+
+
+class SettlementAggregate(BaseModel):
+    period: str
+    year: int
+    month: Optional[int] = None
+    weeks: int
+    income_total: Decimal
+    rent_fee: Decimal
+    net_for_split: Decimal
+    partners: dict[str, PartnerPeriodTotals]
+
+
+class SettlementScenario(BaseModel):
+    rule: Literal["rent_before_split", "rent_after_split"]
+    split_rafael: Ratio
+    split_guilherme: Ratio
+
+
+class SimulationRequest(BaseModel):
+    start: Optional[date] = None
+    end: Optional[date] = None
+    # Empty means both rules with the partners' current split.
+    scenarios: list[SettlementScenario] = Field(default_factory=list, max_length=20)
+
+
+class SimulationTotals(BaseModel):
+    weeks: int
+    net_for_split: Decimal
+    share_rafael: Decimal
+    share_guilherme: Decimal
+    total_rafael: Decimal
+    total_guilherme: Decimal
+
+
+class ScenarioResult(SettlementScenario):
+    totals: SimulationTotals
+    delta_rafael: Decimal
+    delta_guilherme: Decimal
+
+
+class SimulationResponse(BaseModel):
+    actual: SimulationTotals
+    scenarios: list[ScenarioResult]
 
 
 class AuthRequest(BaseModel):
@@ -0,0 +1,154 @@
+"""Serve the API with several pre-forked uvicorn workers sharing one preloaded app."""
+from __future__ import annotations
+
+import argparse
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+logger = logging.getLogger("serve")
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def preload() -> object:
+    """Import the app and the lazily loaded libraries once, before forking, so workers share them.
+
+    Nothing here opens a connection or a pool: the engine, storage clients and process pools are
+    created by each worker's lifespan after the fork.
+    """
+
+    import main
+
+    for module in main.WARMUP_IMPORTS:
+        importlib.import_module(module)
+    return main.app
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app: object, sock: socket.socket, graceful_timeout: int) -> None:
+    """Serve requests from the shared socket until SIGTERM/SIGINT, then shut down gracefully."""
+
+    import uvicorn
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(app, lifespan="on", timeout_graceful_shutdown=graceful_timeout, log_config=None)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Fork the workers, replace the ones that die and stop them all on SIGTERM/SIGINT."""
+
+    def __init__(self, app: object, sock: socket.socket, workers: int, graceful_timeout: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children: set[int] = set()
+        self._stopping = threading.Event()
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(self.app, self.sock, self.graceful_timeout)
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                exit_code = 1
+            finally:
+                # Skip the parent's atexit handlers and buffered state inherited through fork.
+                os._exit(exit_code)
+        self.children.add(pid)
+        logger.info("Started worker %s", pid)
+
+    def _reap(self) -> list[int]:
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self.children.discard(pid)
+            exited.append(pid)
+            logger.info("Worker %s exited with status %s", pid, os.waitstatus_to_exitcode(status))
+        return exited
+
+    def request_stop(self, signum: int, frame: object) -> None:
+        self._stopping.set()
+
+    def run(self) -> int:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.request_stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self._stopping.wait(0.5):
+            for _ in self._reap():
+                if not self._stopping.is_set():
+                    time.sleep(RESPAWN_DELAY_SECONDS)
+                    self.spawn()
+
+        self.stop()
+        return 0
+
+    def stop(self) -> None:
+        """Let every worker finish its requests and lifespan shutdown, then kill the stragglers."""
+
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        # A little longer than the workers' own graceful timeout so their lifespan shutdown can run.
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in self.children:
+            logger.warning("Worker %s did not stop in time, killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+        while self.children:
+            pid, _ = os.waitpid(-1, 0)
+            self.children.discard(pid)
+        self.sock.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1,
+        help="defaults to WEB_CONCURRENCY, then the number of CPUs",
+    )
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds to finish in-flight requests")
+    args = parser.parse_args(argv)
+    if not hasattr(os, "fork"):
+        parser.error("pre-fork serving needs os.fork; run uvicorn main:app instead")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(process)d %(message)s")
+    app = preload()
+    sock = bind_socket(args.host, args.port)
+    logger.info("Listening on %s:%s with %s workers", args.host, args.port, args.workers)
+    return Supervisor(app, sock, args.workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Bulk expense import from CSV or NDJSON files."""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Iterator, Literal
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from services.rollup import apply_expense_rows
+
+ImportFormat = Literal["csv", "ndjson"]
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+_COLUMNS = ("date", "amount", "partner_id", "platform", "category", "note", "receipt_url", "receipt_status", "created_at")
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def add_error(self, line: int, detail: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, detail))
+        else:
+            self.errors_truncated = True
+
+
+def detect_format(filename: str | None, content_type: str | None = None) -> ImportFormat | None:
+    """Guess the import format from a file name or content type."""
+
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in {"application/x-ndjson", "application/jsonl"}:
+        return "ndjson"
+    return None
+
+
+def _iter_lines(stream: BinaryIO) -> Iterator[str]:
+    # Decode incrementally so large files are never held in memory; utf-8-sig drops spreadsheet BOMs.
+    return codecs.iterdecode(iter(lambda: stream.readline(), b""), "utf-8-sig")
+
+
+def iter_records(stream: BinaryIO, fmt: ImportFormat) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield ``(line, record, error)`` for every data line of the file."""
+
+    if fmt == "csv":
+        reader = csv.DictReader(_iter_lines(stream))
+        for record in reader:
+            # Empty spreadsheet cells mean "not set" for the optional columns.
+            yield reader.line_num, {key: value for key, value in record.items() if key and value not in ("", None)}, None
+        return
+
+    for line_number, line in enumerate(_iter_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def _insert_batch(db: Session, rows: list[dict]) -> None:
+    """Insert a batch with COPY on Postgres and a single executemany elsewhere."""
+
+    if db.get_bind().dialect.name == "postgresql":
+        cursor = db.connection().connection.driver_connection.cursor()
+        with cursor.copy(f"COPY expenses ({', '.join(_COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[column] for column in _COLUMNS])
+    else:
+        db.execute(insert(models.Expense), rows)
+    apply_expense_rows(db, rows)
+
+
+def import_expenses(
+    db: Session,
+    stream: BinaryIO,
+    fmt: ImportFormat,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ImportResult:
+    """Validate and insert every expense of the file; invalid lines are reported and skipped.
+
+    Rows are inserted in batches inside the caller's transaction, which is left to commit.
+    """
+
+    partner_ids = {name: partner_id for partner_id, name in db.query(models.Partner.id, models.Partner.name)}
+    result = ImportResult()
+    batch: list[dict] = []
+    created_at = datetime.utcnow()
+
+    for line, record, error in iter_records(stream, fmt):
+        if error is not None:
+            result.add_error(line, error)
+            continue
+        try:
+            row = schemas.ExpenseImportRow.model_validate(record)
+        except ValidationError as exc:
+            result.add_error(line, _format_validation_error(exc))
+            continue
+        partner_id = partner_ids.get(row.partner_name)
+        if partner_id is None:
+            result.add_error(line, "Partner not found")
+            continue
+
+        receipt_url = str(row.receipt_url) if row.receipt_url else None
+        batch.append(
+            {
+                "date": row.date,
+                "amount": row.amount,
+                "partner_id": partner_id,
+                "platform": row.platform,
+                "category": row.category,
+                "note": row.note,
+                "receipt_url": receipt_url,
+                "receipt_status": "uploaded" if receipt_url else None,
+                "created_at": created_at,
+            }
+        )
+        if len(batch) >= batch_size:
+            _insert_batch(db, batch)
+            result.imported += len(batch)
+            batch = []
+
+    if batch:
+        _insert_batch(db, batch)
+        result.imported += len(batch)
+    return result
@@ -0,0 +1,194 @@
+"""Receipt image downscaling and thumbnail generation."""
+from __future__ import annotations
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from fastapi import Depends
+
+from services.storage import StorageService
+from settings import Settings, get_settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+PROCESSED_CONTENT_TYPE = "image/jpeg"
+PROCESSED_SUFFIX = ".jpg"
+
+# Leading bytes of the formats worth re-encoding; anything else is uploaded as is.
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a", b"II*\x00", b"MM\x00*", b"BM")
+SNIFF_BYTES = 16
+
+_open_processors: list["ReceiptImageProcessor"] = []
+
+
+@dataclass(frozen=True)
+class ProcessedReceipt:
+    # None when re-encoding would not make the original any smaller.
+    data: bytes | None
+    thumbnail: bytes
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def process_image(data: bytes, max_dimension: int, quality: int, thumbnail_size: int) -> ProcessedReceipt | None:
+    """Downscale and re-encode an image receipt; return None when the bytes are not an image."""
+
+    # Imported here so Pillow loads in the worker processes, not when the API starts.
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Let the JPEG decoder skip detail we are about to throw away.
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
+
+    image = image.convert("RGB")
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    encoded = _encode_jpeg(image, quality)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+
+    return ProcessedReceipt(
+        data=encoded if len(encoded) < len(data) else None,
+        thumbnail=_encode_jpeg(thumbnail, quality),
+    )
+
+
+class ReceiptImageProcessor:
+    """Run image processing in a bounded process pool away from the request threads."""
+
+    def __init__(self, max_dimension: int, quality: int, thumbnail_size: int, workers: int) -> None:
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.thumbnail_size = thumbnail_size
+        self._workers = workers
+        # Caps queued images so a burst of uploads cannot pile up in memory waiting for a worker.
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            return self._executor
+
+    def process(self, data: bytes) -> ProcessedReceipt | None:
+        with self._slots:
+            future = self._get_executor().submit(
+                process_image, data, self.max_dimension, self.quality, self.thumbnail_size
+            )
+            return future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+@lru_cache
+def _image_processor_factory(max_dimension: int, quality: int, thumbnail_size: int, workers: int) -> ReceiptImageProcessor:
+    processor = ReceiptImageProcessor(max_dimension, quality, thumbnail_size, workers)
+    _open_processors.append(processor)
+    return processor
+
+
+def get_image_processor(settings: Settings = Depends(get_settings)) -> ReceiptImageProcessor | None:
+    """Return the cached image processor, or None when receipt processing is disabled."""
+
+    if not settings.receipt_image_processing:
+        return None
+    return _image_processor_factory(
+        settings.receipt_image_max_dimension,
+        settings.receipt_image_quality,
+        settings.receipt_thumbnail_size,
+        settings.receipt_image_workers,
+    )
+
+
+def shutdown_image_processors() -> None:
+    """Stop the worker processes of every cached image processor."""
+
+    while _open_processors:
+        _open_processors.pop().shutdown()
+    _image_processor_factory.cache_clear()
+
+
+def _forget_image_processors_after_fork() -> None:
+    # Worker processes of the parent's pool cannot be driven from a forked child.
+    _open_processors.clear()
+    _image_processor_factory.cache_clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_image_processors_after_fork)
+
+
+def thumbnail_destination(destination: Path) -> Path:
+    return destination.with_name(f"{destination.stem}.thumb{PROCESSED_SUFFIX}")
+
+
+def looks_like_image(header: bytes) -> bool:
+    """Return whether the first bytes of a file belong to an image format Pillow can shrink."""
+
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return True
+    return header.startswith(IMAGE_SIGNATURES)
+
+
+def store_receipt(
+    storage: StorageService,
+    file_obj: BinaryIO,
+    destination: Path,
+    content_type: str | None,
+    processor: ReceiptImageProcessor | None = None,
+    upsert: bool = False,
+) -> tuple[str, str | None]:
+    """Upload a receipt, downscaled when it is an image, and return its URL and thumbnail URL.
+
+    Only files whose first bytes look like an image are read into memory for the processor; PDFs
+    and other documents are streamed to storage untouched.
+    """
+
+    position = file_obj.tell()
+    processed = None
+    if processor is not None:
+        header = file_obj.read(SNIFF_BYTES)
+        file_obj.seek(position)
+        if looks_like_image(header):
+            processed = processor.process(file_obj.read())
+    if processed is None:
+        file_obj.seek(position)
+        return storage.upload_receipt(file_obj, destination, content_type=content_type, upsert=upsert), None
+
+    if processed.data is not None:
+        destination = destination.with_suffix(PROCESSED_SUFFIX)
+        receipt_url = storage.upload_receipt(
+            io.BytesIO(processed.data), destination, content_type=PROCESSED_CONTENT_TYPE, upsert=upsert
+        )
+    else:
+        file_obj.seek(position)
+        receipt_url = storage.upload_receipt(file_obj, destination, content_type=content_type, upsert=upsert)
+
+    thumbnail_url = storage.upload_receipt(
+        io.BytesIO(processed.thumbnail),
+        thumbnail_destination(destination),
+        content_type=PROCESSED_CONTENT_TYPE,
+        upsert=upsert,
+    )
+    return receipt_url, thumbnail_url
@@ -0,0 +1,272 @@
+"""Per-route request metrics exposed in the Prometheus text format."""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as TallyCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+STATEMENT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Requests that matched no route share one label so scanners cannot blow up the series count.
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelValues = tuple[str, ...]
+
+
+class Histogram:
+    """Cumulative histogram keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...], buckets: Iterable[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: dict[LabelValues, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        # One slot per bucket, then +Inf, sum and count.
+        with self._lock:
+            series = self._series.setdefault(labels, [0.0] * (len(self.buckets) + 3))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"{le}\"}} {_format_number(cumulative)}")
+            lines.append(f"{self.name}_sum{{{base}}} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{{{base}}} {_format_number(series[-1])}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: LabelValues, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, labels)}}} {_format_number(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving the request to sending the last response byte.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements issued while serving a request.", ("method", "route"),
+    STATEMENT_COUNT_BUCKETS,
+)
+STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds", "Duration of each SQL statement issued by a request.", ("method", "route"),
+    STATEMENT_LATENCY_BUCKETS,
+)
+_METRICS = (REQUESTS, REQUEST_LATENCY, RESPONSE_SIZE, REQUEST_STATEMENTS, STATEMENT_LATENCY)
+
+
+@dataclass
+class RequestStats:
+    """SQL activity of the request being served; shared with threadpool workers through the context."""
+
+    statements: int = 0
+    statement_durations: list[float] = field(default_factory=list)
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar("metrics_current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_request.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current_request.get()
+    if stats is None:
+        return
+    started = conn.info.get("metrics_query_start")
+    if not started:
+        return
+    stats.statements += 1
+    stats.statement_durations.append(time.perf_counter() - started.pop())
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time the statements ``engine`` runs on behalf of a request; safe to call twice."""
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so calls that differ only in parameters or IN-list length compare equal."""
+
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("IN (...)", statement)).strip()
+
+
+class QueryRecorder:
+    """Record every statement an engine executes while attached, whichever request issued it.
+
+    Used by the benchmark and the per-route query budgets in the tests.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.statements: list[str] = []
+        self._lock = threading.Lock()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        with self._lock:
+            self.statements.append(statement)
+
+    def __enter__(self) -> "QueryRecorder":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated_shapes(self, max_repeats: int = 1) -> dict[str, int]:
+        """Return the statement shapes issued more than ``max_repeats`` times."""
+
+        shapes = TallyCounter(statement_shape(statement) for statement in self.statements)
+        return {shape: count for shape, count in shapes.items() if count > max_repeats}
+
+    def report(self) -> str:
+        return "\n".join(f"  {index}. {statement_shape(statement)}" for index, statement in enumerate(self.statements, 1))
+
+
+def route_label(scope: Scope) -> str:
+    """Return the path template that served the request, e.g. ``/api/expenses/{expense_id}``."""
+
+    # Routes of included routers only know the path relative to their prefix; FastAPI records the
+    # full template in the effective route context.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path_format
+    route = scope.get("route")
+    return getattr(route, "path_format", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """Record latency, response size and SQL statements of every HTTP request."""
+
+    def __init__(self, app: ASGIApp, exclude_paths: Iterable[str] = ("/metrics",)) -> None:
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            labels = (scope["method"], route_label(scope))
+            REQUESTS.inc((*labels, str(status)))
+            REQUEST_LATENCY.observe(labels, time.perf_counter() - started)
+            RESPONSE_SIZE.observe(labels, size)
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            for duration in stats.statement_durations:
+                STATEMENT_LATENCY.observe(labels, duration)
+
+
+def render_metrics() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in _METRICS:
+        metric.clear()
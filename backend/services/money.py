@@ -0,0 +1,40 @@
+"""Integer-cent money helpers shared by the settlement engines."""
+from __future__ import annotations
+
+from decimal import Decimal
+
+TWOPLACES = Decimal("0.01")
+
+# Split ratios are stored with four decimal places (Numeric(5, 4)).
+RATIO_SCALE = 10_000
+
+
+def to_cents(value: Decimal | int | str) -> int:
+    """Convert an amount with at most two decimal places to integer cents."""
+
+    cents = Decimal(value) * 100
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Amount has more than two decimal places: {value}")
+    return int(cents)
+
+
+def from_cents(cents: int) -> Decimal:
+    return (Decimal(cents) / 100).quantize(TWOPLACES)
+
+
+def ratio_units(ratio: Decimal | str) -> int:
+    """Convert a split ratio to units of 1/10000."""
+
+    units = Decimal(ratio) * RATIO_SCALE
+    if units != units.to_integral_value():
+        raise ValueError(f"Split ratio has more than four decimal places: {ratio}")
+    return int(units)
+
+
+def round_half_up(numerator: int, denominator: int) -> int:
+    """Divide and round half away from zero, like ``Decimal.quantize(..., ROUND_HALF_UP)``."""
+
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
@@ -0,0 +1,86 @@
+"""Content-addressed receipt index used to skip re-uploading identical files."""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO
+
+from sqlalchemy.orm import Session
+
+import models
+from db import upsert_insert
+from schemas import RECEIPT_SUFFIX_PATTERN
+from services.storage import UPLOAD_CHUNK_SIZE
+
+CONTENT_PREFIX = "sha256"
+DEFAULT_SUFFIX = ".bin"
+
+
+class HashingReader:
+    """File wrapper that feeds every chunk read through SHA-256."""
+
+    def __init__(self, file_obj: BinaryIO) -> None:
+        self._file_obj = file_obj
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file_obj.read(size)
+        self._digest.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def hash_stream(file_obj: BinaryIO) -> str:
+    """Return the SHA-256 of the remaining stream, then rewind it to where it was."""
+
+    position = file_obj.tell()
+    reader = HashingReader(file_obj)
+    while reader.read(UPLOAD_CHUNK_SIZE):
+        pass
+    file_obj.seek(position, os.SEEK_SET)
+    return reader.hexdigest()
+
+
+def receipt_suffix(filename: str | None) -> str:
+    """Return the lowercased extension of ``filename``, or ``.bin`` when it is missing or unusual.
+
+    Every key built from it matches ``ExpenseConfirm.receipt_path``.
+    """
+
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if re.fullmatch(RECEIPT_SUFFIX_PATTERN, suffix) else DEFAULT_SUFFIX
+
+
+def content_address(digest: str, suffix: str) -> Path:
+    """Return the storage key for a receipt with the given SHA-256."""
+
+    return Path(f"{CONTENT_PREFIX}/{digest[:2]}/{digest}{suffix.lower()}")
+
+
+def digest_from_path(path: str) -> str | None:
+    """Return the SHA-256 encoded in a content-addressed key, or None for other keys."""
+
+    parts = Path(path).parts
+    if len(parts) != 3 or parts[0] != CONTENT_PREFIX:
+        return None
+    digest = Path(parts[2]).stem
+    return digest if digest.startswith(parts[1]) else None
+
+
+def lookup_receipt(db: Session, digest: str) -> models.ReceiptBlob | None:
+    """Return the already stored receipt with this SHA-256."""
+
+    return db.get(models.ReceiptBlob, digest)
+
+
+def remember_receipt(db: Session, digest: str, receipt_url: str, thumbnail_url: str | None = None) -> None:
+    """Record a stored receipt in the index; concurrent duplicates are ignored."""
+
+    statement = upsert_insert(db, models.ReceiptBlob.__table__).values(
+        sha256=digest, receipt_url=receipt_url, thumbnail_url=thumbnail_url
+    )
+    db.execute(statement.on_conflict_do_nothing(index_elements=["sha256"]))
@@ -0,0 +1,195 @@
+"""Background receipt upload queue."""
+from __future__ import annotations
+
+import logging
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Callable
+from uuid import uuid4
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, sessionmaker
+
+import models
+from services.images import ReceiptImageProcessor, store_receipt
+from services.receipt_index import remember_receipt
+from services.storage import StorageService
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 15 * 60
+# How long a claimed job stays hidden from other workers; a worker that dies mid-upload releases it
+# when the lease runs out.
+CLAIM_LEASE_SECONDS = 10 * 60
+
+
+def spool_receipt(file_obj: BinaryIO, spool_dir: Path, suffix: str) -> Path:
+    """Copy an uploaded receipt to the local spool directory and return its path."""
+
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    spool_path = spool_dir / f"{uuid4().hex}{suffix}"
+    with spool_path.open("wb") as spool_file:
+        shutil.copyfileobj(file_obj, spool_file)
+    return spool_path
+
+
+def enqueue_receipt(
+    db: Session,
+    expense: models.Expense,
+    spool_path: Path,
+    destination: Path,
+    content_type: str | None,
+    sha256: str | None = None,
+) -> None:
+    """Mark the expense receipt as pending and queue it for upload in the caller's transaction."""
+
+    expense.receipt_status = "pending"
+    db.add(
+        models.PendingReceiptUpload(
+            expense_id=expense.id,
+            spool_path=str(spool_path),
+            destination=destination.as_posix(),
+            content_type=content_type,
+            sha256=sha256,
+        )
+    )
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _claim(session: Session, job_id: int, now: datetime) -> bool:
+    """Lease a due job to this worker; False when another worker claimed it first."""
+
+    result = session.execute(
+        update(models.PendingReceiptUpload)
+        .where(models.PendingReceiptUpload.id == job_id, models.PendingReceiptUpload.next_attempt_at <= now)
+        .values(next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def process_pending_uploads(
+    session_factory: sessionmaker,
+    storage: StorageService,
+    max_attempts: int,
+    now: datetime | None = None,
+    batch_size: int = 20,
+    processor: ReceiptImageProcessor | None = None,
+) -> int:
+    """Upload the receipts that are due and return how many were uploaded.
+
+    Failed uploads are rescheduled with exponential backoff. After ``max_attempts`` the expense is
+    marked as ``failed`` and the spooled file and queue row are kept for inspection. Every job is
+    claimed with a conditional UPDATE before it is uploaded, so several processes can drain the
+    queue without uploading the same receipt twice.
+    """
+
+    now = now or datetime.utcnow()
+    uploaded = 0
+    with session_factory() as session:
+        jobs = (
+            session.query(models.PendingReceiptUpload)
+            .filter(models.PendingReceiptUpload.next_attempt_at <= now)
+            .filter(models.PendingReceiptUpload.attempts < max_attempts)
+            .order_by(models.PendingReceiptUpload.next_attempt_at, models.PendingReceiptUpload.id)
+            .limit(batch_size)
+            .all()
+        )
+        for job in jobs:
+            if not _claim(session, job.id, now):
+                continue
+            expense = session.get(models.Expense, job.expense_id)
+            spool_path = Path(job.spool_path)
+            try:
+                with spool_path.open("rb") as spool_file:
+                    receipt_url, thumbnail_url = store_receipt(
+                        storage,
+                        spool_file,
+                        Path(job.destination),
+                        job.content_type,
+                        processor=processor,
+                        upsert=job.sha256 is not None,
+                    )
+            except (OSError, RuntimeError) as exc:
+                job.attempts += 1
+                job.last_error = str(exc)[:255]
+                job.next_attempt_at = now + _backoff(job.attempts)
+                if job.attempts >= max_attempts and expense is not None:
+                    expense.receipt_status = "failed"
+                logger.warning("Receipt upload for expense %s failed (attempt %s): %s", job.expense_id, job.attempts, exc)
+                session.commit()
+                continue
+
+            if expense is not None:
+                expense.receipt_url = receipt_url
+                expense.receipt_status = "uploaded"
+                expense.thumbnail_url = thumbnail_url
+            if job.sha256:
+                remember_receipt(session, job.sha256, receipt_url, thumbnail_url)
+            session.delete(job)
+            session.commit()
+            spool_path.unlink(missing_ok=True)
+            uploaded += 1
+    return uploaded
+
+
+class ReceiptUploadWorker:
+    """Daemon thread that drains the pending receipt queue."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        storage_provider: Callable[[], StorageService],
+        max_attempts: int,
+        poll_interval: float = 5.0,
+        processor_provider: Callable[[], ReceiptImageProcessor | None] = lambda: None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._processor_provider = processor_provider
+        self._storage_provider = storage_provider
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="receipt-upload-worker", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """Ask the worker to look for new uploads without waiting for the next poll."""
+
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                process_pending_uploads(
+                    self._session_factory,
+                    self._storage_provider(),
+                    self._max_attempts,
+                    processor=self._processor_provider(),
+                )
+            except Exception:  # pragma: no cover - keep the worker alive on unexpected errors
+                logger.exception("Receipt upload worker iteration failed")
+            self._wakeup.wait(self._poll_interval)
+            self._wakeup.clear()
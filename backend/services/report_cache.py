@@ -0,0 +1,126 @@
+"""Cache for rendered weekly reports of closed weeks."""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import Depends
+
+from settings import Settings, get_settings
+
+# Bump when the PDF/CSV layout changes so cached renders and client ETags are invalidated.
+RENDER_VERSION = 3
+
+# (settlement id, settlement created_at in ISO format, report format). A week that is reopened and
+# closed again gets a new settlement row, so the creation time is part of the key even if the
+# database hands the same id out again.
+CacheKey = tuple[int, str, str]
+
+
+def report_cache_key(settlement_id: int, created_at: datetime, fmt: str) -> CacheKey:
+    return settlement_id, created_at.isoformat(), fmt
+
+
+def _key_digest(key: CacheKey) -> str:
+    settlement_id, created_at_iso, fmt = key
+    raw = f"{settlement_id}:{created_at_iso}:{fmt}:{RENDER_VERSION}".encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def report_etag(key: CacheKey) -> str:
+    """Return the strong ETag of a report; settlements never change once the week is closed."""
+
+    return f'"{_key_digest(key)}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {candidate.strip() for candidate in if_none_match.split(",")}
+
+
+class ReportCache:
+    """Byte-bounded in-memory LRU of rendered reports, optionally backed by a directory."""
+
+    def __init__(self, max_bytes: int, directory: Path | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries: OrderedDict[CacheKey, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: CacheKey) -> Path | None:
+        if self.directory is None:
+            return None
+        settlement_id, _, fmt = key
+        return self.directory / f"settlement-{settlement_id}-{_key_digest(key)}.{fmt}"
+
+    def _remember(self, key: CacheKey, content: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+            if len(content) > self.max_bytes:
+                return
+            self._entries[key] = content
+            self._size += len(content)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _lookup(self, key: CacheKey) -> bytes | None:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return content
+
+        disk_path = self._disk_path(key)
+        if disk_path is not None and disk_path.is_file():
+            content = disk_path.read_bytes()
+            self._remember(key, content)
+            return content
+        return None
+
+    def _store_on_disk(self, key: CacheKey, content: bytes) -> None:
+        disk_path = self._disk_path(key)
+        if disk_path is None:
+            return
+        disk_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=disk_path.parent, delete=False) as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_file.name, disk_path)
+
+    def get(self, key: CacheKey) -> bytes | None:
+        """Return a cached report without rendering it."""
+
+        return self._lookup(key)
+
+    def put(self, key: CacheKey, content: bytes) -> None:
+        """Store a report rendered elsewhere, e.g. in the render pool."""
+
+        self._store_on_disk(key, content)
+        self._remember(key, content)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+@lru_cache
+def _report_cache_factory(max_bytes: int, directory: str | None) -> ReportCache:
+    return ReportCache(max_bytes, Path(directory) if directory else None)
+
+
+def get_report_cache(settings: Settings = Depends(get_settings)) -> ReportCache:
+    """Return the process-wide report cache."""
+
+    return _report_cache_factory(settings.report_cache_max_bytes, settings.report_cache_dir)
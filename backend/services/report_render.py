@@ -0,0 +1,254 @@
+"""Weekly report rendering, runnable in worker processes."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache
+from typing import Sequence
+
+from fastapi import Depends
+
+from settings import Settings, get_settings
+
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+_open_pools: list["ReportRenderPool"] = []
+
+
+# One expense row of the itemized report: date (ISO), partner, category, platform and amount.
+ExpenseLine = tuple[str, str, str, str, str]
+
+EXPENSE_HEADERS = ("Data", "Parceiro", "Categoria", "Plataforma", "Valor")
+
+# One partner of the settled week, from its settlement share: name, reimbursed expenses and total.
+PartnerLine = tuple[str, str, str]
+
+
+def _partner_lines(breakdown: dict, partners: Sequence[PartnerLine]) -> Sequence[PartnerLine]:
+    if partners:
+        return partners
+    # Without shares, fall back to the Rafael/Guilherme columns of the breakdown.
+    totals = breakdown.get("expenses", {})
+    return [
+        (name, totals.get(name, breakdown[f"reimb_{suffix}"]), breakdown[f"total_{suffix}"])
+        for name, suffix in (("Rafael", "rafael"), ("Guilherme", "guilherme"))
+    ]
+
+
+def render_csv(
+    week_end: date,
+    rule: str,
+    breakdown: dict,
+    expenses: Sequence[ExpenseLine] = (),
+    partners: Sequence[PartnerLine] = (),
+) -> bytes:
+    """Render the weekly settlement summary, followed by every expense of the week, as a semicolon-separated CSV."""
+
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=";")
+    writer.writerow(["Periodo", breakdown["week_start"], breakdown["week_end"]])
+    writer.writerow(["Recebido iFood", breakdown.get("ifood_amount", "0.00")])
+    writer.writerow(["Recebido 99 Food", breakdown.get("ninety9_amount", "0.00")])
+    writer.writerow(["Receita total", breakdown["income_total"]])
+    writer.writerow(["Aluguel", breakdown["rent_fee"]])
+    writer.writerow([])
+    lines = _partner_lines(breakdown, partners)
+    for name, reimb, _ in lines:
+        writer.writerow([f"Despesas {name}", reimb])
+    writer.writerow(["Saldo para divisao", breakdown.get("net_for_split")])
+    writer.writerow([])
+    for name, _, total in lines:
+        writer.writerow([f"Total {name}", total])
+    writer.writerow(["Regra", rule])
+    if expenses:
+        writer.writerow([])
+        writer.writerow(EXPENSE_HEADERS)
+        writer.writerows(expenses)
+
+    return output.getvalue().encode("utf-8-sig")
+
+
+def _summary_lines(week_end: date, rule: str, breakdown: dict, partners: Sequence[PartnerLine]) -> list[str]:
+    lines = _partner_lines(breakdown, partners)
+    return [
+        "Hamburgueria do Cheffinho - Unidade 2",
+        f"Relatorio semanal - fechamento {week_end.strftime('%d/%m/%Y')}",
+        "",
+        f"Periodo: {breakdown['week_start']} a {breakdown['week_end']}",
+        f"Recebido iFood: R$ {breakdown.get('ifood_amount', '0.00')}",
+        f"Recebido 99 Food: R$ {breakdown.get('ninety9_amount', '0.00')}",
+        f"Receita total: R$ {breakdown['income_total']}",
+        f"Aluguel: R$ {breakdown['rent_fee']}",
+        "",
+        *(f"Despesas {name}: R$ {reimb}" for name, reimb, _ in lines),
+        f"Saldo para divisao: R$ {breakdown['net_for_split']}",
+        "",
+        *(f"Total {name}: R$ {total}" for name, _, total in lines),
+        f"Regra aplicada: {rule}",
+    ]
+
+
+def render_pdf(
+    week_end: date,
+    rule: str,
+    breakdown: dict,
+    expenses: Sequence[ExpenseLine] = (),
+    partners: Sequence[PartnerLine] = (),
+) -> bytes:
+    """Render the weekly settlement summary and an itemized expense table, paging as needed."""
+
+    # reportlab is slow to import and only needed once a PDF is rendered.
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    # invariant=1 drops the creation timestamp so the same settlement always renders the same bytes.
+    pdf = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+    margin = 40
+    # x of each column; the amount column is right-aligned on the last one.
+    columns = (margin, margin + 70, margin + 190, margin + 330, width - margin)
+    page = 1
+
+    pdf.setTitle(f"Relatorio Semana {week_end.isoformat()}")
+    text = pdf.beginText(margin, height - 80)
+    text.setFont("Helvetica", 12)
+    for line in _summary_lines(week_end, rule, breakdown, partners):
+        text.textLine(line)
+    pdf.drawText(text)
+
+    def finish_page() -> None:
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(width - margin, margin / 2, f"Pagina {page}")
+        pdf.showPage()
+
+    def table_header(y: float) -> float:
+        pdf.setFont("Helvetica-Bold", 10)
+        for x, title in zip(columns[:-1], EXPENSE_HEADERS[:-1]):
+            pdf.drawString(x, y, title)
+        pdf.drawRightString(columns[-1], y, EXPENSE_HEADERS[-1])
+        pdf.line(margin, y - 4, width - margin, y - 4)
+        pdf.setFont("Helvetica", 9)
+        return y - 16
+
+    if expenses:
+        y = text.getY() - 24
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(margin, y, f"Despesas da semana ({len(expenses)})")
+        y = table_header(y - 20)
+        for expense_date, partner, category, platform, amount in expenses:
+            if y < margin + 20:
+                finish_page()
+                page += 1
+                pdf.setFont("Helvetica", 10)
+                pdf.drawString(margin, height - 50, f"Relatorio semanal - fechamento {week_end.strftime('%d/%m/%Y')} (cont.)")
+                y = table_header(height - 80)
+            day = date.fromisoformat(expense_date).strftime("%d/%m/%Y")
+            for x, value in zip(columns[:-1], (day, partner, category, platform)):
+                pdf.drawString(x, y, value[:24])
+            pdf.drawRightString(columns[-1], y, f"R$ {amount}")
+            y -= 13
+
+    finish_page()
+    pdf.save()
+    return buffer.getvalue()
+
+
+_RENDERERS = {"csv": render_csv, "pdf": render_pdf}
+
+
+def render_report(
+    fmt: str,
+    week_end: date,
+    rule: str,
+    breakdown_json: str,
+    expenses: Sequence[ExpenseLine] = (),
+    partners: Sequence[PartnerLine] = (),
+) -> bytes:
+    """Render one report from plain, picklable arguments."""
+
+    return _RENDERERS[fmt](week_end, rule, json.loads(breakdown_json), expenses, partners)
+
+
+class ReportRenderPool:
+    """Bounded process pool for report rendering."""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        # Caps renders waiting for a worker across all requests.
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(
+        self,
+        fmt: str,
+        week_end: date,
+        rule: str,
+        breakdown_json: str,
+        expenses: Sequence[ExpenseLine] = (),
+        partners: Sequence[PartnerLine] = (),
+    ) -> Future[bytes]:
+        """Queue a render, blocking while the pool already has its share of pending work."""
+
+        self._slots.acquire()
+        try:
+            future = self._get_executor().submit(
+                render_report, fmt, week_end, rule, breakdown_json, expenses, partners
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+@lru_cache
+def _render_pool_factory(workers: int) -> ReportRenderPool:
+    pool = ReportRenderPool(workers)
+    _open_pools.append(pool)
+    return pool
+
+
+def get_render_pool(settings: Settings = Depends(get_settings)) -> ReportRenderPool:
+    """Return the process-wide report render pool."""
+
+    return _render_pool_factory(settings.report_render_workers)
+
+
+def shutdown_render_pools() -> None:
+    """Stop the worker processes of every report render pool."""
+
+    while _open_pools:
+        _open_pools.pop().shutdown()
+    _render_pool_factory.cache_clear()
+
+
+def _forget_render_pools_after_fork() -> None:
+    # Worker processes of the parent's pool cannot be driven from a forked child.
+    _open_pools.clear()
+    _render_pool_factory.cache_clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_render_pools_after_fork)
@@ -0,0 +1,113 @@
+"""Weekly expense rollup maintenance."""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+import models
+from db import upsert_insert
+from services.scheduler import week_end_for
+
+_ROLLUP_KEY = ("week_end", "partner_id", "category", "platform")
+
+
+def _aggregate(entries: Iterable[tuple[date, int, str | None, str | None, Decimal]]) -> list[dict]:
+    """Group (day, partner_id, category, platform, amount) entries into rollup rows."""
+
+    grouped: dict[tuple[date, int, str, str], list] = {}
+    for day, partner_id, category, platform, amount in entries:
+        entry = grouped.setdefault((week_end_for(day), partner_id, category or "", platform or ""), [Decimal("0"), 0])
+        entry[0] += Decimal(amount)
+        entry[1] += 1
+    return [dict(zip(_ROLLUP_KEY, key), total=total, expense_count=count) for key, (total, count) in grouped.items()]
+
+
+def _upsert(db: Session, rows: list[dict]) -> None:
+    """Add totals and counts to the matching rollup rows, creating them when missing."""
+
+    if not rows:
+        return
+
+    table = models.WeeklyExpenseRollup.__table__
+    statement = upsert_insert(db, table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(_ROLLUP_KEY),
+        set_={
+            "total": table.c.total + statement.excluded.total,
+            "expense_count": table.c.expense_count + statement.excluded.expense_count,
+        },
+    )
+    db.execute(statement, rows)
+
+
+def apply_expenses(db: Session, expenses: Iterable[models.Expense]) -> None:
+    """Fold newly inserted expenses into the rollup within the caller's transaction."""
+
+    _upsert(
+        db,
+        _aggregate(
+            (expense.date, expense.partner_id, expense.category, expense.platform, expense.amount)
+            for expense in expenses
+        ),
+    )
+
+
+def apply_expense_rows(db: Session, rows: Iterable[dict]) -> None:
+    """Fold expenses inserted as plain column dicts (bulk imports) into the rollup."""
+
+    _upsert(
+        db,
+        _aggregate(
+            (row["date"], row["partner_id"], row["category"], row["platform"], row["amount"]) for row in rows
+        ),
+    )
+
+
+def rebuild_rollups(db: Session, batch_size: int = 1000) -> int:
+    """Recompute every rollup row from the raw expenses and return how many were written."""
+
+    db.execute(delete(models.WeeklyExpenseRollup))
+    result = db.execute(
+        select(
+            models.Expense.date,
+            models.Expense.partner_id,
+            models.Expense.category,
+            models.Expense.platform,
+            models.Expense.amount,
+        ).execution_options(yield_per=batch_size)
+    )
+    rows = _aggregate(result)
+    for offset in range(0, len(rows), batch_size):
+        db.execute(models.WeeklyExpenseRollup.__table__.insert(), rows[offset : offset + batch_size])
+    return len(rows)
+
+
+def weekly_totals_by_partner(db: Session, week_end: date, partner_ids: list[int]) -> dict[int, Decimal]:
+    """Return the expense totals of the given partners for the business week ending on ``week_end``."""
+
+    return weekly_totals_for_weeks(db, [week_end], partner_ids).get(week_end, {})
+
+
+def weekly_totals_for_weeks(
+    db: Session, week_ends: Iterable[date], partner_ids: list[int]
+) -> dict[date, dict[int, Decimal]]:
+    """Return the partner expense totals of several business weeks with a single grouped query."""
+
+    rows = db.execute(
+        select(
+            models.WeeklyExpenseRollup.week_end,
+            models.WeeklyExpenseRollup.partner_id,
+            func.sum(models.WeeklyExpenseRollup.total),
+        )
+        .where(models.WeeklyExpenseRollup.week_end.in_(list(week_ends)))
+        .where(models.WeeklyExpenseRollup.partner_id.in_(partner_ids))
+        .group_by(models.WeeklyExpenseRollup.week_end, models.WeeklyExpenseRollup.partner_id)
+    )
+    totals: dict[date, dict[int, Decimal]] = {}
+    for week_end, partner_id, total in rows:
+        totals.setdefault(week_end, {})[partner_id] = Decimal(str(total))
+    return totals
@@ -13,6 +13,12 @@ def week_bounds(week_end: date) -> tuple[date, date]:
     return week_start, week_end
 
 
+def week_end_for(day: date) -> date:
+    """Return the business week end (Wednesday) that closes the week containing ``day``."""
+
+    return day + timedelta(days=(2 - day.weekday()) % 7)
+
+
 def current_wednesday(now: datetime | None = None, tz: str = "America/Sao_Paulo") -> date:
     """Return the business week end (Wednesday) for the given datetime."""
 
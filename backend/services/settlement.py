@@ -1,10 +1,11 @@
 ﻿"""Settlement calculation service."""
 from __future__ import annotations
 
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Tuple
+from typing import Dict, Mapping, Tuple
 
-TWOPLACES = Decimal("0.01")
+from services.money import RATIO_SCALE, TWOPLACES, from_cents, ratio_units, round_half_up
 
 
 def _to_decimal(value: Decimal | float | int | str) -> Decimal:
@@ -64,3 +65,85 @@ def compute_settlement(
         "total_rafael": _quantize(total_rafael),
         "total_guilherme": _quantize(total_guilherme),
     }
+
+
+@dataclass(frozen=True)
+class PartnerSettlement:
+    """One partner's part of a week, in cents."""
+
+    reimb: int
+    share: int
+    total: int
+
+
+@dataclass(frozen=True)
+class SettlementResult:
+    """A settled week in cents, with one entry per partner."""
+
+    income_total: int
+    rent_fee: int
+    net_for_split: int
+    partners: dict[str, PartnerSettlement]
+
+    def legacy_breakdown(self) -> Dict[str, Decimal]:
+        """Return the week in the shape of ``compute_settlement`` for the Rafael/Guilherme columns.
+
+        Other partners only appear in the settlement shares, which reports and aggregates read.
+        """
+
+        zero = PartnerSettlement(0, 0, 0)
+        rafael = self.partners.get("Rafael", zero)
+        guilherme = self.partners.get("Guilherme", zero)
+        cents = {
+            "rent_fee": self.rent_fee,
+            "income_total": self.income_total,
+            "reimb_rafael": rafael.reimb,
+            "reimb_guilherme": guilherme.reimb,
+            "net_for_split": self.net_for_split,
+            "share_rafael": rafael.share,
+            "share_guilherme": guilherme.share,
+            "total_rafael": rafael.total,
+            "total_guilherme": guilherme.total,
+        }
+        return {key: from_cents(value) for key, value in cents.items()}
+
+
+def compute_partner_settlement(
+    expenses_cents: Mapping[str, int],
+    income_cents: int,
+    rent_fee_cents: int,
+    splits: Mapping[str, Decimal | str],
+    rule: str = "rent_before_split",
+    rent_payee: str = "Rafael",
+) -> SettlementResult:
+    """Settle a week between any number of partners using integer cents.
+
+    ``splits`` lists every partner with its ratio (at most four decimal places). Each partner is
+    reimbursed its expenses, the rent goes to ``rent_payee``, and shares and totals are rounded
+    half up from the exact values, matching ``compute_settlement`` for two partners.
+    """
+
+    if rule == "rent_before_split":
+        rent_in_net = True
+    elif rule == "rent_after_split":
+        rent_in_net = False
+    else:
+        raise ValueError(f"Unsupported rule: {rule}")
+    if rent_payee not in splits:
+        raise ValueError(f"Rent payee {rent_payee} is not a partner")
+
+    net = income_cents - sum(expenses_cents.get(name, 0) for name in splits)
+    if rent_in_net:
+        net -= rent_fee_cents
+
+    partners = {}
+    for name, ratio in splits.items():
+        reimb = expenses_cents.get(name, 0)
+        owed = reimb + (rent_fee_cents if name == rent_payee else 0)
+        exact_share = net * ratio_units(ratio)
+        partners[name] = PartnerSettlement(
+            reimb=reimb,
+            share=round_half_up(exact_share, RATIO_SCALE),
+            total=round_half_up(owed * RATIO_SCALE + exact_share, RATIO_SCALE),
+        )
+    return SettlementResult(income_total=income_cents, rent_fee=rent_fee_cents, net_for_split=net, partners=partners)
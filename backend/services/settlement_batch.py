@@ -0,0 +1,63 @@
+"""Columnar settlement engine in integer cents, for replaying many weeks at once."""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Sequence
+
+from services.money import RATIO_SCALE, ratio_units, round_half_up
+
+_FIELDS = (
+    "rent_fee",
+    "income_total",
+    "reimb_rafael",
+    "reimb_guilherme",
+    "net_for_split",
+    "share_rafael",
+    "share_guilherme",
+    "total_rafael",
+    "total_guilherme",
+)
+
+
+def compute_settlements(
+    income_cents: Sequence[int],
+    reimb_rafael_cents: Sequence[int],
+    reimb_guilherme_cents: Sequence[int],
+    rent_fee_cents: Sequence[int],
+    split: tuple[Decimal | str, Decimal | str] = (Decimal("0.5"), Decimal("0.5")),
+    rule: str = "rent_before_split",
+) -> dict[str, list[int]]:
+    """Compute every week's settlement in cents, column by column.
+
+    Each output column holds, for week ``i``, the value ``compute_settlement`` returns for that week
+    (times 100). Totals are rounded from the exact share, not from the rounded one, so negative
+    weeks round the same way as the Decimal engine.
+    """
+
+    if rule not in ("rent_before_split", "rent_after_split"):
+        raise ValueError(f"Unsupported rule: {rule}")
+    ratio_rafael = ratio_units(split[0])
+    ratio_guilherme = ratio_units(split[1])
+    rent_in_net = rule == "rent_before_split"
+
+    columns: dict[str, list[int]] = {name: [] for name in _FIELDS}
+    append = {name: column.append for name, column in columns.items()}
+    for income, reimb_rafael, reimb_guilherme, rent in zip(
+        income_cents, reimb_rafael_cents, reimb_guilherme_cents, rent_fee_cents, strict=True
+    ):
+        net = income - reimb_rafael - reimb_guilherme - (rent if rent_in_net else 0)
+        exact_share_rafael = net * ratio_rafael
+        exact_share_guilherme = net * ratio_guilherme
+
+        append["rent_fee"](rent)
+        append["income_total"](income)
+        append["reimb_rafael"](reimb_rafael)
+        append["reimb_guilherme"](reimb_guilherme)
+        append["net_for_split"](net)
+        append["share_rafael"](round_half_up(exact_share_rafael, RATIO_SCALE))
+        append["share_guilherme"](round_half_up(exact_share_guilherme, RATIO_SCALE))
+        append["total_rafael"](
+            round_half_up((reimb_rafael + rent) * RATIO_SCALE + exact_share_rafael, RATIO_SCALE)
+        )
+        append["total_guilherme"](round_half_up(reimb_guilherme * RATIO_SCALE + exact_share_guilherme, RATIO_SCALE))
+    return columns
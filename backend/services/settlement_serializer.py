@@ -0,0 +1,104 @@
+"""Serialization of stored settlements into API payloads."""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+
+import models
+
+TWOPLACES = "0.2f"
+
+_SETTLEMENT_COLUMNS = (
+    models.Settlement.id,
+    models.Settlement.payout_id,
+    models.Settlement.created_at,
+    models.Settlement.reimb_rafael,
+    models.Settlement.reimb_guilherme,
+    models.Settlement.net_for_split,
+    models.Settlement.share_rafael,
+    models.Settlement.share_guilherme,
+    models.Settlement.total_rafael,
+    models.Settlement.total_guilherme,
+    models.Payout.rent_fee,
+    models.Payout.ifood_amount,
+    models.Payout.ninety9_amount,
+    models.Payout.week_start,
+    models.Payout.week_end,
+)
+
+_MONEY_FIELDS = (
+    "reimb_rafael",
+    "reimb_guilherme",
+    "net_for_split",
+    "share_rafael",
+    "share_guilherme",
+    "total_rafael",
+    "total_guilherme",
+    "rent_fee",
+)
+
+
+def settlement_rows(db: Session) -> Query:
+    """Return a query for the typed columns of ``SettlementResponse``; ``breakdown_json`` is never loaded."""
+
+    return db.query(*_SETTLEMENT_COLUMNS).join(models.Payout, models.Settlement.payout_id == models.Payout.id)
+
+
+def _money(value: Decimal) -> str:
+    return format(value, TWOPLACES)
+
+
+def _serialize_share(share: Any) -> dict[str, Any]:
+    return {
+        "partner_id": share.partner_id,
+        "partner_name": share.partner_name,
+        "split_ratio": str(share.split_ratio) if share.split_ratio is not None else None,
+        "reimb": _money(share.reimb),
+        "share": _money(share.share),
+        "total": _money(share.total),
+    }
+
+
+def serialize_settlement(row: Any, shares: Iterable[Any] = ()) -> dict[str, Any]:
+    """Return the JSON payload of ``SettlementResponse`` for a row of ``settlement_rows``.
+
+    Values are formatted the way pydantic would dump them, without validating what the server wrote.
+    """
+
+    payload: dict[str, Any] = {field: _money(getattr(row, field)) for field in _MONEY_FIELDS}
+    payload.update(
+        id=row.id,
+        payout_id=row.payout_id,
+        created_at=row.created_at.isoformat(),
+        income_total=_money(row.ifood_amount + row.ninety9_amount),
+        week_start=row.week_start.isoformat(),
+        week_end=row.week_end.isoformat(),
+        partners=[_serialize_share(share) for share in shares],
+    )
+    return payload
+
+
+def serialize_settlements(db: Session, rows: Sequence[Any]) -> list[dict[str, Any]]:
+    """Serialize rows of ``settlement_rows`` with their partner shares, loaded in one query."""
+
+    shares: dict[int, list[Any]] = {row.id: [] for row in rows}
+    if shares:
+        share_table = models.SettlementShare
+        for share in db.execute(
+            select(
+                share_table.settlement_id,
+                share_table.partner_id,
+                share_table.partner_name,
+                share_table.split_ratio,
+                share_table.reimb,
+                share_table.share,
+                share_table.total,
+            )
+            .where(share_table.settlement_id.in_(list(shares)))
+            .order_by(share_table.settlement_id, share_table.partner_id)
+        ):
+            shares[share.settlement_id].append(share)
+    return [serialize_settlement(row, shares[row.id]) for row in rows]
@@ -1,58 +1,353 @@
-"""Supabase storage service integration."""
+"""Receipt storage backends: Supabase Storage and the local filesystem."""
 from __future__ import annotations
 
+import hashlib
+import hmac
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import BinaryIO
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Literal
 
-import httpx
 from fastapi import Depends
-from httpx import HTTPStatusError, RequestError
 
 from settings import Settings, get_settings
 
+if TYPE_CHECKING:
+    import httpx
 
-class StorageService:
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+_open_services: list["StorageService"] = []
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _iter_chunks(file_obj: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    while chunk := file_obj.read(chunk_size):
+        yield chunk
+
+
+def _remaining_size(file_obj: BinaryIO) -> int | None:
+    """Return how many bytes are left to read, or None when the stream is not seekable."""
+
+    try:
+        position = file_obj.tell()
+        end = file_obj.seek(0, os.SEEK_END)
+        file_obj.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return end - position
+
+
+@dataclass(frozen=True)
+class SignedUpload:
+    path: str
+    upload_url: str
+    token: str
+
+
+class StorageService(ABC):
+    """Interface shared by the receipt storage backends."""
+
+    @abstractmethod
+    def public_url(self, destination: Path) -> str:
+        """Return the public URL of a stored receipt."""
+
+    @abstractmethod
+    def upload_receipt(
+        self,
+        file_obj: BinaryIO,
+        destination: Path,
+        content_type: str | None = None,
+        upsert: bool = False,
+    ) -> str:
+        """Store a receipt and return its public URL."""
+
+    @abstractmethod
+    def create_signed_upload(self, destination: Path) -> SignedUpload:
+        """Return a short-lived target the client can PUT the receipt to directly."""
+
+    @abstractmethod
+    def receipt_exists(self, destination: Path) -> bool:
+        """Return whether a receipt was stored at the destination."""
+
+    @abstractmethod
+    def receipt_sha256(self, destination: Path) -> str | None:
+        """Return the SHA-256 of a stored receipt, or None when nothing is stored there."""
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+
+
+class SupabaseStorageService(StorageService):
     """Wrapper for Supabase Storage interactions."""
 
-    def __init__(self, supabase_url: str, service_role_key: str, bucket: str = "receipts") -> None:
+    def __init__(
+        self,
+        supabase_url: str,
+        service_role_key: str,
+        bucket: str = "receipts",
+        client: httpx.Client | None = None,
+    ) -> None:
         self.supabase_url = supabase_url.rstrip("/")
         self.service_role_key = service_role_key
         self.bucket = bucket
+        # Imported here: httpx is only needed when Supabase is the storage backend.
+        import httpx
 
-    def upload_receipt(self, file_obj: BinaryIO, destination: Path, content_type: str | None = None) -> str:
-        """Upload a receipt to Supabase Storage and return the public URL."""
+        # One pooled client per service keeps TCP/TLS connections alive between uploads.
+        self._client = client or httpx.Client(
+            timeout=30,
+            http2=_http2_available(),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        )
+
+    def _auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.service_role_key}"}
+
+    def public_url(self, destination: Path) -> str:
+        """Return the public URL of an object in the bucket."""
+
+        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{destination.as_posix()}"
+
+    def upload_receipt(
+        self,
+        file_obj: BinaryIO,
+        destination: Path,
+        content_type: str | None = None,
+        upsert: bool = False,
+    ) -> str:
+        """Upload a receipt to Supabase Storage and return the public URL.
+
+        The file is streamed in fixed-size chunks so memory use does not grow with the receipt size.
+        ``upsert`` overwrites an existing object, which is harmless for content-addressed keys.
+        """
+
+        from httpx import HTTPStatusError, RequestError
 
         path = destination.as_posix()
         url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{path}"
         headers = {
-            "Authorization": f"Bearer {self.service_role_key}",
+            **self._auth_headers(),
             "Content-Type": content_type or "application/octet-stream",
         }
-        data = file_obj.read()
+        if upsert:
+            headers["x-upsert"] = "true"
+        size = _remaining_size(file_obj)
+        if size is not None:
+            headers["Content-Length"] = str(size)
 
         try:
-            with httpx.Client(timeout=30) as client:
-                response = client.put(url, content=data, headers=headers)
-                response.raise_for_status()
+            response = self._client.put(url, content=_iter_chunks(file_obj), headers=headers)
+            response.raise_for_status()
         except (HTTPStatusError, RequestError) as exc:
             raise RuntimeError("Failed to upload receipt to Supabase") from exc
 
-        return f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{path}"
+        return self.public_url(destination)
+
+    def create_signed_upload(self, destination: Path) -> SignedUpload:
+        """Ask Supabase for a signed URL the client can PUT the receipt to directly."""
+
+        import httpx
+
+        path = destination.as_posix()
+        url = f"{self.supabase_url}/storage/v1/object/upload/sign/{self.bucket}/{path}"
+        try:
+            response = self._client.post(url, headers=self._auth_headers())
+            response.raise_for_status()
+            signed_path = response.json()["url"]
+        except (httpx.HTTPStatusError, httpx.RequestError, KeyError, ValueError) as exc:
+            raise RuntimeError("Failed to sign receipt upload with Supabase") from exc
+
+        upload_url = f"{self.supabase_url}/storage/v1{signed_path}"
+        return SignedUpload(path=path, upload_url=upload_url, token=httpx.URL(upload_url).params.get("token", ""))
+
+    def receipt_exists(self, destination: Path) -> bool:
+        """Return whether an object was stored at the destination."""
+
+        from httpx import RequestError
+
+        try:
+            response = self._client.head(self.public_url(destination))
+        except RequestError as exc:
+            raise RuntimeError("Failed to reach Supabase storage") from exc
+        return response.status_code == 200
+
+    def receipt_sha256(self, destination: Path) -> str | None:
+        """Stream the object back from the bucket and hash it."""
+
+        from httpx import HTTPStatusError, RequestError
+
+        digest = hashlib.sha256()
+        try:
+            with self._client.stream("GET", self.public_url(destination)) as response:
+                if response.status_code == 404:
+                    return None
+                response.raise_for_status()
+                for chunk in response.iter_bytes(UPLOAD_CHUNK_SIZE):
+                    digest.update(chunk)
+        except (HTTPStatusError, RequestError) as exc:
+            raise RuntimeError("Failed to read receipt from Supabase") from exc
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        """Release the pooled HTTP connections."""
+
+        self._client.close()
+
+
+class LocalStorageService(StorageService):
+    """Store receipts on the local filesystem and serve them through the API."""
+
+    def __init__(self, root: Path, public_base_url: str, signing_key: str, signed_upload_ttl: int = 600) -> None:
+        if not signing_key:
+            raise ValueError("Local storage needs a signing key for upload URLs")
+        self.root = root.resolve()
+        self.public_base_url = public_base_url.rstrip("/")
+        self._signing_key = hashlib.sha256(f"local-storage:{signing_key}".encode()).digest()
+        self.signed_upload_ttl = signed_upload_ttl
+
+    def resolve(self, destination: Path | str) -> Path:
+        """Return the file path of a receipt, refusing keys that escape the storage root."""
+
+        path = (self.root / destination).resolve()
+        if not path.is_relative_to(self.root) or path == self.root:
+            raise ValueError(f"Invalid receipt path: {destination}")
+        return path
+
+    def public_url(self, destination: Path) -> str:
+        return f"{self.public_base_url}/api/receipts/{destination.as_posix()}"
+
+    def upload_receipt(
+        self,
+        file_obj: BinaryIO,
+        destination: Path,
+        content_type: str | None = None,
+        upsert: bool = False,
+    ) -> str:
+        path = self.resolve(destination)
+        if path.exists() and not upsert:
+            raise RuntimeError("Receipt already exists in local storage")
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write next to the target and rename so readers never see a partial file.
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+                shutil.copyfileobj(file_obj, tmp_file, UPLOAD_CHUNK_SIZE)
+            os.replace(tmp_file.name, path)
+        except OSError as exc:
+            raise RuntimeError("Failed to store receipt on local disk") from exc
+
+        return self.public_url(destination)
+
+    def _signature(self, path: str, expires: int) -> str:
+        return hmac.new(self._signing_key, f"{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def create_signed_upload(self, destination: Path) -> SignedUpload:
+        path = destination.as_posix()
+        expires = int(time.time()) + self.signed_upload_ttl
+        token = f"{expires}.{self._signature(path, expires)}"
+        return SignedUpload(
+            path=path,
+            upload_url=f"{self.public_base_url}/api/receipts/upload/{path}?token={token}",
+            token=token,
+        )
+
+    def verify_upload_token(self, path: str, token: str) -> bool:
+        """Check a token issued by ``create_signed_upload`` for the given path."""
+
+        raw_expires, _, signature = token.partition(".")
+        try:
+            expires = int(raw_expires)
+        except ValueError:
+            return False
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(path, expires))
+
+    def receipt_exists(self, destination: Path) -> bool:
+        return self.resolve(destination).is_file()
+
+    def receipt_sha256(self, destination: Path) -> str | None:
+        path = self.resolve(destination)
+        if not path.is_file():
+            return None
+        digest = hashlib.sha256()
+        with path.open("rb") as file_obj:
+            for chunk in _iter_chunks(file_obj):
+                digest.update(chunk)
+        return digest.hexdigest()
 
 
 @lru_cache
 def _storage_service_factory(supabase_url: str, service_role_key: str, bucket: str = "receipts") -> StorageService:
     """Cache StorageService instances by credentials."""
 
-    return StorageService(supabase_url, service_role_key, bucket=bucket)
+    service = SupabaseStorageService(supabase_url, service_role_key, bucket=bucket)
+    _open_services.append(service)
+    return service
+
+
+@lru_cache
+def _local_storage_factory(root: str, public_base_url: str, signing_key: str) -> LocalStorageService:
+    """Cache LocalStorageService instances by location."""
+
+    return LocalStorageService(Path(root), public_base_url, signing_key)
+
+
+def close_storage_services() -> None:
+    """Close the pooled clients of every cached storage service."""
+
+    while _open_services:
+        _open_services.pop().close()
+    _storage_service_factory.cache_clear()
+    _local_storage_factory.cache_clear()
+
+
+def _forget_storage_services_after_fork() -> None:
+    # The pooled HTTP connections belong to the parent; the child builds its own clients on first use.
+    _open_services.clear()
+    _storage_service_factory.cache_clear()
+    _local_storage_factory.cache_clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_storage_services_after_fork)
+
+
+def resolve_storage_backend(settings: Settings) -> Literal["supabase", "local"]:
+    """Return the backend selected by ``STORAGE_BACKEND``, or raise when it cannot be used.
+
+    ``auto`` and ``supabase`` both require the Supabase settings; receipts only go to the local
+    filesystem when ``STORAGE_BACKEND=local`` is set explicitly, and then ``ADMIN_TOKEN`` must be
+    set because it signs the upload URLs.
+    """
+
+    if settings.storage_backend == "local":
+        if not settings.admin_token:
+            raise RuntimeError("ADMIN_TOKEN must be set to sign local storage uploads")
+        return "local"
+    if not settings.supabase_config():
+        raise RuntimeError(
+            "Supabase storage is not configured: set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY, "
+            "or STORAGE_BACKEND=local to keep receipts on disk"
+        )
+    return "supabase"
 
 
 def get_storage_service(settings: Settings = Depends(get_settings)) -> StorageService:
-    """Return a cached storage service instance."""
+    """Return the cached storage backend selected by ``STORAGE_BACKEND``."""
 
-    config = settings.supabase_config()
-    if not config:
-        raise RuntimeError("Supabase storage is not configured")
+    if resolve_storage_backend(settings) == "local":
+        return _local_storage_factory(settings.local_storage_dir, settings.public_api_url, settings.admin_token)
 
+    config = settings.supabase_config()
     return _storage_service_factory(config.url, config.service_role_key, bucket=config.bucket)
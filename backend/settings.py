@@ -2,7 +2,7 @@
 
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import AnyHttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -20,12 +20,47 @@ class Settings(BaseSettings):
     """Application configuration loaded from environment variables."""
 
     database_url: str = Field(default="sqlite:///./data.db", alias="DATABASE_URL")
+    db_async: bool = Field(default=False, alias="DB_ASYNC")
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=5, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=10.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=300, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    db_statement_timeout_ms: int = Field(default=15_000, alias="DB_STATEMENT_TIMEOUT_MS")
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist", "memory", "off"] = Field(
+        default="wal", alias="SQLITE_JOURNAL_MODE"
+    )
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] = Field(default="normal", alias="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5_000, alias="SQLITE_BUSY_TIMEOUT_MS")
 
     supabase_url: Optional[AnyHttpUrl] = Field(default=None, alias="SUPABASE_URL")
     supabase_anon_key: Optional[str] = Field(default=None, alias="SUPABASE_ANON_KEY")
     supabase_service_role_key: Optional[str] = Field(default=None, alias="SUPABASE_SERVICE_ROLE_KEY")
     supabase_bucket: str = Field(default="receipts", alias="SUPABASE_BUCKET")
 
+    receipt_upload_mode: Literal["sync", "background"] = Field(default="sync", alias="RECEIPT_UPLOAD_MODE")
+    receipt_spool_dir: str = Field(default="./receipt_spool", alias="RECEIPT_SPOOL_DIR")
+    receipt_upload_max_attempts: int = Field(default=8, alias="RECEIPT_UPLOAD_MAX_ATTEMPTS")
+    max_receipt_bytes: int = Field(default=20 * 1024 * 1024, alias="MAX_RECEIPT_BYTES")
+
+    receipt_image_processing: bool = Field(default=False, alias="RECEIPT_IMAGE_PROCESSING")
+    receipt_image_max_dimension: int = Field(default=1600, alias="RECEIPT_IMAGE_MAX_DIMENSION")
+    receipt_image_quality: int = Field(default=80, alias="RECEIPT_IMAGE_QUALITY")
+    receipt_thumbnail_size: int = Field(default=256, alias="RECEIPT_THUMBNAIL_SIZE")
+    receipt_image_workers: int = Field(default=2, alias="RECEIPT_IMAGE_WORKERS")
+
+    storage_backend: Literal["auto", "supabase", "local"] = Field(default="auto", alias="STORAGE_BACKEND")
+    local_storage_dir: str = Field(default="./storage", alias="LOCAL_STORAGE_DIR")
+    public_api_url: str = Field(default="http://localhost:8000", alias="PUBLIC_API_URL")
+
+    report_cache_max_bytes: int = Field(default=32 * 1024 * 1024, alias="REPORT_CACHE_MAX_BYTES")
+    report_cache_dir: Optional[str] = Field(default=None, alias="REPORT_CACHE_DIR")
+    report_render_workers: int = Field(default=2, alias="REPORT_RENDER_WORKERS")
+    rent_payee: str = Field(default="Rafael", alias="RENT_PAYEE")
+
+    startup_warmup: Literal["off", "sync", "background"] = Field(default="background", alias="STARTUP_WARMUP")
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
     admin_token: str = Field(default="", alias="ADMIN_TOKEN")
 
     cors_origins: Optional[List[AnyHttpUrl]] = Field(default=None, alias="CORS_ORIGINS")
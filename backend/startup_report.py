@@ -0,0 +1,108 @@
+"""Report where API cold start time goes: import tree timings, lifespan startup and first response."""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# Runs in a fresh interpreter so nothing is already imported.
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get("/health")
+    answered = time.perf_counter()
+print(json.dumps({"import_s": imported - started, "startup_s": ready - imported, "first_response_s": answered - ready}))
+"""
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+def parse_importtime(output: str, root: str = "main") -> list[ImportTiming]:
+    """Parse ``python -X importtime`` output up to the import of ``root``."""
+
+    timings: list[ImportTiming] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append(ImportTiming(module, int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+        # Children are printed before their parent, so the root closes the tree we care about.
+        if module == root and depth == 0:
+            break
+    return timings
+
+
+def by_package(timings: list[ImportTiming]) -> dict[str, float]:
+    """Sum the self time of every module under each top-level package."""
+
+    totals: dict[str, float] = defaultdict(float)
+    for timing in timings:
+        totals[timing.module.split(".")[0]] += timing.self_ms
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def run_probe() -> tuple[dict, list[ImportTiming]]:
+    backend = Path(__file__).resolve().parent
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=backend,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return phases, parse_importtime(result.stderr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=20, help="slowest modules and packages to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    phases, timings = run_probe()
+    slowest = sorted(timings, key=lambda timing: timing.cumulative_ms, reverse=True)[: args.top]
+    packages = list(by_package(timings).items())[: args.top]
+
+    if args.json:
+        report = {
+            "phases_ms": {name.removesuffix("_s"): round(value * 1000, 1) for name, value in phases.items()},
+            "slowest_modules": [asdict(timing) for timing in slowest],
+            "packages_self_ms": {name: round(value, 1) for name, value in packages},
+        }
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"import main      {phases['import_s'] * 1000:8.1f} ms")
+    print(f"lifespan start   {phases['startup_s'] * 1000:8.1f} ms")
+    print(f"first response   {phases['first_response_s'] * 1000:8.1f} ms")
+    print("\nSlowest imports (cumulative):")
+    for timing in slowest:
+        print(f"  {timing.cumulative_ms:8.1f} ms  {'  ' * timing.depth}{timing.module}")
+    print("\nSelf time by package:")
+    for name, total in packages:
+        print(f"  {total:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
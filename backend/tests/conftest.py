@@ -0,0 +1,80 @@
+"""Shared fixtures for API tests backed by a throwaway SQLite database."""
+from __future__ import annotations
+
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="gastos-delivery-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DIR}/test.db"
+os.environ["ADMIN_TOKEN"] = "test-token"
+# Tests that talk to Supabase opt in through the fake_storage fixture.
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = f"{_TEST_DIR}/storage"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from db import Base, SessionLocal, engine  # noqa: E402
+from init_db import DEFAULT_PARTNERS  # noqa: E402
+from models import Partner  # noqa: E402
+from services.storage import close_storage_services  # noqa: E402
+from settings import get_settings  # noqa: E402
+from tests.fake_storage import FakeStorageServer  # noqa: E402
+
+
+@pytest.fixture
+def db_session():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    for name, ratio in DEFAULT_PARTNERS:
+        session.add(Partner(name=name, split_ratio=ratio))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db_session):
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers() -> dict[str, str]:
+    return {"Authorization": "Bearer test-token"}
+
+
+@pytest.fixture
+def fake_storage(monkeypatch):
+    """Point the app at a local Supabase Storage stand-in."""
+
+    with FakeStorageServer() as server:
+        monkeypatch.setenv("STORAGE_BACKEND", "supabase")
+        monkeypatch.setenv("SUPABASE_URL", server.url)
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-key")
+        get_settings.cache_clear()
+        try:
+            yield server
+        finally:
+            get_settings.cache_clear()
+            close_storage_services()
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    """Store receipts under a temporary directory served by the API itself."""
+
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path / "storage"))
+    monkeypatch.setenv("PUBLIC_API_URL", "http://testserver")
+    get_settings.cache_clear()
+    try:
+        yield tmp_path / "storage"
+    finally:
+        get_settings.cache_clear()
+        close_storage_services()
@@ -0,0 +1,93 @@
+"""Local HTTP stand-in for the Supabase Storage object API."""
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OBJECT_PREFIX = "/storage/v1/object/"
+PUBLIC_PREFIX = "/storage/v1/object/public/"
+SIGN_PREFIX = "/storage/v1/object/upload/sign/"
+
+
+class FakeStorageServer:
+    """Store uploaded objects in memory and optionally fail the next uploads with 503."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeStorageServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        storage = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args) -> None:  # noqa: A002 - silence request logging
+                pass
+
+            def _reply(self, status: int, body: bytes = b"") -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_PUT(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path, _, query = self.path.partition("?")
+                if path.startswith(SIGN_PREFIX):
+                    if query != "token=signed":
+                        self._reply(400)
+                        return
+                    key = path[len(SIGN_PREFIX) :]
+                else:
+                    key = path[len(OBJECT_PREFIX) :]
+                with storage._lock:
+                    if storage.fail_next:
+                        storage.fail_next -= 1
+                        self._reply(503)
+                        return
+                    storage.objects[key] = body
+                self._reply(200, b'{"Key": "ok"}')
+
+            def do_POST(self) -> None:  # noqa: N802
+                if not self.path.startswith(SIGN_PREFIX):
+                    self._reply(404)
+                    return
+                signed = f'{{"url": "{self.path[len("/storage/v1") :]}?token=signed"}}'
+                self._reply(200, signed.encode())
+
+            def _lookup(self) -> bytes | None:
+                key = self.path[len(PUBLIC_PREFIX) :] if self.path.startswith(PUBLIC_PREFIX) else None
+                with storage._lock:
+                    return storage.objects.get(key) if key else None
+
+            def do_GET(self) -> None:  # noqa: N802
+                body = self._lookup()
+                if body is None:
+                    self._reply(404)
+                else:
+                    self._reply(200, body)
+
+            def do_HEAD(self) -> None:  # noqa: N802
+                body = self._lookup()
+                self.send_response(404 if body is None else 200)
+                self.send_header("Content-Length", str(len(body or b"")))
+                self.end_headers()
+
+        return Handler
@@ -0,0 +1,29 @@
+"""Count the SQL statements a request issues and flag repeated ones as likely N+1 queries."""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.engine import Engine
+
+from services.metrics import QueryRecorder
+
+
+@contextmanager
+def query_budget(engine: Engine, max_statements: int, max_repeats: int = 1) -> Iterator[QueryRecorder]:
+    """Fail when the block runs more than ``max_statements`` or repeats a statement shape.
+
+    A shape issued more than ``max_repeats`` times inside one request is almost always a
+    per-row lazy load or a per-item query in a loop.
+    """
+
+    with QueryRecorder(engine) as recorder:
+        yield recorder
+
+    repeated = recorder.repeated_shapes(max_repeats)
+    assert not repeated, "Likely N+1, repeated statements:\n" + "\n".join(
+        f"  {count}x {shape}" for shape, count in repeated.items()
+    )
+    assert recorder.count <= max_statements, (
+        f"{recorder.count} statements issued, budget is {max_statements}:\n{recorder.report()}"
+    )
@@ -0,0 +1,97 @@
+"""Tests for the async route layer enabled by DB_ASYNC."""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+from settings import get_settings
+
+pytest.importorskip("greenlet")
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_client(db_session, monkeypatch):
+    from main import create_app
+
+    monkeypatch.setenv("DB_ASYNC", "true")
+    get_settings.cache_clear()
+    app = create_app()
+    try:
+        with TestClient(app) as test_client:
+            yield test_client, app
+    finally:
+        get_settings.cache_clear()
+
+
+def test_async_routes_replace_sync_ones():
+    from routes import _without, expenses, reports
+    from routes.aio import expenses as async_expenses, reports as async_reports
+
+    def methods_by_path(router):
+        return {(route.path, method) for route in router.routes for method in route.methods}
+
+    remaining_expenses = methods_by_path(_without(expenses.router, async_expenses.router))
+    assert ("", "GET") not in remaining_expenses
+    assert ("", "POST") in remaining_expenses
+    assert ("/import", "POST") in remaining_expenses
+
+    remaining_reports = methods_by_path(_without(reports.router, async_reports.router))
+    assert ("/weekly.pdf", "GET") not in remaining_reports
+    assert ("/bundle.zip", "GET") in remaining_reports
+    assert all(asyncio.iscoroutinefunction(route.endpoint) for route in async_reports.router.routes)
+
+
+def test_async_routes_close_and_report_a_week(async_client, db_session, auth_headers):
+    client, _ = async_client
+    partner = db_session.query(models.Partner).filter(models.Partner.name == "Rafael").one()
+    db_session.add(models.Expense(date=date(2024, 1, 4), amount=Decimal("30.00"), partner_id=partner.id))
+    db_session.add(
+        models.WeeklyExpenseRollup(
+            week_end=date(2024, 1, 10), partner_id=partner.id, total=Decimal("30.00"), expense_count=1
+        )
+    )
+    db_session.commit()
+
+    closed = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "130.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+    assert closed.status_code == 200
+    assert closed.json()["reimb_rafael"] == "30.00"
+
+    listed = client.get("/api/reports/settlements", headers=auth_headers).json()
+    fetched = client.get(f"/api/settlements/{closed.json()['id']}", headers=auth_headers).json()
+    expenses = client.get("/api/expenses", headers=auth_headers).json()
+    csv_report = client.get("/api/reports/weekly.csv", params={"week_end": "2024-01-10"}, headers=auth_headers)
+    missing = client.get("/api/reports/weekly.csv", params={"week_end": "2024-01-17"}, headers=auth_headers)
+
+    assert listed["items"] == [fetched]
+    assert [item["amount"] for item in expenses["items"]] == ["30.00"]
+    assert csv_report.status_code == 200
+    assert missing.status_code == 404
+
+
+def test_async_and_sync_reports_share_cache_and_etags(async_client, client, db_session, auth_headers):
+    async_test_client, _ = async_client
+    closed = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "100.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+    assert closed.status_code == 200
+    params = {"week_end": "2024-01-10"}
+
+    from_sync = client.get("/api/reports/weekly.csv", params=params, headers=auth_headers)
+    from_async = async_test_client.get("/api/reports/weekly.csv", params=params, headers=auth_headers)
+    revalidated = async_test_client.get(
+        "/api/reports/weekly.csv", params=params, headers={**auth_headers, "If-None-Match": from_sync.headers["etag"]}
+    )
+
+    assert from_async.content == from_sync.content
+    assert from_async.headers["etag"] == from_sync.headers["etag"]
+    assert revalidated.status_code == 304
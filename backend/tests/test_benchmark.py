@@ -0,0 +1,21 @@
+"""Smoke test for the benchmark harness on the test database."""
+import models
+from benchmark import close_weeks, run_benchmarks, seed_expenses, week_ends
+from db import engine
+
+
+def test_benchmark_seeds_and_measures_every_endpoint(client, db_session, auth_headers):
+    weeks = week_ends(6)
+    seed_expenses(db_session, 300, weeks)
+    db_session.commit()
+    close_weeks(client, auth_headers, weeks[:4])
+
+    results = run_benchmarks(client, engine, weeks[:4], weeks[4:], iterations=2, memory_samples=0, headers=auth_headers)
+
+    assert db_session.query(models.Expense).count() == 300
+    assert db_session.query(models.Payout).count() == 6
+    assert set(results) == {"list_expenses", "close_week", "list_settlements", "weekly_pdf"}
+    for result in results.values():
+        assert result.requests == 2
+        assert 0 < result.p50_ms <= result.p99_ms
+        assert result.statements_per_request >= 1
@@ -0,0 +1,73 @@
+"""Tests for the bulk expense import."""
+import io
+import json
+from decimal import Decimal
+
+from sqlalchemy import event
+
+import models
+from db import engine
+from services.expense_import import import_expenses
+
+CSV_IMPORT = """﻿date,amount,partner_name,platform,category,note,receipt_url
+2024-01-04,10.50,Rafael,ifood,insumos,,
+2024-01-05,abc,Rafael,,,,
+2024-01-06,20.00,Guilherme,,,pão,https://example.com/r/1.jpg
+2024-01-07,5.00,Joao,,,,
+"""
+
+
+def test_import_csv_commits_valid_rows_and_reports_errors(client, db_session, auth_headers):
+    response = client.post(
+        "/api/expenses/import",
+        files={"file": ("planilha.csv", CSV_IMPORT.encode("utf-8"), "text/csv")},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["imported"] == 2
+    assert [error["line"] for error in body["errors"]] == [3, 5]
+    assert body["errors"][0]["detail"].startswith("amount:")
+
+    expenses = db_session.query(models.Expense).order_by(models.Expense.date).all()
+    assert [expense.note for expense in expenses] == [None, "pão"]
+    assert expenses[1].receipt_status == "uploaded"
+    summary = client.get("/api/expenses/summary", params={"week_end": "2024-01-10"}, headers=auth_headers).json()
+    assert Decimal(summary["rafael"]) == Decimal("10.50")
+    assert Decimal(summary["guilherme"]) == Decimal("20.00")
+
+
+def test_import_ndjson_inserts_in_batches(db_session):
+    lines = [json.dumps({"date": "2024-01-04", "amount": "1.00", "partner_name": "Rafael"})] * 5
+    lines.insert(2, "{not json")
+    inserts: list[int] = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO expenses"):
+            inserts.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", count_inserts)
+    try:
+        result = import_expenses(db_session, io.BytesIO("\n".join(lines).encode()), "ndjson", batch_size=2)
+        db_session.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_inserts)
+
+    assert result.imported == 5
+    assert result.errors == [(3, "Invalid JSON")]
+    assert inserts == [2, 2, 1]
+    assert db_session.query(models.Expense).count() == 5
+
+
+def test_import_accepts_any_partner_in_the_table(db_session):
+    db_session.add(models.Partner(name="Ana", split_ratio=Decimal("0.2")))
+    db_session.commit()
+    data = "date,amount,partner_name\n2024-01-04,3.00,Ana\n2024-01-04,4.00,Joao\n"
+
+    result = import_expenses(db_session, io.BytesIO(data.encode()), "csv")
+    db_session.commit()
+
+    assert result.imported == 1
+    assert result.errors == [(3, "Partner not found")]
+    assert db_session.query(models.Expense).one().partner.name == "Ana"
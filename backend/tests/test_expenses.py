@@ -0,0 +1,69 @@
+"""Tests for the expense listing endpoint."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event
+
+import models
+from db import engine
+
+
+def _seed_expenses(db_session, count: int) -> None:
+    partners = db_session.query(models.Partner).order_by(models.Partner.id).all()
+    start = date(2024, 1, 3)
+    for index in range(count):
+        db_session.add(
+            models.Expense(
+                date=start + timedelta(days=index // 3),
+                amount=Decimal("10.00") + index,
+                partner_id=partners[index % len(partners)].id,
+            )
+        )
+    db_session.commit()
+
+
+def test_list_expenses_pages_with_cursor(client, db_session, auth_headers):
+    _seed_expenses(db_session, 25)
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/expenses", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = [
+        expense.id
+        for expense in db_session.query(models.Expense).order_by(models.Expense.date.desc(), models.Expense.id.desc())
+    ]
+    assert seen == expected
+
+
+def test_list_expenses_resolves_partners_in_one_query(client, db_session, auth_headers):
+    _seed_expenses(db_session, 12)
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        response = client.get("/api/expenses", headers=auth_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert response.status_code == 200
+    assert {item["partner_name"] for item in response.json()["items"]} == {"Rafael", "Guilherme"}
+    assert len(statements) == 1
+
+
+def test_list_expenses_rejects_invalid_cursor(client, auth_headers):
+    response = client.get("/api/expenses", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,88 @@
+"""Tests for receipt image processing."""
+import io
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from services.images import ReceiptImageProcessor, process_image, store_receipt
+from services.storage import SupabaseStorageService
+
+
+def _photo(width: int, height: int) -> bytes:
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_process_image_downscales_and_builds_thumbnail():
+    original = _photo(1200, 800)
+
+    processed = process_image(original, max_dimension=400, quality=75, thumbnail_size=64)
+
+    assert processed is not None and processed.data is not None
+    assert len(processed.data) < len(original)
+    assert Image.open(io.BytesIO(processed.data)).size == (400, 267)
+    assert max(Image.open(io.BytesIO(processed.thumbnail)).size) == 64
+
+
+def test_process_image_ignores_non_images():
+    assert process_image(b"%PDF-1.4 not an image", 1000, 75, 128) is None
+
+
+def test_store_receipt_uploads_processed_image_and_thumbnail():
+    uploads: dict[str, bytes] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        uploads[request.url.path] = request.read()
+        return httpx.Response(200)
+
+    storage = SupabaseStorageService("https://example.supabase.co", "key", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    processor = ReceiptImageProcessor(max_dimension=300, quality=75, thumbnail_size=64, workers=1)
+    try:
+        receipt_url, thumbnail_url = store_receipt(
+            storage, io.BytesIO(_photo(900, 600)), Path("sha256/ab/abc.png"), "image/png", processor=processor
+        )
+    finally:
+        processor.shutdown()
+
+    assert receipt_url.endswith("/receipts/sha256/ab/abc.jpg")
+    assert thumbnail_url.endswith("/receipts/sha256/ab/abc.thumb.jpg")
+    assert Image.open(io.BytesIO(uploads["/storage/v1/object/receipts/sha256/ab/abc.jpg"])).size == (300, 200)
+
+
+def test_store_receipt_streams_documents_without_processing():
+    uploads: dict[str, bytes] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        uploads[request.url.path] = request.read()
+        return httpx.Response(200)
+
+    class RecordingProcessor:
+        calls = 0
+
+        def process(self, data: bytes):
+            self.calls += 1
+            return None
+
+    storage = SupabaseStorageService("https://example.supabase.co", "key", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    processor = RecordingProcessor()
+    document = b"%PDF-1.4" + b"x" * 1024
+
+    receipt_url, thumbnail_url = store_receipt(
+        storage, io.BytesIO(document), Path("sha256/ab/abc.pdf"), "image/jpeg", processor=processor
+    )
+
+    assert processor.calls == 0
+    assert thumbnail_url is None
+    assert uploads["/storage/v1/object/receipts/sha256/ab/abc.pdf"] == document
+    assert receipt_url.endswith("/receipts/sha256/ab/abc.pdf")
+
+
+def test_looks_like_image_recognizes_common_formats():
+    from services.images import looks_like_image
+
+    assert looks_like_image(_photo(8, 8)[:16])
+    assert looks_like_image(b"RIFF\x00\x00\x00\x00WEBPVP8 ")
+    assert not looks_like_image(b"%PDF-1.7")
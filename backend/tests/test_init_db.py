@@ -0,0 +1,16 @@
+"""Tests for the idempotent schema migrations run by init_db."""
+from sqlalchemy import inspect, text
+
+from db import engine
+from init_db import drop_obsolete_indexes
+
+
+def test_obsolete_indexes_are_dropped(db_session):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ix_expenses_partner_date_amount ON expenses (partner_id, date, amount)"))
+
+    drop_obsolete_indexes()
+    drop_obsolete_indexes()
+
+    names = {index["name"] for index in inspect(engine).get_indexes("expenses")}
+    assert "ix_expenses_partner_date_amount" not in names
@@ -0,0 +1,66 @@
+"""Tests for the Prometheus metrics endpoint."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import models
+from services.metrics import reset_metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def _sample(body: str, prefix: str) -> float:
+    matches = [line for line in body.splitlines() if line.startswith(prefix)]
+    assert len(matches) == 1, matches
+    return float(matches[0].rsplit(" ", 1)[1])
+
+
+def test_metrics_record_latency_size_and_statements_per_route(client, db_session, auth_headers):
+    partner = db_session.query(models.Partner).first()
+    for day in (1, 2):
+        db_session.add(models.Expense(date=date(2024, 1, day), amount=Decimal("10.00"), partner_id=partner.id))
+    db_session.commit()
+
+    response = client.get("/api/expenses", headers=auth_headers)
+    assert response.status_code == 200
+    client.get("/api/settlements/999999", headers=auth_headers)
+    client.get("/nowhere")
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = metrics.text
+
+    labels = 'method="GET",route="/api/expenses"'
+    assert _sample(body, f'http_requests_total{{{labels},status="200"}}') == 1
+    assert _sample(body, f'http_request_duration_seconds_count{{{labels}}}') == 1
+    assert _sample(body, f'http_response_size_bytes_sum{{{labels}}}') == len(response.content)
+    assert _sample(body, f'db_statements_per_request_sum{{{labels}}}') >= 1
+    assert _sample(body, f'db_statement_duration_seconds_count{{{labels}}}') == _sample(
+        body, f'db_statements_per_request_sum{{{labels}}}'
+    )
+    assert _sample(body, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 1
+    assert 'route="/api/settlements/{settlement_id}",status="404"' in body
+    assert 'route="<unmatched>",status="404"' in body
+    assert 'route="/metrics"' not in body
+
+
+def test_query_recorder_only_records_while_attached(db_session):
+    from sqlalchemy import select
+
+    from db import engine
+    from services.metrics import QueryRecorder
+
+    with QueryRecorder(engine) as recorder:
+        db_session.execute(select(models.Partner.id).where(models.Partner.id.in_([1, 2]))).all()
+        db_session.execute(select(models.Partner.id).where(models.Partner.id.in_([3]))).all()
+    db_session.execute(select(models.Partner.id)).all()
+
+    assert recorder.count == 2
+    assert list(recorder.repeated_shapes().values()) == [2]
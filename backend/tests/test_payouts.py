@@ -0,0 +1,132 @@
+"""Tests for the week closing endpoint."""
+from datetime import date
+from decimal import Decimal
+
+import models
+from services.rollup import apply_expenses
+
+
+def _add_expense(db_session, partner_name: str, day: date, amount: str) -> None:
+    partner = db_session.query(models.Partner).filter(models.Partner.name == partner_name).one()
+    expense = models.Expense(date=day, amount=Decimal(amount), partner_id=partner.id)
+    db_session.add(expense)
+    db_session.flush()
+    apply_expenses(db_session, [expense])
+
+
+def test_close_week_sums_expenses_per_partner(client, db_session, auth_headers):
+    _add_expense(db_session, "Rafael", date(2024, 1, 4), "300.00")
+    _add_expense(db_session, "Rafael", date(2024, 1, 10), "200.00")
+    _add_expense(db_session, "Guilherme", date(2024, 1, 3), "999.00")  # previous week
+    db_session.commit()
+
+    response = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "500.00", "ninety9_amount": "500.00"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["week_start"] == "2024-01-04"
+    assert Decimal(body["reimb_rafael"]) == Decimal("500.00")
+    assert Decimal(body["reimb_guilherme"]) == Decimal("0.00")
+    assert Decimal(body["total_rafael"]) == Decimal("775.00")
+    assert Decimal(body["total_guilherme"]) == Decimal("225.00")
+
+
+def test_settlement_payload_matches_response_schema(client, db_session, auth_headers):
+    import schemas
+
+    _add_expense(db_session, "Guilherme", date(2024, 1, 5), "12.34")
+    db_session.commit()
+    closed = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "100.10", "ninety9_amount": "0.05", "rule": "rent_after_split"},
+        headers=auth_headers,
+    ).json()
+
+    fetched = client.get(f"/api/settlements/{closed['id']}", headers=auth_headers).json()
+    listed = client.get("/api/reports/settlements", headers=auth_headers).json()
+
+    expected = schemas.SettlementResponse.model_validate(closed).model_dump(mode="json")
+    assert closed == expected
+    assert fetched == expected
+    assert listed["items"] == [expected]
+
+
+def test_close_weeks_backfills_in_one_batch(client, db_session, auth_headers):
+    _add_expense(db_session, "Rafael", date(2024, 1, 4), "100.00")
+    _add_expense(db_session, "Guilherme", date(2024, 1, 12), "40.00")
+    db_session.commit()
+    client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-24", "ifood_amount": "10.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+
+    weeks = [
+        {"week_end": "2024-01-17", "ifood_amount": "300.00", "ninety9_amount": "0.00"},
+        {"week_end": "2024-01-10", "ifood_amount": "500.00", "ninety9_amount": "0.00"},
+        {"week_end": "2024-01-11", "ifood_amount": "1.00", "ninety9_amount": "0.00"},
+        {"week_end": "2024-01-24", "ifood_amount": "1.00", "ninety9_amount": "0.00"},
+        {"week_end": "2024-01-10", "ifood_amount": "1.00", "ninety9_amount": "0.00"},
+    ]
+    response = client.post("/api/payouts/close_weeks", json=weeks, headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["week_end"] for item in body["closed"]] == ["2024-01-10", "2024-01-17"]
+    assert body["closed"][0]["reimb_rafael"] == "100.00"
+    assert body["closed"][1]["reimb_guilherme"] == "40.00"
+    assert body["errors"] == [
+        {"week_end": "2024-01-10", "detail": "Week repeated in batch"},
+        {"week_end": "2024-01-11", "detail": "week_end must be a Wednesday"},
+        {"week_end": "2024-01-24", "detail": "Week already closed"},
+    ]
+    single = client.get(f"/api/settlements/{body['closed'][1]['id']}", headers=auth_headers).json()
+    assert single == body["closed"][1]
+
+
+def test_close_week_stores_a_share_per_partner(client, db_session, auth_headers):
+    for partner in db_session.query(models.Partner):
+        partner.split_ratio = Decimal("0.4")
+    db_session.add(models.Partner(name="Ana", split_ratio=Decimal("0.2")))
+    db_session.flush()
+    _add_expense(db_session, "Ana", date(2024, 1, 5), "25.00")
+    db_session.commit()
+
+    body = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "575.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    ).json()
+
+    shares = {share["partner_name"]: share for share in body["partners"]}
+    assert set(shares) == {"Rafael", "Guilherme", "Ana"}
+    assert shares["Ana"] == {
+        "partner_id": shares["Ana"]["partner_id"],
+        "partner_name": "Ana",
+        "split_ratio": "0.2000",
+        "reimb": "25.00",
+        "share": "100.00",
+        "total": "125.00",
+    }
+    assert shares["Rafael"]["total"] == body["total_rafael"] == "250.00"
+    assert body["net_for_split"] == "500.00"
+    assert db_session.query(models.SettlementShare).count() == 3
+
+
+def test_close_week_with_a_single_partner(client, db_session, auth_headers):
+    db_session.query(models.Partner).filter(models.Partner.name == "Guilherme").delete()
+    db_session.query(models.Partner).update({models.Partner.split_ratio: Decimal("1")})
+    db_session.commit()
+
+    response = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "100.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert [share["partner_name"] for share in response.json()["partners"]] == ["Rafael"]
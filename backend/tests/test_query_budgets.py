@@ -0,0 +1,64 @@
+"""Statement budgets per route, so N+1 queries fail here instead of under production volume."""
+import pytest
+from sqlalchemy import select
+
+import models
+
+from benchmark import close_weeks, seed_expenses, week_ends
+from db import engine
+from services.metrics import statement_shape
+from tests.query_budget import query_budget
+
+WEEKS = week_ends(8)
+CLOSED = WEEKS[:6]
+
+
+@pytest.fixture
+def seeded(client, db_session, auth_headers):
+    # Enough rows per page that a per-row query would repeat its shape many times.
+    seed_expenses(db_session, 400, WEEKS)
+    db_session.commit()
+    close_weeks(client, auth_headers, CLOSED)
+    return client
+
+
+@pytest.mark.parametrize(
+    ("method", "url", "budget"),
+    [
+        ("GET", "/api/expenses?limit=100", 1),
+        ("GET", f"/api/expenses/summary?week_end={WEEKS[0]}", 2),
+        ("GET", "/api/reports/settlements", 2),
+        ("GET", "/api/reports/settlements/aggregates", 2),
+        ("GET", "/api/settlements/1", 2),
+        ("GET", f"/api/reports/weekly.csv?week_end={CLOSED[-1]}", 3),
+        ("GET", f"/api/reports/weekly.pdf?week_end={CLOSED[-2]}", 3),
+    ],
+)
+def test_read_routes_stay_within_budget(seeded, auth_headers, method, url, budget):
+    with query_budget(engine, max_statements=budget):
+        response = seeded.request(method, url, headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_close_routes_stay_within_budget(seeded, auth_headers):
+    payload = {"week_end": WEEKS[6].isoformat(), "ifood_amount": "100.00", "ninety9_amount": "0.00"}
+    with query_budget(engine, max_statements=8):
+        assert seeded.post("/api/payouts/close_week", json=payload, headers=auth_headers).status_code == 200
+
+    payload = {**payload, "week_end": WEEKS[7].isoformat()}
+    with query_budget(engine, max_statements=8):
+        assert seeded.post("/api/payouts/close_weeks", json=[payload], headers=auth_headers).status_code == 200
+
+
+def test_query_budget_flags_repeated_statement_shapes(db_session):
+    partner_ids = [partner.id for partner in db_session.query(models.Partner)]
+
+    with pytest.raises(AssertionError, match="Likely N\\+1"):
+        with query_budget(engine, max_statements=100):
+            # The per-item loop an N+1 boils down to: same statement, different parameters.
+            for partner_id in partner_ids:
+                db_session.execute(select(models.Expense.id).where(models.Expense.partner_id == partner_id)).all()
+
+
+def test_statement_shape_ignores_in_list_length():
+    assert statement_shape("SELECT a FROM t WHERE id IN (?, ?)") == statement_shape("SELECT a\n FROM t WHERE id IN (?)")
@@ -0,0 +1,133 @@
+"""Tests for the background receipt upload queue."""
+import hashlib
+import io
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+from db import SessionLocal
+from services.receipt_queue import process_pending_uploads
+from services.storage import SupabaseStorageService
+from settings import get_settings
+
+
+@pytest.fixture
+def background_client(db_session, fake_storage, tmp_path, monkeypatch):
+    monkeypatch.setenv("RECEIPT_UPLOAD_MODE", "background")
+    monkeypatch.setenv("RECEIPT_SPOOL_DIR", str(tmp_path / "spool"))
+    get_settings.cache_clear()
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _post_expense(client, auth_headers, content: bytes):
+    return client.post(
+        "/api/expenses",
+        data={"amount": "42.50", "date_value": "2024-03-06", "partner_name": "Rafael"},
+        files={"file": ("nota.JPG", io.BytesIO(content), "image/jpeg")},
+        headers=auth_headers,
+    )
+
+
+def test_create_expense_returns_pending_and_worker_uploads(background_client, fake_storage, db_session, auth_headers):
+    response = _post_expense(background_client, auth_headers, b"receipt-bytes")
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["receipt_status"] == "pending"
+    assert body["receipt_url"] is None
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        db_session.expire_all()
+        expense = db_session.get(models.Expense, body["id"])
+        if expense.receipt_status == "uploaded":
+            break
+        time.sleep(0.05)
+
+    assert expense.receipt_status == "uploaded"
+    digest = hashlib.sha256(b"receipt-bytes").hexdigest()
+    assert expense.receipt_url == f"{fake_storage.url}/storage/v1/object/public/receipts/sha256/{digest[:2]}/{digest}.jpg"
+    assert list(fake_storage.objects.values()) == [b"receipt-bytes"]
+    assert db_session.query(models.PendingReceiptUpload).count() == 0
+
+    duplicate = _post_expense(background_client, auth_headers, b"receipt-bytes").json()
+    assert duplicate["receipt_status"] == "uploaded"
+    assert duplicate["receipt_url"] == expense.receipt_url
+    assert db_session.query(models.PendingReceiptUpload).count() == 0
+    assert len(fake_storage.objects) == 1
+
+
+def test_failed_uploads_back_off_and_retry(db_session, fake_storage, tmp_path):
+    spool_path = tmp_path / "receipt.jpg"
+    spool_path.write_bytes(b"retry-me")
+    partner = db_session.query(models.Partner).first()
+    expense = models.Expense(date=datetime(2024, 3, 6).date(), amount=10, partner_id=partner.id, receipt_status="pending")
+    db_session.add(expense)
+    db_session.flush()
+    db_session.add(
+        models.PendingReceiptUpload(expense_id=expense.id, spool_path=str(spool_path), destination="2024/10/r.jpg")
+    )
+    db_session.commit()
+
+    storage = SupabaseStorageService(fake_storage.url, "service-key")
+    fake_storage.fail_next = 1
+    now = datetime.utcnow()
+
+    assert process_pending_uploads(SessionLocal, storage, max_attempts=3, now=now) == 0
+    job = db_session.query(models.PendingReceiptUpload).one()
+    db_session.refresh(job)
+    assert job.attempts == 1
+    assert job.next_attempt_at > now
+
+    assert process_pending_uploads(SessionLocal, storage, max_attempts=3, now=now) == 0  # not due yet
+    assert process_pending_uploads(SessionLocal, storage, max_attempts=3, now=now + timedelta(hours=1)) == 1
+
+    db_session.refresh(expense)
+    assert expense.receipt_status == "uploaded"
+    assert fake_storage.objects == {"receipts/2024/10/r.jpg": b"retry-me"}
+    assert not spool_path.exists()
+    storage.close()
+
+
+def test_failed_transaction_removes_spooled_receipt(background_client, db_session, auth_headers, tmp_path, monkeypatch):
+    def fail(db, expenses):
+        raise RuntimeError("rollup failed")
+
+    monkeypatch.setattr("routes.expenses.apply_expenses", fail)
+
+    with pytest.raises(RuntimeError, match="rollup failed"):
+        _post_expense(background_client, auth_headers, b"never-committed")
+
+    assert list((tmp_path / "spool").iterdir()) == []
+    assert db_session.query(models.PendingReceiptUpload).count() == 0
+
+
+def test_jobs_claimed_by_another_worker_are_skipped(db_session, fake_storage, tmp_path):
+    from services.receipt_queue import _claim
+
+    spool_path = tmp_path / "receipt.jpg"
+    spool_path.write_bytes(b"claimed")
+    partner = db_session.query(models.Partner).first()
+    expense = models.Expense(date=datetime(2024, 3, 6).date(), amount=10, partner_id=partner.id, receipt_status="pending")
+    db_session.add(expense)
+    db_session.flush()
+    job = models.PendingReceiptUpload(expense_id=expense.id, spool_path=str(spool_path), destination="2024/10/c.jpg")
+    db_session.add(job)
+    db_session.commit()
+    now = datetime.utcnow()
+
+    with SessionLocal() as other_worker:
+        assert _claim(other_worker, job.id, now)
+        assert not _claim(other_worker, job.id, now)
+
+    storage = SupabaseStorageService(fake_storage.url, "service-key")
+    assert process_pending_uploads(SessionLocal, storage, max_attempts=3, now=now) == 0
+    assert fake_storage.objects == {}
+    assert spool_path.exists()
+    storage.close()
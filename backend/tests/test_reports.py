@@ -0,0 +1,327 @@
+"""Tests for the weekly report exports."""
+import io
+import zipfile
+
+import pytest
+
+
+@pytest.fixture
+def closed_week(client, auth_headers):
+    response = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "500.00", "ninety9_amount": "250.00"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("fmt, media_type", [("pdf", "application/pdf"), ("csv", "text/csv; charset=utf-8")])
+def test_weekly_report_is_rendered_once_and_revalidated(client, closed_week, auth_headers, monkeypatch, fmt, media_type):
+    from services.report_render import ReportRenderPool
+
+    calls = []
+    submit = ReportRenderPool.submit
+
+    def counting_submit(self, fmt, week_end, *args):
+        calls.append(week_end)
+        return submit(self, fmt, week_end, *args)
+
+    monkeypatch.setattr(ReportRenderPool, "submit", counting_submit)
+    url = f"/api/reports/weekly.{fmt}"
+    params = {"week_end": "2024-01-10"}
+
+    first = client.get(url, params=params, headers=auth_headers)
+    second = client.get(url, params=params, headers=auth_headers)
+    revalidated = client.get(url, params=params, headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == media_type
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_share_one_render(client, closed_week, auth_headers, monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from services.report_cache import ReportCache
+    from services.report_render import ReportRenderPool
+
+    lookups = []
+    get = ReportCache.get
+
+    def counting_get(self, key):
+        lookups.append(key)
+        return get(self, key)
+
+    calls = []
+    released = threading.Event()
+    submit = ReportRenderPool.submit
+
+    def slow_submit(self, *args):
+        calls.append(args)
+        released.wait(5)
+        return submit(self, *args)
+
+    monkeypatch.setattr(ReportCache, "get", counting_get)
+    monkeypatch.setattr(ReportRenderPool, "submit", slow_submit)
+    params = {"week_end": "2024-01-10"}
+    with ThreadPoolExecutor(2) as executor:
+        responses = [
+            executor.submit(client.get, "/api/reports/weekly.csv", params=params, headers=auth_headers) for _ in range(2)
+        ]
+        # Hold the render until both requests missed the cache; the one that renders looks twice.
+        deadline = time.monotonic() + 5
+        while len(lookups) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        released.set()
+        first, second = (response.result() for response in responses)
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert len(calls) == 1
+
+
+def test_failed_render_is_a_500_without_etag(client, closed_week, auth_headers, monkeypatch):
+    from concurrent.futures import Future
+
+    from services.report_render import ReportRenderPool
+
+    def failing_submit(self, *args):
+        future = Future()
+        future.set_exception(RuntimeError("renderer crashed"))
+        return future
+
+    params = {"week_end": "2024-01-10"}
+    with monkeypatch.context() as patch:
+        patch.setattr(ReportRenderPool, "submit", failing_submit)
+        failed = client.get("/api/reports/weekly.pdf", params=params, headers=auth_headers)
+
+    assert failed.status_code == 500
+    assert "etag" not in failed.headers
+    retried = client.get("/api/reports/weekly.pdf", params=params, headers=auth_headers)
+    assert retried.status_code == 200
+    assert retried.content.startswith(b"%PDF")
+
+
+def test_weekly_report_lists_the_expenses_settled_with_the_week(client, db_session, auth_headers):
+    from datetime import date
+    from decimal import Decimal
+
+    import models
+    from services.rollup import apply_expenses
+
+    partner = db_session.query(models.Partner).filter(models.Partner.name == "Guilherme").one()
+    settled = models.Expense(
+        date=date(2024, 1, 5), amount=Decimal("42.50"), partner_id=partner.id, category="gas", platform="ifood"
+    )
+    db_session.add(settled)
+    db_session.flush()
+    apply_expenses(db_session, [settled])
+    db_session.commit()
+    client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-10", "ifood_amount": "500.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+    # Recorded after the close: not part of the settlement, so not listed.
+    db_session.add(models.Expense(date=date(2024, 1, 6), amount=Decimal("9.99"), partner_id=partner.id))
+    db_session.commit()
+
+    response = client.get("/api/reports/weekly.csv", params={"week_end": "2024-01-10"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    lines = response.content.decode("utf-8-sig").splitlines()
+    assert lines[lines.index("Data;Parceiro;Categoria;Plataforma;Valor") + 1 :] == [
+        "2024-01-05;Guilherme;gas;ifood;42.50"
+    ]
+
+
+def test_report_cache_keys_on_the_settlement_creation_time(tmp_path):
+    from datetime import datetime
+
+    from services.report_cache import ReportCache, report_cache_key, report_etag
+
+    first = report_cache_key(1, datetime(2024, 1, 10, 12, 0), "pdf")
+    reused_id = report_cache_key(1, datetime(2024, 1, 17, 9, 30), "pdf")
+    cache = ReportCache(max_bytes=1024, directory=tmp_path)
+    cache.put(first, b"first settlement")
+
+    assert cache.get(first) == b"first settlement"
+    assert cache.get(reused_id) is None
+    assert ReportCache(max_bytes=1024, directory=tmp_path).get(reused_id) is None
+    assert report_etag(first) != report_etag(reused_id)
+
+
+def test_weekly_pdf_pages_long_expense_lists(closed_week):
+    from datetime import date
+
+    from services.report_render import render_pdf
+
+    breakdown = {**closed_week, "expenses": {}}
+    week_end = date(2024, 1, 10)
+    expenses = [("2024-01-05", "Rafael", "combustivel", "ifood", f"{index}.00") for index in range(150)]
+
+    assert render_pdf(week_end, "50-50", breakdown).count(b"/Type /Page\n") == 1
+    assert render_pdf(week_end, "50-50", breakdown, expenses).count(b"/Type /Page\n") == 4
+
+
+def test_weekly_pdf_renders_identical_bytes(client, closed_week, auth_headers):
+    from datetime import date
+
+    from services.report_render import render_pdf
+
+    breakdown = {**closed_week, "expenses": {}}
+    week_end = date(2024, 1, 10)
+    assert render_pdf(week_end, "50-50", breakdown) == render_pdf(week_end, "50-50", breakdown)
+
+
+def test_report_bundle_streams_every_closed_week(client, closed_week, auth_headers):
+    from services.report_render import shutdown_render_pools
+
+    response = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": "2024-01-17", "ifood_amount": "300.00", "ninety9_amount": "0.00"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    # Served from the cache instead of the render pool.
+    client.get("/api/reports/weekly.csv", params={"week_end": "2024-01-10"}, headers=auth_headers)
+
+    try:
+        bundle = client.get(
+            "/api/reports/bundle.zip", params={"start": "2024-01-01", "end": "2024-01-31"}, headers=auth_headers
+        )
+    finally:
+        shutdown_render_pools()
+
+    assert bundle.status_code == 200
+    assert bundle.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(bundle.content)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == [
+            "relatorio-2024-01-10.csv",
+            "relatorio-2024-01-10.pdf",
+            "relatorio-2024-01-17.csv",
+            "relatorio-2024-01-17.pdf",
+        ]
+        assert archive.read("relatorio-2024-01-17.pdf").startswith(b"%PDF")
+
+    empty = client.get("/api/reports/bundle.zip", params={"start": "2023-01-01", "end": "2023-01-31"}, headers=auth_headers)
+    assert empty.status_code == 404
+
+
+def _close(client, auth_headers, week_end, ifood, rent="50.00"):
+    response = client.post(
+        "/api/payouts/close_week",
+        json={"week_end": week_end, "ifood_amount": ifood, "ninety9_amount": "0.00", "rent_fee": rent},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+
+def test_settlements_are_paginated_by_week(client, db_session, auth_headers):
+    for week_end in ("2024-01-10", "2024-01-17", "2024-01-24"):
+        _close(client, auth_headers, week_end, "100.00")
+
+    first = client.get("/api/reports/settlements", params={"limit": 2}, headers=auth_headers).json()
+    second = client.get(
+        "/api/reports/settlements", params={"limit": 2, "cursor": first["next_cursor"]}, headers=auth_headers
+    ).json()
+
+    assert [item["week_end"] for item in first["items"]] == ["2024-01-24", "2024-01-17"]
+    assert [item["week_end"] for item in second["items"]] == ["2024-01-10"]
+    assert second["next_cursor"] is None
+    invalid = client.get("/api/reports/settlements", params={"cursor": "!!"}, headers=auth_headers)
+    assert invalid.status_code == 422
+
+
+def test_settlement_aggregates_per_month_and_year(client, db_session, auth_headers):
+    _close(client, auth_headers, "2024-01-24", "100.00")
+    _close(client, auth_headers, "2024-01-31", "200.50", rent="40.00")
+    _close(client, auth_headers, "2024-02-07", "300.00")
+
+    months = client.get("/api/reports/settlements/aggregates", headers=auth_headers).json()
+    years = client.get("/api/reports/settlements/aggregates", params={"period": "year"}, headers=auth_headers).json()
+
+    assert [(item["period"], item["weeks"]) for item in months] == [("2024-01", 2), ("2024-02", 1)]
+    assert months[0]["income_total"] == "300.50"
+    assert months[0]["rent_fee"] == "90.00"
+    assert months[0]["net_for_split"] == "210.50"
+    assert months[0]["partners"]["Rafael"]["total"] == "195.25"
+    assert months[0]["partners"]["Guilherme"]["share"] == "105.25"
+    assert years == [
+        {
+            "period": "2024",
+            "year": 2024,
+            "month": None,
+            "weeks": 3,
+            "income_total": "600.50",
+            "rent_fee": "140.00",
+            "net_for_split": "460.50",
+            "partners": {
+                "Rafael": {"reimb": "0.00", "share": "230.25", "total": "370.25"},
+                "Guilherme": {"reimb": "0.00", "share": "230.25", "total": "230.25"},
+            },
+        }
+    ]
+
+
+def test_simulation_replays_history_under_other_rules(client, db_session, auth_headers):
+    _close(client, auth_headers, "2024-01-10", "100.01")
+    _close(client, auth_headers, "2024-01-17", "20.00", rent="50.00")
+
+    response = client.post(
+        "/api/reports/simulation",
+        json={"scenarios": [{"rule": "rent_after_split", "split_rafael": "0.6", "split_guilherme": "0.4"}]},
+        headers=auth_headers,
+    )
+    default = client.post("/api/reports/simulation", json={}, headers=auth_headers).json()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["actual"]["weeks"] == 2
+    assert body["actual"]["total_rafael"] == "110.01"
+    scenario = body["scenarios"][0]
+    assert scenario["totals"]["net_for_split"] == "120.01"
+    assert scenario["totals"]["total_rafael"] == "172.01"
+    assert scenario["delta_rafael"] == "62.00"
+    assert [item["rule"] for item in default["scenarios"]] == ["rent_before_split", "rent_after_split"]
+    assert default["scenarios"][0]["totals"] == body["actual"]
+
+
+def test_reports_cover_every_partner_of_the_week(client, db_session, auth_headers):
+    from datetime import date
+    from decimal import Decimal
+
+    import models
+    from services.rollup import apply_expenses
+
+    for partner in db_session.query(models.Partner):
+        partner.split_ratio = Decimal("0.4")
+    ana = models.Partner(name="Ana", split_ratio=Decimal("0.2"))
+    db_session.add(ana)
+    db_session.flush()
+    expense = models.Expense(date=date(2024, 1, 5), amount=Decimal("25.00"), partner_id=ana.id)
+    db_session.add(expense)
+    db_session.flush()
+    apply_expenses(db_session, [expense])
+    db_session.commit()
+    _close(client, auth_headers, "2024-01-10", "575.00")
+
+    months = client.get("/api/reports/settlements/aggregates", headers=auth_headers).json()
+    assert months[0]["partners"]["Ana"] == {"reimb": "25.00", "share": "100.00", "total": "125.00"}
+    assert months[0]["partners"]["Rafael"]["total"] == "250.00"
+
+    csv = client.get("/api/reports/weekly.csv", params={"week_end": "2024-01-10"}, headers=auth_headers)
+    rows = csv.content.decode("utf-8-sig").splitlines()
+    assert "Despesas Ana;25.00" in rows
+    assert {"Total Rafael;250.00", "Total Guilherme;200.00", "Total Ana;125.00"} <= set(rows)
+
+    simulation = client.post("/api/reports/simulation", json={}, headers=auth_headers)
+    assert simulation.status_code == 409
@@ -0,0 +1,44 @@
+"""Tests for the weekly expense rollup."""
+from datetime import date
+from decimal import Decimal
+
+import models
+from services.rollup import apply_expenses, rebuild_rollups, weekly_totals_by_partner
+from services.scheduler import week_end_for
+
+
+def _rollup_rows(db_session) -> set[tuple]:
+    return {
+        (row.week_end, row.partner_id, row.category, row.platform, Decimal(row.total), row.expense_count)
+        for row in db_session.query(models.WeeklyExpenseRollup)
+    }
+
+
+def test_week_end_for_maps_days_to_closing_wednesday():
+    assert week_end_for(date(2024, 1, 4)) == date(2024, 1, 10)  # Thursday opens the week
+    assert week_end_for(date(2024, 1, 10)) == date(2024, 1, 10)
+    assert week_end_for(date(2024, 1, 11)) == date(2024, 1, 17)
+
+
+def test_incremental_rollup_matches_rebuild(db_session):
+    rafael, guilherme = db_session.query(models.Partner).order_by(models.Partner.id).all()
+    entries = [
+        (date(2024, 1, 4), rafael, "30.10", "mercado", None),
+        (date(2024, 1, 9), rafael, "19.95", "mercado", None),
+        (date(2024, 1, 10), guilherme, "7.00", None, "iFood"),
+        (date(2024, 1, 11), guilherme, "12.00", None, "iFood"),
+    ]
+    for day, partner, amount, category, platform in entries:
+        expense = models.Expense(date=day, amount=Decimal(amount), partner_id=partner.id, category=category, platform=platform)
+        db_session.add(expense)
+        db_session.flush()
+        apply_expenses(db_session, [expense])
+    db_session.commit()
+
+    incremental = _rollup_rows(db_session)
+    rebuild_rollups(db_session)
+    db_session.commit()
+
+    assert _rollup_rows(db_session) == incremental
+    totals = weekly_totals_by_partner(db_session, date(2024, 1, 10), [rafael.id, guilherme.id])
+    assert totals == {rafael.id: Decimal("50.05"), guilherme.id: Decimal("7.00")}
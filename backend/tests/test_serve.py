@@ -0,0 +1,26 @@
+"""Pre-fork serving: workers must not inherit the parent's connections or pools."""
+import os
+
+import pytest
+
+import db
+from services.storage import _local_storage_factory, get_storage_service
+from settings import get_settings
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_workers_build_their_own_engine_pool_and_storage(db_session):
+    engine = db.init_engine()
+    parent_pool = engine.pool
+    get_storage_service(get_settings())
+    assert _local_storage_factory.cache_info().currsize == 1
+
+    pid = os.fork()
+    if pid == 0:
+        fresh_pool = engine.pool is not parent_pool
+        storage_forgotten = _local_storage_factory.cache_info().currsize == 0
+        os._exit(0 if fresh_pool and storage_forgotten else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert engine.pool is parent_pool
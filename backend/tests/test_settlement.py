@@ -33,3 +33,77 @@ def test_compute_settlement_negative_net():
     assert result["net_for_split"] == Decimal("-450.00")
     assert result["total_rafael"] == Decimal("625.00")
     assert result["total_guilherme"] == Decimal("-25.00")
+
+
+@pytest.mark.parametrize("rule", ["rent_before_split", "rent_after_split"])
+@pytest.mark.parametrize("split", [(Decimal("0.5"), Decimal("0.5")), (Decimal("0.3333"), Decimal("0.6667")), (Decimal("0.125"), Decimal("0.9"))])
+def test_batch_engine_matches_decimal_engine(rule, split):
+    import random
+
+    from services.money import from_cents
+    from services.settlement_batch import compute_settlements
+
+    rng = random.Random(f"{rule}-{split}")
+    weeks = [
+        (rng.randint(0, 500_000), rng.randint(0, 300_000), rng.randint(0, 300_000), rng.randint(0, 10_000))
+        for _ in range(500)
+    ]
+    income, reimb_rafael, reimb_guilherme, rent = (list(column) for column in zip(*weeks))
+
+    columns = compute_settlements(income, reimb_rafael, reimb_guilherme, rent, split=split, rule=rule)
+
+    for index, (week_income, week_rafael, week_guilherme, week_rent) in enumerate(weeks):
+        expected = compute_settlement(
+            {"Rafael": from_cents(week_rafael), "Guilherme": from_cents(week_guilherme)},
+            from_cents(week_income),
+            Decimal("0"),
+            rent_fee=from_cents(week_rent),
+            split=split,
+            rule=rule,
+        )
+        assert {name: from_cents(values[index]) for name, values in columns.items()} == expected
+
+
+@pytest.mark.parametrize("rule", ["rent_before_split", "rent_after_split"])
+def test_partner_core_matches_decimal_engine(rule):
+    import random
+
+    from services.money import from_cents
+    from services.settlement import compute_partner_settlement
+
+    rng = random.Random(rule)
+    for _ in range(2000):
+        ratio = Decimal(rng.randint(0, 10_000)) / 10_000
+        split = (ratio, 1 - ratio)
+        expenses = {"Rafael": rng.randint(0, 300_000), "Guilherme": rng.randint(0, 300_000)}
+        income, rent = rng.randint(0, 500_000), rng.randint(0, 10_000)
+
+        result = compute_partner_settlement(
+            expenses, income, rent, {"Rafael": split[0], "Guilherme": split[1]}, rule=rule
+        )
+        expected = compute_settlement(
+            {name: from_cents(cents) for name, cents in expenses.items()},
+            from_cents(income),
+            Decimal("0"),
+            rent_fee=from_cents(rent),
+            split=split,
+            rule=rule,
+        )
+        assert result.legacy_breakdown() == expected
+
+
+def test_partner_core_settles_three_partners():
+    from services.settlement import compute_partner_settlement
+
+    result = compute_partner_settlement(
+        {"Rafael": 1000, "Ana": 500},
+        100_000,
+        5000,
+        {"Rafael": "0.3333", "Guilherme": "0.3333", "Ana": "0.3334"},
+        rent_payee="Ana",
+    )
+
+    assert result.net_for_split == 93_500
+    assert result.partners["Guilherme"].share == 31_164
+    assert result.partners["Rafael"].total == 1000 + 31_164
+    assert result.partners["Ana"].total == 500 + 5000 + 31_173
@@ -0,0 +1,38 @@
+"""Cold start: heavy optional modules stay out of the import of the app."""
+import subprocess
+import sys
+from pathlib import Path
+
+from startup_report import by_package, parse_importtime
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_skips_heavy_modules_and_the_engine():
+    probe = (
+        "import sys, main, db\n"
+        "print(sorted(m for m in ('reportlab', 'PIL', 'httpx') if m in sys.modules))\n"
+        "print(db._engine is None)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ["[]", "True"]
+
+
+def test_parse_importtime_stops_at_the_root_module():
+    output = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |     sqlalchemy.sql",
+            "import time:       300 |        400 |   sqlalchemy",
+            "import time:       200 |        600 | main",
+            "import time:        50 |         50 | fastapi.testclient",
+        ]
+    )
+
+    timings = parse_importtime(output)
+
+    assert [(timing.module, timing.depth) for timing in timings] == [("sqlalchemy.sql", 2), ("sqlalchemy", 1), ("main", 0)]
+    assert timings[-1].cumulative_ms == 0.6
+    assert by_package(timings) == {"sqlalchemy": 0.4, "main": 0.2}
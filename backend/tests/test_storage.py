@@ -0,0 +1,287 @@
+"""Tests for the Supabase storage client."""
+import io
+from pathlib import Path
+
+import httpx
+import pytest
+
+from services.storage import UPLOAD_CHUNK_SIZE, LocalStorageService, SupabaseStorageService
+
+
+def test_upload_receipt_streams_chunks_over_shared_client():
+    received: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        received.append(request)
+        return httpx.Response(200, json={"Key": request.url.path})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    service = SupabaseStorageService("https://example.supabase.co/", "service-key", client=client)
+    payload = b"x" * (UPLOAD_CHUNK_SIZE * 3 + 17)
+
+    first = service.upload_receipt(io.BytesIO(payload), Path("2024/02/a.jpg"), content_type="image/jpeg")
+    service.upload_receipt(io.BytesIO(b"second"), Path("2024/02/b.png"))
+
+    assert first == "https://example.supabase.co/storage/v1/object/public/receipts/2024/02/a.jpg"
+    assert received[0].url.path == "/storage/v1/object/receipts/2024/02/a.jpg"
+    assert received[0].headers["Content-Length"] == str(len(payload))
+    assert received[0].headers["Content-Type"] == "image/jpeg"
+    assert received[0].content == payload
+    assert received[1].headers["Content-Type"] == "application/octet-stream"
+
+
+def test_upload_receipt_wraps_http_errors():
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+    service = SupabaseStorageService("https://example.supabase.co", "service-key", client=client)
+
+    with pytest.raises(RuntimeError):
+        service.upload_receipt(io.BytesIO(b"data"), Path("2024/02/c.jpg"))
+
+
+def test_signed_upload_flow_creates_expense(client, fake_storage, auth_headers):
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.PNG"},
+        headers=auth_headers,
+    ).json()
+    expense = {
+        "date": "2024-03-06",
+        "amount": "18.90",
+        "partner_name": "Guilherme",
+        "receipt_path": target["path"],
+    }
+
+    assert target["path"].startswith("2024/10/") and target["path"].endswith(".png")
+    missing = client.post("/api/expenses/confirm", json=expense, headers=auth_headers)
+    assert missing.status_code == 409
+
+    httpx.put(target["upload_url"], content=b"png-bytes").raise_for_status()
+    response = client.post("/api/expenses/confirm", json=expense, headers=auth_headers)
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["receipt_url"] == f"{fake_storage.url}/storage/v1/object/public/receipts/{target['path']}"
+    assert body["receipt_status"] == "uploaded"
+    assert fake_storage.objects[f"receipts/{target['path']}"] == b"png-bytes"
+
+    replay = client.post("/api/expenses/confirm", json=expense, headers=auth_headers)
+    assert replay.status_code == 409
+
+
+def test_confirm_validates_partner_against_the_table(client, db_session, fake_storage, auth_headers):
+    import models
+
+    db_session.add(models.Partner(name="Ana", split_ratio=0.2))
+    db_session.commit()
+    target = client.post(
+        "/api/expenses/receipt_upload", json={"date": "2024-03-06", "filename": "nota.jpg"}, headers=auth_headers
+    ).json()
+    httpx.put(target["upload_url"], content=b"jpeg-bytes").raise_for_status()
+    expense = {"date": "2024-03-06", "amount": "2.00", "receipt_path": target["path"]}
+
+    unknown = client.post("/api/expenses/confirm", json={**expense, "partner_name": "Joao"}, headers=auth_headers)
+    assert unknown.status_code == 404
+    response = client.post("/api/expenses/confirm", json={**expense, "partner_name": "Ana"}, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json()["partner_name"] == "Ana"
+
+
+def test_signed_upload_normalizes_unusual_suffixes(client, fake_storage, auth_headers):
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.jpg~"},
+        headers=auth_headers,
+    ).json()
+    assert target["path"].endswith(".bin")
+
+    httpx.put(target["upload_url"], content=b"bytes").raise_for_status()
+    response = client.post(
+        "/api/expenses/confirm",
+        json={"date": "2024-03-06", "amount": "1.00", "partner_name": "Rafael", "receipt_path": target["path"]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+
+
+def test_signed_upload_skips_known_receipt(client, db_session, fake_storage, auth_headers):
+    from services.receipt_index import remember_receipt
+
+    digest = "ab" * 32
+    remember_receipt(db_session, digest, "https://example.supabase.co/storage/v1/object/public/receipts/x.png")
+    db_session.commit()
+
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.png", "sha256": digest},
+        headers=auth_headers,
+    ).json()
+    assert target["upload_url"] is None
+    assert target["path"] == f"sha256/ab/{digest}.png"
+
+    response = client.post(
+        "/api/expenses/confirm",
+        json={"date": "2024-03-06", "amount": "5.00", "partner_name": "Rafael", "receipt_path": target["path"]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    assert response.json()["receipt_url"] == "https://example.supabase.co/storage/v1/object/public/receipts/x.png"
+
+
+def test_signed_upload_indexes_verified_hash(client, db_session, fake_storage, auth_headers):
+    import hashlib
+
+    import models
+
+    content = b"receipt-bytes"
+    digest = hashlib.sha256(content).hexdigest()
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.png", "sha256": digest},
+        headers=auth_headers,
+    ).json()
+    assert target["path"] == f"sha256/{digest[:2]}/{digest}.png"
+
+    httpx.put(target["upload_url"], content=content).raise_for_status()
+    expense = {"date": "2024-03-06", "amount": "5.00", "partner_name": "Rafael", "receipt_path": target["path"]}
+    assert client.post("/api/expenses/confirm", json=expense, headers=auth_headers).status_code == 201
+    blob = db_session.get(models.ReceiptBlob, digest)
+    assert blob is not None and blob.receipt_url.endswith(target["path"])
+
+    again = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-13", "filename": "nota.png", "sha256": digest},
+        headers=auth_headers,
+    ).json()
+    assert again["upload_url"] is None
+    assert again["receipt_url"] == blob.receipt_url
+
+
+def test_signed_upload_rejects_mismatched_hash(client, db_session, fake_storage, auth_headers):
+    import models
+
+    claimed = "cd" * 32
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.png", "sha256": claimed},
+        headers=auth_headers,
+    ).json()
+
+    httpx.put(target["upload_url"], content=b"not-what-was-claimed").raise_for_status()
+    expense = {"date": "2024-03-06", "amount": "5.00", "partner_name": "Rafael", "receipt_path": target["path"]}
+    assert client.post("/api/expenses/confirm", json=expense, headers=auth_headers).status_code == 409
+    assert db_session.query(models.ReceiptBlob).count() == 0
+    assert db_session.query(models.Expense).count() == 0
+
+
+def test_local_backend_stores_and_serves_ranges(client, local_storage, auth_headers):
+    content = bytes(range(256)) * 8
+    created = client.post(
+        "/api/expenses",
+        data={"amount": "9.99", "date_value": "2024-03-06", "partner_name": "Rafael"},
+        files={"file": ("nota.pdf", io.BytesIO(content), "application/pdf")},
+        headers=auth_headers,
+    )
+    assert created.status_code == 201
+    receipt_url = created.json()["receipt_url"]
+    assert receipt_url.startswith("http://testserver/api/receipts/sha256/")
+
+    full = client.get(receipt_url)
+    assert full.status_code == 200
+    assert full.content == content
+    assert full.headers["content-type"] == "application/pdf"
+
+    partial = client.get(receipt_url, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == content[10:20]
+
+
+def test_local_backend_signed_upload(client, local_storage, auth_headers):
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.jpg"},
+        headers=auth_headers,
+    ).json()
+
+    forged = client.put(target["upload_url"].replace("token=", "token=1."), content=b"x")
+    assert forged.status_code == 403
+    assert client.put(target["upload_url"], content=b"jpeg-bytes").status_code == 200
+
+    response = client.post(
+        "/api/expenses/confirm",
+        json={"date": "2024-03-06", "amount": "3.50", "partner_name": "Rafael", "receipt_path": target["path"]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    assert (local_storage / target["path"]).read_bytes() == b"jpeg-bytes"
+
+
+def test_local_backend_rejects_paths_outside_root(tmp_path):
+    storage = LocalStorageService(tmp_path, "http://testserver", "key")
+
+    with pytest.raises(ValueError):
+        storage.resolve("../outside.jpg")
+
+
+@pytest.mark.parametrize(
+    ("filename", "suffix"),
+    [("nota.JPG", ".jpg"), ("scan.pdf", ".pdf"), ("nota", ".bin"), (None, ".bin"), ("a.jp g", ".bin"), ("a.tiffanyfile1", ".bin")],
+)
+def test_receipt_suffix_matches_confirm_pattern(filename, suffix):
+    from services.receipt_index import receipt_suffix
+
+    assert receipt_suffix(filename) == suffix
+
+
+def test_local_backend_refuses_oversized_uploads(client, local_storage, auth_headers, monkeypatch):
+    from settings import get_settings
+
+    monkeypatch.setenv("MAX_RECEIPT_BYTES", "1024")
+    get_settings.cache_clear()
+    target = client.post(
+        "/api/expenses/receipt_upload",
+        json={"date": "2024-03-06", "filename": "nota.jpg"},
+        headers=auth_headers,
+    ).json()
+
+    declared = client.put(target["upload_url"], content=b"x" * 2048)
+    assert declared.status_code == 413
+
+    def chunks():
+        for _ in range(4):
+            yield b"x" * 512
+
+    streamed = client.put(target["upload_url"], content=chunks())
+    assert streamed.status_code == 413
+    assert not (local_storage / target["path"]).exists()
+    assert list((local_storage / target["path"]).parent.iterdir()) == []
+
+
+def test_storage_backend_must_be_usable(monkeypatch):
+    from settings import Settings
+    from services.storage import resolve_storage_backend
+
+    with pytest.raises(RuntimeError, match="Supabase storage is not configured"):
+        resolve_storage_backend(Settings(STORAGE_BACKEND="auto", SUPABASE_URL=None, SUPABASE_SERVICE_ROLE_KEY=None))
+    with pytest.raises(RuntimeError, match="ADMIN_TOKEN"):
+        resolve_storage_backend(Settings(STORAGE_BACKEND="local", ADMIN_TOKEN=""))
+    with pytest.raises(ValueError):
+        LocalStorageService(Path("storage"), "http://testserver", "")
+
+
+def test_app_does_not_start_without_receipt_storage(db_session, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from settings import get_settings
+
+    monkeypatch.setenv("STORAGE_BACKEND", "auto")
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+    monkeypatch.delenv("SUPABASE_SERVICE_ROLE_KEY", raising=False)
+    get_settings.cache_clear()
+    try:
+        with pytest.raises(RuntimeError, match="Supabase storage is not configured"):
+            with TestClient(app):
+                pass
+    finally:
+        get_settings.cache_clear()
@@ -15,6 +15,7 @@ function formatCurrency(value: string) {
 export default function Despesas() {
   const { token } = useAuth();
   const [expenses, setExpenses] = useState<Expense[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState<string | null>(null);
@@ -34,7 +35,7 @@ export default function Despesas() {
 
   const isFormValid = useMemo(() => amount && dateValue && receiptFile, [amount, dateValue, receiptFile]);
 
-  const fetchExpenses = async () => {
+  const fetchExpenses = async (cursor?: string) => {
     if (!token) return;
     setLoading(true);
     setError(null);
@@ -43,8 +44,10 @@ export default function Despesas() {
         start: start || undefined,
         end: end || undefined,
         partner_name: partnerFilter || undefined,
+        cursor,
       });
-      setExpenses(response);
+      setExpenses((previous) => (cursor ? [...previous, ...response.items] : response.items));
+      setNextCursor(response.next_cursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Não foi possível carregar as despesas");
     } finally {
@@ -198,6 +201,10 @@ export default function Despesas() {
                       <a href={expense.receipt_url} target="_blank" rel="noreferrer">
                         ver nota
                       </a>
+                    ) : expense.receipt_status === "pending" ? (
+                      "enviando..."
+                    ) : expense.receipt_status === "failed" ? (
+                      "falha no envio"
                     ) : (
                       "-"
                     )}
@@ -207,6 +214,11 @@ export default function Despesas() {
             </tbody>
           </table>
         )}
+        {nextCursor && (
+          <button className="button secondary" type="button" disabled={loading} onClick={() => void fetchExpenses(nextCursor)}>
+            Carregar mais
+          </button>
+        )}
       </section>
     </div>
   );
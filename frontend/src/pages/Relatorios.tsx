@@ -1,7 +1,13 @@
-﻿import { useEffect, useState } from "react";
+﻿import { FormEvent, useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 
-import { listSettlements, Settlement } from "../services/api";
+import {
+  downloadReportBundle,
+  fetchSettlementAggregates,
+  listSettlements,
+  Settlement,
+  SettlementAggregate,
+} from "../services/api";
 import { useAuth } from "../hooks/useAuth";
 
 function formatCurrency(value: string) {
@@ -13,30 +19,80 @@ function formatCurrency(value: string) {
 export default function Relatorios() {
   const { token } = useAuth();
   const [settlements, setSettlements] = useState<Settlement[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [aggregates, setAggregates] = useState<SettlementAggregate[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [bundleStart, setBundleStart] = useState("");
+  const [bundleEnd, setBundleEnd] = useState("");
+  const [downloading, setDownloading] = useState(false);
+
+  const fetchSettlements = async (cursor?: string) => {
+    if (!token) return;
+    setLoading(true);
+    setError(null);
+    try {
+      const response = await listSettlements(token, { cursor });
+      setSettlements((previous) => (cursor ? [...previous, ...response.items] : response.items));
+      setNextCursor(response.next_cursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Erro ao carregar fechamentos");
+    } finally {
+      setLoading(false);
+    }
+  };
 
   useEffect(() => {
-    const fetchData = async () => {
-      if (!token) return;
-      setLoading(true);
-      setError(null);
-      try {
-        const response = await listSettlements(token);
-        setSettlements(response);
-      } catch (err) {
-        setError(err instanceof Error ? err.message : "Erro ao carregar fechamentos");
-      } finally {
-        setLoading(false);
-      }
-    };
-    void fetchData();
+    void fetchSettlements();
+    if (token) {
+      fetchSettlementAggregates(token, { period: "month" })
+        .then(setAggregates)
+        .catch((err) => setError(err instanceof Error ? err.message : "Erro ao carregar totais"));
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [token]);
 
+  const handleBundleDownload = async (event: FormEvent) => {
+    event.preventDefault();
+    if (!token || !bundleStart || !bundleEnd) return;
+    setDownloading(true);
+    setError(null);
+    try {
+      const blob = await downloadReportBundle(token, bundleStart, bundleEnd);
+      const url = URL.createObjectURL(blob);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `relatorios-${bundleStart}-${bundleEnd}.zip`;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Erro ao baixar relatórios");
+    } finally {
+      setDownloading(false);
+    }
+  };
+
   return (
     <div>
       <h1>Relatórios semanais</h1>
       {error && <div className="alert">{error}</div>}
+      <form onSubmit={handleBundleDownload}>
+        <div className="form-row">
+          <div>
+            <label>De</label>
+            <input type="date" value={bundleStart} onChange={(event) => setBundleStart(event.target.value)} />
+          </div>
+          <div>
+            <label>Até</label>
+            <input type="date" value={bundleEnd} onChange={(event) => setBundleEnd(event.target.value)} />
+          </div>
+        </div>
+        <button className="button" type="submit" disabled={downloading || !bundleStart || !bundleEnd}>
+          {downloading ? "Gerando..." : "Baixar ZIP do período"}
+        </button>
+      </form>
       {loading && <p>Carregando...</p>}
       {!loading && settlements.length === 0 && <p>Nenhum fechamento registrado.</p>}
       {!loading && settlements.length > 0 && (
@@ -69,6 +125,42 @@ export default function Relatorios() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button className="button secondary" type="button" disabled={loading} onClick={() => void fetchSettlements(nextCursor)}>
+          Carregar mais
+        </button>
+      )}
+      {aggregates.length > 0 && (
+        <>
+          <h2>Totais por mês</h2>
+          <table className="table">
+            <thead>
+              <tr>
+                <th>Mês</th>
+                <th>Semanas</th>
+                <th>Receita</th>
+                <th>Aluguel</th>
+                <th>Saldo</th>
+                <th>Rafael</th>
+                <th>Guilherme</th>
+              </tr>
+            </thead>
+            <tbody>
+              {aggregates.map((item) => (
+                <tr key={item.period}>
+                  <td>{item.period}</td>
+                  <td>{item.weeks}</td>
+                  <td>{formatCurrency(item.income_total)}</td>
+                  <td>{formatCurrency(item.rent_fee)}</td>
+                  <td>{formatCurrency(item.net_for_split)}</td>
+                  <td>{formatCurrency(item.partners.Rafael?.total ?? "0")}</td>
+                  <td>{formatCurrency(item.partners.Guilherme?.total ?? "0")}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </>
+      )}
     </div>
   );
 }
@@ -54,9 +54,24 @@ export interface Expense {
   category?: string | null;
   note?: string | null;
   receipt_url?: string | null;
+  receipt_status?: "pending" | "uploaded" | "failed" | null;
   created_at: string;
 }
 
+export interface ExpensePage {
+  items: Expense[];
+  next_cursor: string | null;
+}
+
+export interface PartnerShare {
+  partner_id: number;
+  partner_name: string;
+  split_ratio: string | null;
+  reimb: string;
+  share: string;
+  total: string;
+}
+
 export interface Settlement {
   id: number;
   payout_id: number;
@@ -72,6 +87,7 @@ export interface Settlement {
   total_guilherme: string;
   rent_fee: string;
   income_total: string;
+  partners?: PartnerShare[];
 }
 
 export interface CloseWeekPayload {
@@ -92,9 +108,9 @@ export function loginRequest(email: string, password: string) {
 
 export function listExpenses(
   token: string,
-  params?: { start?: string; end?: string; partner_name?: string }
+  params?: { start?: string; end?: string; partner_name?: string; cursor?: string; limit?: number }
 ) {
-  return request<Expense[]>({
+  return request<ExpensePage>({
     method: "GET",
     url: "/expenses",
     headers: withAuth(token),
@@ -102,7 +118,22 @@ export function listExpenses(
   });
 }
 
-export function createExpenseRequest(
+export interface ReceiptUploadTarget {
+  path: string;
+  upload_url?: string | null;
+  token?: string | null;
+  receipt_url?: string | null;
+}
+
+async function sha256Hex(file: File): Promise<string | undefined> {
+  if (!globalThis.crypto?.subtle) {
+    return undefined;
+  }
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, "0")).join("");
+}
+
+export async function createExpenseRequest(
   token: string,
   data: {
     amount: number;
@@ -114,19 +145,39 @@ export function createExpenseRequest(
     file: File;
   }
 ) {
-  const formData = new FormData();
-  formData.append("file", data.file);
-  formData.append("amount", data.amount.toString());
-  formData.append("date_value", data.date);
-  formData.append("partner_name", data.partner_name);
-  if (data.platform) formData.append("platform", data.platform);
-  if (data.category) formData.append("category", data.category);
-  if (data.note) formData.append("note", data.note);
+  const target = await request<ReceiptUploadTarget>({
+    method: "POST",
+    url: "/expenses/receipt_upload",
+    data: { date: data.date, filename: data.file.name, sha256: await sha256Hex(data.file) },
+    headers: withAuth(token),
+  });
+
+  // Without an upload_url the same receipt is already stored and is reused as-is.
+  if (target.upload_url) {
+    try {
+      await axios.put(target.upload_url, data.file, {
+        headers: { "Content-Type": data.file.type || "application/octet-stream", "x-upsert": "true" },
+      });
+    } catch (err) {
+      if (axios.isAxiosError(err)) {
+        throw new Error(`Falha ao enviar o comprovante: ${err.message}`);
+      }
+      throw err;
+    }
+  }
 
   return request<Expense>({
     method: "POST",
-    url: "/expenses",
-    data: formData,
+    url: "/expenses/confirm",
+    data: {
+      date: data.date,
+      amount: data.amount.toFixed(2),
+      partner_name: data.partner_name,
+      platform: data.platform,
+      category: data.category,
+      note: data.note,
+      receipt_path: target.path,
+    },
     headers: withAuth(token),
   });
 }
@@ -140,6 +191,20 @@ export function closeWeek(token: string, payload: CloseWeekPayload) {
   });
 }
 
+export interface CloseWeeksResult {
+  closed: Settlement[];
+  errors: { week_end: string; detail: string }[];
+}
+
+export function closeWeeks(token: string, payloads: CloseWeekPayload[]) {
+  return request<CloseWeeksResult>({
+    method: "POST",
+    url: "/payouts/close_weeks",
+    data: payloads,
+    headers: withAuth(token),
+  });
+}
+
 export function fetchSettlement(token: string, id: number) {
   return request<Settlement>({
     method: "GET",
@@ -148,11 +213,46 @@ export function fetchSettlement(token: string, id: number) {
   });
 }
 
-export function listSettlements(token: string) {
-  return request<Settlement[]>({
+export interface SettlementPage {
+  items: Settlement[];
+  next_cursor: string | null;
+}
+
+export interface PartnerPeriodTotals {
+  reimb: string;
+  share: string;
+  total: string;
+}
+
+export interface SettlementAggregate {
+  period: string;
+  year: number;
+  month: number | null;
+  weeks: number;
+  income_total: string;
+  rent_fee: string;
+  net_for_split: string;
+  partners: Record<string, PartnerPeriodTotals>;
+}
+
+export function listSettlements(token: string, params?: { cursor?: string; limit?: number }) {
+  return request<SettlementPage>({
     method: "GET",
     url: "/reports/settlements",
     headers: withAuth(token),
+    params,
+  });
+}
+
+export function fetchSettlementAggregates(
+  token: string,
+  params?: { period?: "month" | "year"; start?: string; end?: string }
+) {
+  return request<SettlementAggregate[]>({
+    method: "GET",
+    url: "/reports/settlements/aggregates",
+    headers: withAuth(token),
+    params,
   });
 }
 
@@ -175,3 +275,45 @@ export function downloadWeeklyPdf(token: string, weekEnd: string) {
     params: { week_end: weekEnd },
   });
 }
+
+export function downloadReportBundle(token: string, start: string, end: string) {
+  return request<Blob>({
+    method: "GET",
+    url: "/reports/bundle.zip",
+    headers: withAuth(token),
+    responseType: "blob",
+    params: { start, end },
+  });
+}
+
+export interface SettlementScenario {
+  rule: "rent_before_split" | "rent_after_split";
+  split_rafael: string;
+  split_guilherme: string;
+}
+
+export interface SimulationTotals {
+  weeks: number;
+  net_for_split: string;
+  share_rafael: string;
+  share_guilherme: string;
+  total_rafael: string;
+  total_guilherme: string;
+}
+
+export interface SimulationResult {
+  actual: SimulationTotals;
+  scenarios: (SettlementScenario & { totals: SimulationTotals; delta_rafael: string; delta_guilherme: string })[];
+}
+
+export function simulateSettlements(
+  token: string,
+  payload: { start?: string; end?: string; scenarios?: SettlementScenario[] }
+) {
+  return request<SimulationResult>({
+    method: "POST",
+    url: "/reports/simulation",
+    data: payload,
+    headers: withAuth(token),
+  });
+}